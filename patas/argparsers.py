@@ -2,6 +2,8 @@ import argparse
 
 
 DEFAULT_PATAS_OUTPUT_DIR = './pataslab'
+DEFAULT_PATAS_CACHE_DIR = '~/.patas/cache'
+DEFAULT_PATAS_CACHE_SIZE = '10G'
 DEFAULT_FIG_SIZE = (10, 7)
 
 
@@ -39,6 +41,25 @@ def parse_patas_explore(argv):
                         help="adds a machine with the given number of workers to the cluster",
                         action='append')
 
+    parser.add_argument('--executor',
+                        type=str,
+                        choices=['local', 'bash', 'ssh'],
+                        dest='executor',
+                        help="how workers of the machines added with --node execute tasks, local machines default to bash and the others to ssh",
+                        action='store')
+
+    parser.add_argument('--pin',
+                        dest='pin',
+                        help="pins each worker of the machines added with --node to dedicated cores, grouped by NUMA node",
+                        action='store_true')
+
+    parser.add_argument('--cores-per-worker',
+                        type=int,
+                        metavar='N',
+                        dest='cores_per_worker',
+                        help="number of cores given to each pinned worker, by default the cores are split evenly among the workers",
+                        action='store')
+
     parser.add_argument('-y',
                         dest='confirmed',
                         help="skip confirmation before starting the tasks",
@@ -57,12 +78,41 @@ def parse_patas_explore(argv):
                         help="folder to store the program outputs",
                         action='store')
 
+    parser.add_argument('--cache',
+                        dest='cache',
+                        help="reuses results of identical tasks from the result cache and stores new ones there",
+                        action='store_true')
+
+    parser.add_argument('--cache-dir',
+                        type=str,
+                        default=DEFAULT_PATAS_CACHE_DIR,
+                        metavar='FOLDER',
+                        dest='cache_dir',
+                        help="folder of the result cache, shared by all experiments and output folders",
+                        action='store')
+
+    parser.add_argument('--cache-size',
+                        type=str,
+                        default=DEFAULT_PATAS_CACHE_SIZE,
+                        metavar='SIZE',
+                        dest='cache_size',
+                        help="maximum size of the result cache, like 500M or 10G, least recently used results are evicted first",
+                        action='store')
+
+    parser.add_argument('--cache-input',
+                        type=str,
+                        default=[],
+                        metavar='PATTERN',
+                        dest='cache_inputs',
+                        help="input files whose contents are part of the cache key, relative to the workdir",
+                        action='append')
+
     # Quick Experiment parameters
 
     parser.add_argument('--type',
                         default='grid',
                         metavar='NAME',
-                        choices=('grid', 'cdeepso'),
+                        choices=('grid', 'hyperband', 'cdeepso', 'strategy', 'random', 'lhs', 'sobol', 'bayes', 'refine'),
                         help='type of experiment to execute',
                         action='store')
 
@@ -124,6 +174,50 @@ def parse_patas_explore(argv):
                         help="defines an input variable that grows according to a geometric progression, used only in grid search",
                         action='append')
 
+    parser.add_argument('--vglob',
+                        type=str,
+                        nargs=2,
+                        default=[],
+                        metavar=('NAME', 'PATTERN'),
+                        dest='var_glob',
+                        help="defines an input variable that assumes each path matching a glob pattern, ** matches nested folders",
+                        action='append')
+
+    parser.add_argument('--vlines',
+                        type=str,
+                        nargs=2,
+                        default=[],
+                        metavar=('NAME', 'FILE'),
+                        dest='var_lines',
+                        help="defines an input variable that assumes each non-empty line of a file",
+                        action='append')
+
+    parser.add_argument('--vshard',
+                        type=str,
+                        nargs=3,
+                        default=[],
+                        metavar=('NAME', 'FILE', 'SIZE'),
+                        dest='var_shard',
+                        help="defines an input variable that assumes each byte range of SIZE (e.g. 64M) in a file, use {NAME.offset} and {NAME.length} in the command",
+                        action='append')
+
+    parser.add_argument('--stage',
+                        type=str,
+                        nargs=3,
+                        default=[],
+                        metavar=('NAME', 'VARS', 'CMD'),
+                        dest='stages',
+                        help="command executed once for each distinct value of the comma separated VARS (- for none), before the tasks that need it, used only in grid search",
+                        action='append')
+
+    parser.add_argument('--constraint',
+                        type=str,
+                        default=[],
+                        metavar='EXPR',
+                        dest='constraints',
+                        help="python expression over the variables that valid combinations must satisfy, like 'batch <= size'",
+                        action='append')
+
     parser.add_argument('--repeat',
                         type=int,
                         metavar='R',
@@ -132,6 +226,97 @@ def parse_patas_explore(argv):
                         help="number of times that each combination must be executed",
                         action='store')
 
+    parser.add_argument('--adaptive-repeat',
+                        type=str,
+                        nargs=3,
+                        metavar=('MIN', 'MAX', 'WIDTH'),
+                        dest='adaptive_repeat',
+                        help="repeats each combination between MIN and MAX times, stopping once the confidence interval of --score-pattern is narrower than WIDTH, used only in grid search",
+                        action='store')
+
+    parser.add_argument('--budget',
+                        type=str,
+                        nargs=4,
+                        metavar=('NAME', 'MIN', 'MAX', 'ETA'),
+                        dest='budget',
+                        help="defines the resource variable that grows by a factor of ETA between rungs, used only in hyperband search",
+                        action='store')
+
+    parser.add_argument('--brackets',
+                        type=int,
+                        metavar='B',
+                        dest='brackets',
+                        help="number of hyperband brackets, 1 is plain asynchronous successive halving, used only in hyperband search",
+                        action='store')
+
+    parser.add_argument('--strategy',
+                        type=str,
+                        metavar='NAME',
+                        dest='strategy',
+                        help="search strategy, given as an entry point name or as package.module:ClassName, used only in strategy search",
+                        action='store')
+
+    parser.add_argument('--samples',
+                        type=int,
+                        metavar='N',
+                        dest='samples',
+                        help="number of samples, used only in random, lhs and sobol search",
+                        action='store')
+
+    parser.add_argument('--continuous',
+                        dest='continuous',
+                        help="samples arithmetic and geometric variables anywhere between MIN and MAX instead of only their progression values, used only in random, lhs, sobol and bayes search",
+                        action='store_true')
+
+    parser.add_argument('--population',
+                        type=int,
+                        metavar='P',
+                        dest='population',
+                        help="number of particles in the swarm, defaults to the number of workers, used only in cdeepso search",
+                        action='store')
+
+    parser.add_argument('--evaluations',
+                        type=int,
+                        metavar='N',
+                        dest='evaluations',
+                        help="total number of tasks the search may execute, used only in cdeepso, strategy, bayes and refine search",
+                        action='store')
+
+    parser.add_argument('--levels',
+                        type=int,
+                        metavar='N',
+                        dest='levels',
+                        help="number of finer grids executed after the coarse grid, default is 3, used only in refine search",
+                        action='store')
+
+    parser.add_argument('--top',
+                        type=int,
+                        metavar='K',
+                        dest='top',
+                        help="number of best combinations that define the region of the next finer grid, default is 1, used only in refine search",
+                        action='store')
+
+    parser.add_argument('--points',
+                        type=int,
+                        metavar='N',
+                        dest='points',
+                        help="number of values of each arithmetic and geometric variable in the finer grids, default is 5, used only in refine search",
+                        action='store')
+
+    parser.add_argument('--seed',
+                        type=int,
+                        metavar='S',
+                        dest='seed',
+                        help="seed for the random number generator of the search",
+                        action='store')
+
+    parser.add_argument('--goal',
+                        type=str,
+                        choices=('max', 'min'),
+                        dest='goal',
+                        help="whether the score captured by --score-pattern must be maximized or minimized",
+                        action='store')
+
     parser.add_argument('--max-tries',
                         type=int,
                         metavar='T',
@@ -157,7 +342,199 @@ def parse_patas_explore(argv):
                         type=str,
                         metavar='REGEX',
                         dest='score_pattern',
-                        help="Pattern used to capture the fitness of the particle, used only with CDEEPSO search",
+                        help="Pattern used to capture the score of a task, like the fitness of a CDEEPSO particle or the metric of --adaptive-repeat",
+                        action='store')
+
+    parser.add_argument('--function',
+                        type=str,
+                        metavar='MODULE:FUNCTION',
+                        dest='function',
+                        help="Python function called with the variables of each task as keyword arguments, instead of --cmd. Local workers call it in process, importing its module once",
+                        action='store')
+
+    parser.add_argument('--function-recycle',
+                        type=int,
+                        metavar='N',
+                        dest='function_recycle',
+                        help="number of tasks after which the process calling --function is replaced, default is 1000",
+                        action='store')
+
+    parser.add_argument('--function-memory',
+                        type=str,
+                        metavar='SIZE',
+                        dest='function_memory',
+                        help="peak memory (e.g. 2G) after which the process calling --function is replaced",
+                        action='store')
+
+    parser.add_argument('--coalesce',
+                        type=str,
+                        metavar='K',
+                        dest='coalesce',
+                        help="executes up to K consecutive tasks in a single invocation of the worker shell, or 'auto' to choose K from the duration of the tasks and the overhead of each invocation",
+                        action='store')
+
+    parser.add_argument('--setup',
+                        type=str,
+                        metavar='CMD',
+                        default=[],
+                        dest='setup',
+                        help="command executed once by each worker before its first task, tasks inherit the environment it prepares",
+                        action='append')
+
+    parser.add_argument('--teardown',
+                        type=str,
+                        metavar='CMD',
+                        default=[],
+                        dest='teardown',
+                        help="command executed once by each worker that executed --setup, when the workers are released",
+                        action='append')
+
+    parser.add_argument('--input',
+                        type=str,
+                        metavar='PATH',
+                        default=[],
+                        dest='inputs',
+                        help="file or folder copied to every node before the tasks start, tasks find the copy in $PATAS_INPUT_<NAME>",
+                        action='append')
+
+    parser.add_argument('--artifact',
+                        type=str,
+                        metavar='GLOB',
+                        default=[],
+                        dest='artifacts',
+                        help="files produced by the tasks in the workdir that are copied into their output folders, placeholders like {var} are replaced",
+                        action='append')
+
+    parser.add_argument('--artifacts-limit',
+                        type=str,
+                        metavar='SIZE',
+                        dest='artifacts_limit',
+                        help="maximum size of the artifacts collected from each task, like 100M",
+                        action='store')
+
+    parser.add_argument('--artifacts-streams',
+                        type=int,
+                        metavar='N',
+                        dest='artifacts_streams',
+                        help="maximum number of workers collecting artifacts at the same time, defaults to 4",
+                        action='store')
+
+    parser.add_argument('--store',
+                        type=str,
+                        choices=['folders', 'packed'],
+                        dest='store',
+                        help="layout of the results, a folder per task or packed in a few segment files",
+                        action='store')
+
+    parser.add_argument('--compress',
+                        type=str,
+                        nargs='?',
+                        const='auto',
+                        choices=['auto', 'zstd', 'gzip'],
+                        dest='compress',
+                        help="compresses the outputs of the tasks, with zstd when it is installed or gzip otherwise",
+                        action='store')
+
+    parser.add_argument('--compress-dict',
+                        dest='compress_dict',
+                        help="trains a zstd dictionary with the first outputs, better for many small and similar outputs",
+                        action='store_true')
+
+    parser.add_argument('--output-head',
+                        type=str,
+                        metavar='SIZE',
+                        dest='output_head',
+                        help="keeps only the first SIZE bytes of the output of each task, plus its tail, like 10M",
+                        action='store')
+
+    parser.add_argument('--output-tail',
+                        type=str,
+                        metavar='SIZE',
+                        dest='output_tail',
+                        help="keeps only the last SIZE bytes of the output of each task, plus its head, like 10M",
+                        action='store')
+
+    parser.add_argument('--output-limit',
+                        type=str,
+                        metavar='SIZE',
+                        dest='output_limit',
+                        help="stops the tasks whose output grows beyond SIZE bytes, like 1G",
+                        action='store')
+
+    parser.add_argument('--checkpoint',
+                        dest='checkpoint',
+                        help="gives each task a checkpoint folder in $PATAS_CHECKPOINT_DIR, kept between its attempts, retries receive PATAS_RESUME=1",
+                        action='store_true')
+
+    parser.add_argument('--watch-pattern',
+                        type=str,
+                        metavar='REGEX',
+                        dest='watch_pattern',
+                        help="pattern matched against the live output of each task to capture its progress, one group captures the value, two groups capture the step and the value",
+                        action='store')
+
+    parser.add_argument('--prune',
+                        type=str,
+                        choices=('median', 'threshold'),
+                        dest='prune',
+                        help="stops tasks whose progress captured by --watch-pattern is worse than the median of other combinations at the same step, or worse than --prune-threshold",
+                        action='store')
+
+    parser.add_argument('--prune-threshold',
+                        type=float,
+                        metavar='V',
+                        dest='prune_threshold',
+                        help="value used by the threshold pruning rule",
+                        action='store')
+
+    parser.add_argument('--prune-min-peers',
+                        type=int,
+                        metavar='N',
+                        dest='prune_min_peers',
+                        help="number of other combinations that must report a step before the median rule prunes at it, default is 5",
+                        action='store')
+
+    parser.add_argument('--prune-warmup',
+                        type=float,
+                        metavar='STEP',
+                        dest='prune_warmup',
+                        help="first step at which tasks may be pruned, default is 0",
+                        action='store')
+
+    return parser.parse_args(args=argv)
+
+
+def parse_patas_export(argv):
+
+    # argparse for 'patas export'
+
+    parser = argparse.ArgumentParser(
+                        prog='patas export',
+                        description='Write tasks of an experiment with a packed store as regular task folders',
+                        epilog="Check the README.md to learn more tips on how to use this feature: https://github.com/diegofps/patas/blob/main/README.md",
+                        formatter_class=argparse.RawDescriptionHelpFormatter)
+
+    parser.add_argument('-e',
+                        type=str,
+                        metavar='FOLDERPATH',
+                        dest='experiment_folder',
+                        required=True,
+                        help="path to the experiment folder",
+                        action='store')
+
+    parser.add_argument('-t',
+                        type=str,
+                        metavar='TASK_ID',
+                        dest='task_ids',
+                        required=True,
+                        help="id of a task that must be exported",
+                        action='append')
+
+    parser.add_argument('-o',
+                        type=str,
+                        metavar='FOLDERPATH',
+                        dest='output_folder',
+                        help="folder where the task folders are created, defaults to the experiment folder",
                         action='store')
 
     return parser.parse_args(args=argv)
@@ -0,0 +1,156 @@
+import numpy as np
+
+
+LENGTHSCALES = [0.05, 0.1, 0.2, 0.3, 0.5, 1.0]
+NOISES       = [1e-6, 1e-4, 1e-2, 1e-1]
+
+
+def matern52(a, b, lengthscale):
+
+    d = np.sqrt(np.maximum(((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2), 0.0)) / lengthscale
+    s = np.sqrt(5.0) * d
+
+    return (1.0 + s + s * s / 3.0) * np.exp(-s)
+
+
+def normal_cdf(z):
+
+    # Abramowitz and Stegun 7.1.26, avoids depending on scipy
+
+    x = np.abs(z) / np.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * x)
+    y = 1.0 - (((((1.061405429 * t - 1.453152027) * t) + 1.421413741) * t - 0.284496736) * t + 0.254829592) * t * np.exp(-x * x)
+
+    return 0.5 * (1.0 + np.sign(z) * y)
+
+
+def normal_pdf(z):
+
+    return np.exp(-0.5 * z * z) / np.sqrt(2.0 * np.pi)
+
+
+def expected_improvement(mu, sigma, best, xi=0.01):
+
+    sigma = np.maximum(sigma, 1e-12)
+    z     = (mu - best - xi) / sigma
+
+    return (mu - best - xi) * normal_cdf(z) + sigma * normal_pdf(z)
+
+
+class GaussianProcess:
+
+    # Gaussian process regression with a Matern 5/2 kernel over the unit
+    # hypercube. Observations are added incrementally, updating the inverse of
+    # the kernel matrix by blocks in O(n^2) instead of refactoring it in O(n^3).
+    # Hyperparameters are chosen by maximum marginal likelihood over a small
+    # grid, only every few observations and on a capped subset.
+
+    def __init__(self, dims, refit_every=25, fit_size=200, seed=None):
+
+        self.dims        = dims
+        self.refit_every = refit_every
+        self.fit_size    = fit_size
+        self.rng         = np.random.default_rng(seed)
+        self.lengthscale = 0.2
+        self.noise       = 1e-2
+        self.x           = np.zeros((0, dims))
+        self.y           = np.zeros(0)
+        self.kinv        = np.zeros((0, 0))
+        self._updates    = 0
+
+    def __len__(self):
+
+        return len(self.y)
+
+    def fit(self, x, y):
+
+        # Replaces all observations, choosing new hyperparameters
+
+        self.x = np.array(x, dtype=float).reshape(-1, self.dims)
+        self.y = np.array(y, dtype=float)
+
+        self._fit_hyperparameters()
+        self._rebuild()
+
+    def add(self, x, y):
+
+        x = np.array(x, dtype=float).reshape(1, self.dims)
+
+        if len(self.y) == 0 or self._updates + 1 >= self.refit_every:
+            self.fit(np.vstack([self.x, x]), np.append(self.y, y))
+            return
+
+        # Block inverse: [[K, k], [k', c]]^-1 from K^-1 using the Schur complement
+
+        k = matern52(self.x, x, self.lengthscale)[:, 0]
+        c = 1.0 + self.noise
+        b = self.kinv @ k
+        s = max(c - k @ b, 1e-12)
+
+        n    = len(self.y)
+        kinv = np.empty((n + 1, n + 1))
+
+        kinv[:n, :n] = self.kinv + np.outer(b, b) / s
+        kinv[:n,  n] = -b / s
+        kinv[ n, :n] = -b / s
+        kinv[ n,  n] = 1.0 / s
+
+        self.kinv      = kinv
+        self.x         = np.vstack([self.x, x])
+        self.y         = np.append(self.y, y)
+        self._updates += 1
+
+    def predict(self, x):
+
+        # Mean and standard deviation, in the scale of the observations
+
+        mean  = self.y.mean()
+        scale = self.y.std() or 1.0
+        alpha = self.kinv @ ((self.y - mean) / scale)
+
+        k     = matern52(self.x, x, self.lengthscale)
+        mu    = k.T @ alpha
+        var   = 1.0 - np.einsum('ij,ij->j', k, self.kinv @ k)
+
+        return mu * scale + mean, np.sqrt(np.maximum(var, 1e-12)) * scale
+
+    def _rebuild(self):
+
+        k = matern52(self.x, self.x, self.lengthscale) + self.noise * np.eye(len(self.y))
+
+        self.kinv     = np.linalg.inv(k)
+        self._updates = 0
+
+    def _fit_hyperparameters(self):
+
+        if len(self.y) < 3:
+            return
+
+        # Marginal likelihood of a random subset, keeps refits cheap with a long history
+
+        if len(self.y) > self.fit_size:
+            idx = self.rng.choice(len(self.y), self.fit_size, replace=False)
+            x, y = self.x[idx], self.y[idx]
+        else:
+            x, y = self.x, self.y
+
+        y    = (y - y.mean()) / (y.std() or 1.0)
+        best = None
+
+        for lengthscale in LENGTHSCALES:
+            k = matern52(x, x, lengthscale)
+
+            for noise in NOISES:
+                try:
+                    l = np.linalg.cholesky(k + noise * np.eye(len(y)))
+                except np.linalg.LinAlgError:
+                    continue
+
+                a   = np.linalg.solve(l, y)
+                nll = 0.5 * a @ a + np.log(np.diag(l)).sum()
+
+                if best is None or nll < best[0]:
+                    best = (nll, lengthscale, noise)
+
+        if best is not None:
+            _, self.lengthscale, self.noise = best
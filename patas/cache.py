@@ -0,0 +1,202 @@
+from .utils import expand_path, warn
+from glob import glob
+
+import hashlib
+import shutil
+import yaml
+import time
+import os
+
+
+CACHE_FORMAT = 1
+
+SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024**2, 'G': 1024**3, 'T': 1024**4}
+
+
+def parse_size(size):
+
+    # Converts sizes like 500M or 10G into bytes
+
+    if isinstance(size, int):
+        return size
+
+    size = str(size).strip().upper().rstrip('B')
+    unit = size[-1] if size and size[-1] in SIZE_UNITS else ''
+
+    return int(float(size[:len(size) - len(unit)]) * SIZE_UNITS[unit])
+
+
+def link_or_copy(src, dst):
+
+    # Hard links are free, but only work inside the same filesystem
+
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+class ResultCache:
+
+    # Content-addressed store of successful task results, shared by every
+    # experiment and output folder that points to the same directory. Each
+    # entry is a folder named after the key, holding the task stdout and the
+    # metadata of the attempt that produced it. Entries are written to a
+    # temporary folder and renamed, so concurrent writers never expose
+    # partial entries. The modification time of an entry marks its last use,
+    # the least recently used entries are evicted when max_size is exceeded.
+
+    def __init__(self, folder, max_size):
+
+        self.folder   = expand_path(folder)
+        self.max_size = parse_size(max_size)
+        self.hits     = 0
+        self.stores   = 0
+        self._size    = None
+        self._inputs  = {}
+
+        os.makedirs(self.folder, exist_ok=True)
+
+    def key(self, task, env=None, inputs=None, version=None):
+
+        # Identifies a task by everything that may change its output
+
+        data = {
+            'format'  : CACHE_FORMAT,
+            'commands': task.commands,
+            'workdir' : task.work_dir,
+            'repeat'  : task.repeat_idd,
+            'env'     : {k: os.environ.get(k) for k in sorted(env or [])},
+            'inputs'  : {k: self._hash_input(k, task.work_dir) for k in sorted(inputs or [])},
+            'version' : version,
+        }
+
+        return hashlib.sha256(yaml.dump(data, sort_keys=True).encode()).hexdigest()
+
+    def _hash_input(self, pattern, workdir):
+
+        # Input files are hashed once per execution, they must not change while it runs
+
+        if pattern in self._inputs:
+            return self._inputs[pattern]
+
+        base      = os.path.expandvars(workdir) if workdir else os.getcwd()
+        filepaths = sorted(glob(os.path.join(base, os.path.expanduser(pattern)), recursive=True))
+        digest    = hashlib.sha256()
+
+        if not filepaths:
+            warn(f"Cache input not found: {pattern}")
+
+        for filepath in filepaths:
+            if not os.path.isfile(filepath):
+                continue
+
+            digest.update(os.path.relpath(filepath, base).encode())
+
+            with open(filepath, 'rb') as fin:
+                for block in iter(lambda: fin.read(1 << 20), b''):
+                    digest.update(block)
+
+        self._inputs[pattern] = digest.hexdigest()
+        return self._inputs[pattern]
+
+    def _entry(self, key):
+
+        return os.path.join(self.folder, key[:2], key)
+
+    def get(self, key):
+
+        # Returns the attempt stored under key, with its stdout, or None
+
+        entry = self._entry(key)
+
+        try:
+            with open(os.path.join(entry, 'result.yml'), 'r') as fin:
+                result = yaml.load(fin, Loader=yaml.FullLoader)
+
+            with open(os.path.join(entry, 'stdout'), 'rb') as fin:
+                result['stdout'] = fin.read()
+
+        except (OSError, yaml.YAMLError, TypeError):
+            return None
+
+        # Touch the entry, it is now the most recently used
+
+        try:
+            os.utime(entry, None)
+        except OSError:
+            pass
+
+        self.hits += 1
+        return entry, result
+
+    def put(self, key, attempt):
+
+        entry = self._entry(key)
+
+        if os.path.exists(entry):
+            return
+
+        tmp = f"{entry}.{os.getpid()}.{time.time_ns()}.tmp"
+        os.makedirs(tmp)
+
+        try:
+            result = {k: v for k, v in attempt.items() if k != 'stdout'}
+
+            with open(os.path.join(tmp, 'result.yml'), 'w') as fout:
+                yaml.dump(result, fout, default_flow_style=False)
+
+            with open(os.path.join(tmp, 'stdout'), 'wb') as fout:
+                fout.write(attempt['stdout'] or b'')
+
+            os.rename(tmp, entry)
+
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+
+        self.stores += 1
+
+        if self._size is not None:
+            self._size += self._entry_size(entry)
+
+        self._evict()
+
+    def _entry_size(self, entry):
+
+        try:
+            return sum(e.stat().st_size for e in os.scandir(entry) if e.is_file())
+        except OSError:
+            return 0
+
+    def _entries(self):
+
+        for shard in os.scandir(self.folder):
+            if shard.is_dir():
+                for entry in os.scandir(shard.path):
+                    if entry.is_dir() and not entry.name.endswith('.tmp'):
+                        yield entry
+
+    def _evict(self):
+
+        # The total size is computed once and then tracked, the folder is only
+        # scanned again when entries must be removed
+
+        if self._size is None:
+            self._size = sum(self._entry_size(e.path) for e in self._entries())
+
+        if self._size <= self.max_size:
+            return
+
+        entries = sorted(self._entries(), key=lambda e: e.stat().st_mtime)
+        target  = self.max_size * 0.9
+
+        self._size = sum(self._entry_size(e.path) for e in entries)
+
+        for entry in entries:
+            if self._size <= target:
+                break
+
+            size = self._entry_size(entry.path)
+            shutil.rmtree(entry.path, ignore_errors=True)
+            self._size -= size
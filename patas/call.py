@@ -0,0 +1,252 @@
+from .capture import OutputCapture
+from multiprocessing import Process, Pipe
+
+import contextlib
+import importlib
+import traceback
+import resource
+import signal
+import ast
+import sys
+import io
+import os
+
+
+def call_command(function, names):
+
+    # Shell command that calls the function in a new interpreter. Remote
+    # workers execute it, and it identifies the task in caches and indexes.
+
+    args = " ".join(f'{name}="{{{name}!r}}"' for name in names)
+    return f"python3 -m patas.call {function} {args}".strip()
+
+
+def load_function(name):
+
+    # Imports a function given as package.module:function, modules in the
+    # current folder are importable too
+
+    module_name, _, function_name = name.partition(':')
+
+    if os.getcwd() not in sys.path:
+        sys.path.append(os.getcwd())
+
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+class CaptureWriter(io.TextIOBase):
+
+    # Text stream writing into an OutputCapture, so the prints of a function
+    # are bounded while it runs, as the output of commands. Once the limit
+    # is exceeded, on_exceeded is called and later writes are dropped, the
+    # function is stopped from outside, like commands.
+
+    def __init__(self, capture, on_exceeded=None):
+
+        self.capture     = capture
+        self.on_exceeded = on_exceeded
+
+    def writable(self):
+
+        return True
+
+    def write(self, text):
+
+        if self.capture.exceeded:
+            return len(text)
+
+        self.capture.write(text.encode())
+
+        if self.capture.exceeded and self.on_exceeded is not None:
+            self.on_exceeded()
+
+        return len(text)
+
+
+def call(function, kwargs, output):
+
+    # Calls the function with everything it prints redirected to output,
+    # followed by its return value when it is not None. Returns its exit
+    # status.
+
+    status = 0
+
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        try:
+            result = function(**kwargs)
+
+            if result is not None:
+                print(result)
+
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else int(e.code is not None)
+
+        except BaseException:
+            traceback.print_exc()
+            status = 1
+
+    return status
+
+
+def serve(conn):
+
+    # Loop of the child process of a CallExecutor. Functions are imported
+    # once and called with the environment and folder of each task. Their
+    # output goes into the capture sent with the task, and returns with it.
+    # A capture exceeding its limit is also sent as soon as it happens, so
+    # the worker may stop the function.
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    functions = {}
+    environ   = dict(os.environ)
+    cwd       = os.getcwd()
+
+    while True:
+        request = conn.recv()
+
+        if request is None:
+            break
+
+        name, kwargs, env, work_dir, capture = request
+
+        os.environ.clear()
+        os.environ.update(environ)
+        os.environ.update(env)
+
+        try:
+            os.chdir(os.path.expandvars(work_dir) if work_dir else cwd)
+
+            if name not in functions:
+                functions[name] = load_function(name)
+
+            status = call(functions[name], kwargs, CaptureWriter(capture, lambda: conn.send(capture)))
+
+        except BaseException:
+            status = 1
+            capture.write(traceback.format_exc().encode())
+
+        memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        conn.send((status, capture, memory))
+
+
+class CallExecutor:
+
+    # Executes Python functions in a child process of the worker, which
+    # imports each module once and serves many tasks. The child is replaced
+    # after max_calls tasks or once its peak memory exceeds max_memory, so
+    # leaks and global state of one task do not accumulate forever.
+
+    def __init__(self, max_calls=1000, max_memory=None):
+
+        self.max_calls  = max_calls
+        self.max_memory = max_memory
+        self.process    = None
+        self.conn       = None
+        self.calls      = 0
+
+    def _start(self):
+
+        self.conn, child = Pipe()
+        self.process     = Process(target=serve, args=(child,), daemon=True)
+        self.calls       = 0
+
+        self.process.start()
+        child.close()
+
+    def stop(self):
+
+        if self.process is None:
+            return
+
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+
+        self.process.join(1)
+
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+        self.conn.close()
+        self.process = None
+
+    def execute(self, function, kwargs, env, work_dir, on_output=None, capture=None):
+
+        # Returns success, stdout and status, like the shell executors. The
+        # output is bounded by capture in the child, which sends it as soon
+        # as it exceeds its limit. If on_output returns True, like the
+        # watcher of that limit, the child is killed and the call abandoned.
+
+        capture = capture if capture is not None else OutputCapture()
+
+        if self.process is None or not self.process.is_alive():
+            self._start()
+
+        self.conn.send((function, kwargs, env, work_dir, capture))
+        self.calls += 1
+
+        while True:
+            while not self.conn.poll(0.5):
+                if not self.process.is_alive() or (on_output is not None and on_output([])):
+                    return self._abandon(capture)
+
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                self.stop()
+                return False, capture.getvalue(), 255
+
+            if not isinstance(message, OutputCapture):
+                break
+
+            capture.update(message)
+
+            if on_output is not None and on_output([]):
+                return self._abandon(capture)
+
+        status, filled, memory = message
+
+        if self.calls >= self.max_calls or (self.max_memory and memory > self.max_memory):
+            self.stop()
+
+        capture.update(filled)
+
+        return status == 0, capture.getvalue(), status
+
+    def _abandon(self, capture):
+
+        status = self.process.exitcode if not self.process.is_alive() else -signal.SIGKILL
+        self.process.kill()
+        self.stop()
+
+        return False, capture.getvalue(), status
+
+
+def main(argv):
+
+    # python -m patas.call package.module:function name=value ...
+
+    if not argv:
+        print("Usage: python -m patas.call package.module:function [name=value ...]")
+        return 1
+
+    kwargs = {}
+
+    for arg in argv[1:]:
+        name, _, value = arg.partition('=')
+
+        try:
+            kwargs[name] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            kwargs[name] = value
+
+    # Remote workers read and bound the output as it is printed
+
+    return call(load_function(argv[0]), kwargs, sys.stdout)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
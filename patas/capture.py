@@ -0,0 +1,125 @@
+from .cache import parse_size
+
+
+MAX_LINE = 1 << 20
+
+
+class OutputCapture:
+
+    # Keeps the output of a task in constant memory: its first `head` bytes
+    # and a ring buffer with the last `tail` bytes. Whatever falls between
+    # them is dropped and replaced by a marker, and `total` counts every
+    # byte written. With `limit`, the task is stopped once its output grows
+    # beyond it. Without any of them the whole output is kept.
+
+    def __init__(self, head=None, tail=None, limit=None):
+
+        self.head     = head
+        self.tail     = tail
+        self.limit    = limit
+        self.bounded  = head is not None or tail is not None
+        self.first    = bytearray()
+        self.last     = bytearray()
+        self.total    = 0
+        self.exceeded = False
+
+    @classmethod
+    def from_limits(cls, limits):
+
+        # Capture for the (head, tail, limit) sizes of an experiment, like 10M
+
+        head, tail, limit = [parse_size(x) if x is not None else None for x in limits or (None, None, None)]
+
+        if head is not None or tail is not None:
+            head, tail = head or 0, tail or 0
+
+        return cls(head, tail, limit)
+
+    def write(self, data):
+
+        self.total += len(data)
+
+        if self.limit is not None and self.total > self.limit:
+            self.exceeded = True
+
+        if not self.bounded:
+            self.first += data
+            return
+
+        room = self.head - len(self.first)
+
+        if room > 0:
+            self.first += data[:room]
+            data        = data[room:]
+
+        if not data or not self.tail:
+            return
+
+        # Trimming only when the buffer doubles keeps it cheap
+
+        self.last += data
+
+        if len(self.last) > 2 * self.tail:
+            del self.last[:len(self.last) - self.tail]
+
+    def update(self, other):
+
+        # Takes the contents of a capture filled in another process, like the
+        # child that calls Python functions
+
+        self.first    = other.first
+        self.last     = other.last
+        self.total    = other.total
+        self.exceeded = other.exceeded
+
+    @property
+    def dropped(self):
+
+        return self.total - len(self.first) - min(len(self.last), self.tail or 0)
+
+    def getvalue(self):
+
+        last = bytes(self.last[len(self.last) - min(len(self.last), self.tail or 0):])
+
+        if not self.dropped:
+            return bytes(self.first) + last
+
+        return bytes(self.first) + b"\n[patas: %d bytes dropped from the output]\n" % self.dropped + last
+
+    def report(self):
+
+        # Sizes recorded with the attempt when the output is bounded
+
+        if not self.bounded and self.limit is None:
+            return {}
+
+        result = {'stdout_size': self.total, 'stdout_dropped': self.dropped}
+
+        if self.exceeded:
+            result['stdout_exceeded'] = True
+
+        return result
+
+    def watch(self, on_output=None):
+
+        # Wraps on_output so the executor stops the task once the limit is exceeded
+
+        def watcher(lines):
+            return self.exceeded or (on_output is not None and on_output(lines))
+
+        return watcher
+
+
+def split_lines(partial, data):
+
+    # Complete lines in partial + data and the incomplete last one. Lines
+    # longer than MAX_LINE are cut, so a task printing without line breaks
+    # does not grow the partial line forever.
+
+    *lines, partial = (partial + data).split(b'\n')
+
+    if len(partial) > MAX_LINE:
+        lines.append(partial)
+        partial = b''
+
+    return lines, partial
@@ -0,0 +1,142 @@
+from bisect import insort
+
+import numpy as np
+
+
+class Particle:
+
+    def __init__(self, idd, position, velocity, weights):
+
+        self.idd           = idd
+        self.position      = position
+        self.velocity      = velocity
+        self.weights       = weights
+        self.trial_weights = weights
+        self.best_position = None
+        self.best_fitness  = None
+        self.moves         = 0
+
+
+class Swarm:
+
+    # Canonical Differential Evolutionary Particle Swarm Optimization (C-DEEPSO),
+    # in a steady-state flavor: every particle moves as soon as its own
+    # fitness is known, so there is no generation barrier and each worker can
+    # evaluate a different particle at its own pace. Positions live in the unit
+    # hypercube, the experiment maps them to variable values. Larger fitness
+    # values are better.
+
+    def __init__(self, dims, seed=None, tau=0.2, communication=0.75, memory=20):
+
+        self.dims          = dims
+        self.tau           = tau
+        self.communication = communication
+        self.memory_size   = memory
+        self.rng           = np.random.default_rng(seed)
+        self.particles     = []
+        self.memory        = []   # (-fitness, counter, position), best first
+        self.best_position = None
+        self.best_fitness  = None
+        self._counter      = 0
+
+    def spawn(self, position=None, fitness=None):
+
+        # Creates a new particle, optionally at a position evaluated before
+
+        if position is None:
+            position = self.rng.random(self.dims)
+
+        velocity = (self.rng.random(self.dims) - 0.5) * 0.2
+        weights  = self.rng.random(4)
+        particle = Particle(len(self.particles), np.array(position, dtype=float), velocity, weights)
+
+        self.particles.append(particle)
+
+        if fitness is not None:
+            self.report(particle, fitness)
+
+        return particle
+
+    def report(self, particle:Particle, fitness):
+
+        # Selection: the mutated weights survive only if they led to an improvement
+
+        if fitness is None:
+            return
+
+        if particle.best_fitness is None or fitness > particle.best_fitness:
+            particle.best_fitness  = fitness
+            particle.best_position = particle.position.copy()
+            particle.weights       = particle.trial_weights
+            self.remember(particle.position, fitness)
+
+    def move(self, particle:Particle):
+
+        # Computes the next position of a particle and returns it
+
+        rng = self.rng
+        x   = particle.position
+
+        if particle.best_position is None:
+            particle.best_position = x.copy()
+
+        # Mutate the strategic parameters (inertia, memory, cooperation and global best perturbation)
+
+        w = np.clip(particle.weights + self.tau * rng.standard_normal(4), 0.0, 1.0)
+        particle.trial_weights = w
+
+        # Differential evolution term, built from the memory of best positions
+
+        x_st = self._differential(particle)
+
+        # Perturbed global best and the communication mask
+
+        best = self.best_position if self.best_position is not None else particle.best_position
+        best = best * (1.0 + w[3] * rng.standard_normal(self.dims))
+        mask = rng.random(self.dims) < self.communication
+
+        v = w[0] * particle.velocity + w[1] * (x_st - x) + w[2] * mask * (best - x)
+        x = x + v
+
+        # Keep the particle inside the unit hypercube, bouncing from the walls
+
+        out    = (x < 0.0) | (x > 1.0)
+        v[out] = -0.5 * v[out]
+        x      = np.clip(x, 0.0, 1.0)
+
+        particle.position = x
+        particle.velocity = v
+        particle.moves   += 1
+
+        return x
+
+    def _differential(self, particle:Particle):
+
+        candidates = [p for _, _, p in self.memory]
+
+        if len(candidates) < 3:
+            return particle.best_position + self.rng.standard_normal(self.dims) * 0.1
+
+        r1, r2, r3 = self.rng.choice(len(candidates), 3, replace=False)
+        f          = self.rng.random()
+
+        return candidates[r1] + f * (candidates[r2] - candidates[r3])
+
+    def remember(self, position, fitness):
+
+        # Adds a position to the memory of best positions, without a particle
+
+        if fitness is None:
+            return
+
+        position       = np.array(position, dtype=float)
+        self._counter += 1
+
+        insort(self.memory, (-fitness, self._counter, position))
+
+        if len(self.memory) > self.memory_size:
+            self.memory.pop()
+
+        if self.best_fitness is None or fitness > self.best_fitness:
+            self.best_fitness  = fitness
+            self.best_position = position.copy()
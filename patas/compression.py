@@ -0,0 +1,160 @@
+from .utils import error, warn
+
+import gzip
+import io
+import os
+
+
+COMPRESSIONS    = ['auto', 'zstd', 'gzip']
+EXTENSIONS      = {'zstd': '.zst', 'gzip': '.gz'}
+DICTIONARY_FILE = ".stdout.dict"
+
+
+def zstandard():
+
+    # The zstandard module is optional, outputs fall back to gzip without it
+
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+
+def resolve(method):
+
+    # Method actually used to compress, zstd when available
+
+    if method in [None, False, 'none']:
+        return None
+
+    if method in ['auto', True]:
+        return 'zstd' if zstandard() else 'gzip'
+
+    if method == 'zstd' and zstandard() is None:
+        warn("Module zstandard is not installed, outputs will be compressed with gzip")
+        return 'gzip'
+
+    return method
+
+
+class OutputCompressor:
+
+    # Compresses the outputs of an experiment. With a dictionary, the first
+    # outputs are used to train a zstd dictionary, saved in the experiment
+    # folder and used for every output written after it. Many small and
+    # similar outputs compress much better this way. The dictionary never
+    # changes once trained, so every output can still be read with it.
+
+    def __init__(self, method, folder, dictionary=False, samples=100, dictionary_size=112640):
+
+        self.method          = resolve(method)
+        self.filepath        = os.path.join(folder, DICTIONARY_FILE)
+        self.training        = dictionary and self.method == 'zstd'
+        self.samples         = samples
+        self.dictionary_size = dictionary_size
+        self.collected       = []
+        self.compressor      = None
+
+        if self.training and os.path.exists(self.filepath):
+            self._use(load_dictionary(self.filepath))
+
+    @property
+    def extension(self):
+
+        return EXTENSIONS.get(self.method, '')
+
+    def _use(self, dictionary):
+
+        self.training   = False
+        self.compressor = zstandard().ZstdCompressor(level=10, dict_data=dictionary)
+
+    def _train(self, data):
+
+        self.collected.append(data)
+
+        if len(self.collected) < self.samples:
+            return
+
+        try:
+            dictionary = zstandard().train_dictionary(self.dictionary_size, self.collected)
+        except Exception as e:
+            warn(f"Could not train a compression dictionary: {e}")
+            self.training = False
+            return
+
+        with open(self.filepath, 'wb') as fout:
+            fout.write(dictionary.as_bytes())
+
+        self._use(dictionary)
+
+    def compress(self, data):
+
+        if self.method == 'gzip':
+            return gzip.compress(data, compresslevel=6)
+
+        if self.method != 'zstd':
+            return data
+
+        if self.training:
+            self._train(data)
+
+        if self.compressor is None:
+            self.compressor = zstandard().ZstdCompressor(level=10)
+
+        return self.compressor.compress(data)
+
+
+def load_dictionary(filepath):
+
+    with open(filepath, 'rb') as fin:
+        return zstandard().ZstdCompressionDict(fin.read())
+
+
+def find_output(folder, filename):
+
+    # Path of an output file, compressed or not, or None if it does not exist
+
+    for extension in [''] + list(EXTENSIONS.values()):
+        if os.path.exists(os.path.join(folder, filename + extension)):
+            return os.path.join(folder, filename + extension)
+
+    return None
+
+
+def open_output(filepath, mode='r'):
+
+    # Opens an output for reading, as text or binary with mode 'rb',
+    # decompressing it while it is read. Outputs compressed with a
+    # dictionary find it in the experiment folder.
+
+    if filepath.endswith('.gz'):
+        return gzip.open(filepath, mode if mode == 'rb' else 'rt')
+
+    if not filepath.endswith('.zst'):
+        return open(filepath, mode)
+
+    module = zstandard()
+
+    if module is None:
+        error(f"Module zstandard is required to read {filepath}")
+
+    fin        = open(filepath, 'rb')
+    dictionary = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(filepath))), DICTIONARY_FILE)
+    dict_id    = module.get_frame_parameters(fin.read(18)).dict_id
+
+    fin.seek(0)
+
+    if dict_id and os.path.exists(dictionary):
+        decompressor = module.ZstdDecompressor(dict_data=load_dictionary(dictionary))
+    else:
+        decompressor = module.ZstdDecompressor()
+
+    reader = decompressor.stream_reader(fin, closefd=True)
+    return reader if mode == 'rb' else io.TextIOWrapper(reader)
+
+
+def read_output(filepath):
+
+    with open_output(filepath, 'rb') as fin:
+        return fin.read()
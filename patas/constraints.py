@@ -0,0 +1,61 @@
+from .utils import error
+
+import ast
+
+
+SAFE_BUILTINS = {
+    'abs': abs, 'all': all, 'any': any, 'bool': bool, 'float': float, 'int': int,
+    'len': len, 'max': max, 'min': min, 'round': round, 'str': str, 'sum': sum,
+    'True': True, 'False': False, 'None': None,
+}
+
+SAFE_GLOBALS = {'__builtins__': SAFE_BUILTINS}
+
+
+class Constraint:
+
+    # Python expression over the experiment variables, compiled once. Its
+    # depth is the position of the last variable it references, so it can be
+    # checked as soon as that variable is bound while enumerating a grid.
+
+    def __init__(self, expression, variables):
+
+        names = [v.name for v in variables]
+
+        try:
+            tree = ast.parse(expression, mode='eval')
+        except SyntaxError as e:
+            error(f"Invalid constraint '{expression}': {e.msg}")
+
+        used = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+
+        for name in used:
+            if name not in names and name not in SAFE_BUILTINS:
+                error(f"Constraint '{expression}' references an unknown variable: {name}")
+
+        self.expression = expression
+        self.code       = compile(tree, '<constraint>', 'eval')
+        self.depth      = max([names.index(x) for x in used if x in names], default=0)
+
+    def __call__(self, combination):
+
+        try:
+            return bool(eval(self.code, SAFE_GLOBALS, combination))
+        except Exception as e:
+            error(f"Could not evaluate constraint '{self.expression}' with {combination}: {e}")
+
+
+def compile_constraints(expressions, variables):
+
+    # Groups the constraints by depth, position i holds the ones to check once variables[i] is bound
+
+    by_depth = [[] for _ in variables]
+
+    if not variables:
+        return by_depth
+
+    for expression in expressions or []:
+        constraint = Constraint(expression, variables)
+        by_depth[constraint.depth].append(constraint)
+
+    return by_depth
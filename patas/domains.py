@@ -0,0 +1,327 @@
+from array import array
+
+import yaml
+import math
+import os
+
+
+class Domain:
+
+    # Read-only sequence of the values a variable may assume. Values are
+    # computed on demand from a few parameters, so the length, indexing and
+    # iteration are cheap no matter how fine-grained the progression is.
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+
+        if index < 0:
+            index += self._length
+
+        if not 0 <= index < self._length:
+            raise IndexError("domain index out of range")
+
+        return self._value(index)
+
+    def __iter__(self):
+
+        for index in range(self._length):
+            yield self._value(index)
+
+    def __eq__(self, other):
+
+        if isinstance(other, Domain):
+            return type(self) is type(other) and self.signature() == other.signature()
+
+        try:
+            return len(other) == self._length and all(a == b for a, b in zip(self, other))
+        except TypeError:
+            return NotImplemented
+
+    def __hash__(self):
+
+        return hash(tuple(sorted(self.signature().items())))
+
+    def __repr__(self):
+
+        if self._length <= 6:
+            return str(self.tolist())
+
+        return f"[{self[0]}, {self[1]}, {self[2]}, ..., {self[-1]}]"
+
+    def tolist(self):
+
+        return list(self)
+
+    def index(self, value):
+
+        for index, x in enumerate(self):
+            if x == value:
+                return index
+
+        raise ValueError(f"{value} is not in the domain")
+
+    def _value(self, index):
+        raise NotImplementedError()
+
+    def signature(self):
+        raise NotImplementedError()
+
+
+class ArithmeticDomain(Domain):
+
+    # Same values as numpy.arange(first, last, step)
+
+    def __init__(self, first, last, step):
+
+        if step == 0:
+            raise ValueError("step must not be zero")
+
+        self.first   = first
+        self.last    = last
+        self.step    = step
+        self._length = max(0, math.ceil((last - first) / step))
+
+    def _value(self, index):
+
+        return self.first + index * self.step
+
+    def signature(self):
+
+        return {'type': 'arithmetic', 'min': self.first, 'max': self.last, 'step': self.step}
+
+
+class GeometricDomain(Domain):
+
+    # Values first, first*factor, first*factor^2, ... that are smaller than last
+
+    def __init__(self, first, last, factor):
+
+        if first <= 0 or factor <= 1:
+            raise ValueError("geometric domains require first > 0 and factor > 1")
+
+        self.first   = first
+        self.last    = last
+        self.factor  = factor
+        self._length = self._count()
+
+    def _count(self):
+
+        if self.first >= self.last:
+            return 0
+
+        # Estimate with logarithms, then fix rounding errors with exact comparisons
+
+        length = max(1, math.ceil(math.log(self.last / self.first) / math.log(self.factor)))
+
+        while length > 1 and self._value(length - 1) >= self.last:
+            length -= 1
+
+        while self._value(length) < self.last:
+            length += 1
+
+        return length
+
+    def _value(self, index):
+
+        return self.first * self.factor ** index
+
+    def signature(self):
+
+        return {'type': 'geometric', 'min': self.first, 'max': self.last, 'factor': self.factor}
+
+
+def resolve(path, base=None):
+
+    # Absolute path of a file given relative to base, the workdir of the experiment
+
+    path = os.path.expanduser(path)
+
+    if base and not os.path.isabs(path):
+        path = os.path.join(os.path.expanduser(os.path.expandvars(base)), path)
+
+    return path
+
+
+def file_signature(filepath):
+
+    # Size and modification time, so a rewritten file changes the signature
+
+    try:
+        st = os.stat(filepath)
+        return {'size': st.st_size, 'mtime': st.st_mtime_ns}
+    except OSError:
+        return {'size': None, 'mtime': None}
+
+
+class LazyDomain(Domain):
+
+    # Domains whose values must be read from the filesystem are only
+    # expanded when they are first needed
+
+    @property
+    def _length(self):
+
+        if self._cache is None:
+            self._cache = self._load()
+
+        return self._cache_length()
+
+    def _cache_length(self):
+
+        return len(self._cache)
+
+    def _load(self):
+        raise NotImplementedError()
+
+
+class GlobDomain(LazyDomain):
+
+    # Sorted paths matching a glob pattern, ** matches any number of folders.
+    # Relative patterns are matched inside base and give relative paths, so
+    # they are valid for tasks running in the workdir.
+
+    def __init__(self, pattern, base=None):
+
+        self.pattern = pattern
+        self.base    = base
+        self._cache  = None
+
+    def _load(self):
+
+        from glob import glob
+
+        pattern = os.path.expanduser(self.pattern)
+
+        if self.base and not os.path.isabs(pattern):
+            return sorted(glob(pattern, root_dir=resolve('.', self.base), recursive=True))
+
+        return sorted(glob(pattern, recursive=True))
+
+    def _value(self, index):
+
+        return self._cache[index]
+
+    def index(self, value):
+
+        len(self)
+        return self._cache.index(value)
+
+    def signature(self):
+
+        return {'type': 'glob', 'pattern': self.pattern}
+
+
+class LinesDomain(LazyDomain):
+
+    # Non-empty lines of a text file. Only the offsets of the lines are kept
+    # in memory, each value is read from the file when it is needed.
+
+    def __init__(self, filepath, base=None):
+
+        self.filepath = filepath
+        self.path     = resolve(filepath, base)
+        self._cache   = None
+
+    def _load(self):
+
+        offsets = array('q')
+        offset  = 0
+
+        with open(self.path, 'rb') as fin:
+            for line in fin:
+                if line.strip():
+                    offsets.append(offset)
+                offset += len(line)
+
+        return offsets
+
+    def _value(self, index):
+
+        with open(self.path, 'rb') as fin:
+            fin.seek(self._cache[index])
+            return fin.readline().decode('utf-8').rstrip('\r\n')
+
+    def __iter__(self):
+
+        # Sequential reads, without seeking for every line
+
+        with open(self.path, 'rb') as fin:
+            for line in fin:
+                if line.strip():
+                    yield line.decode('utf-8').rstrip('\r\n')
+
+    def index(self, value):
+
+        for index, line in enumerate(self):
+            if line == value:
+                return index
+
+        raise ValueError(f"{value} is not in {self.filepath}")
+
+    def signature(self):
+
+        return {'type': 'lines', 'file': self.filepath, **file_signature(self.path)}
+
+
+class Shard(str):
+
+    # Byte range of a file. Formats as OFFSET:LENGTH, and the placeholders
+    # {var.offset} and {var.length} give each part alone.
+
+    def __new__(cls, offset, length):
+
+        shard        = super().__new__(cls, f"{offset}:{length}")
+        shard.offset = offset
+        shard.length = length
+
+        return shard
+
+    def __getnewargs__(self):
+
+        return (self.offset, self.length)
+
+
+yaml.add_representer(Shard, lambda dumper, shard: dumper.represent_str(str(shard)))
+
+
+class ShardDomain(LazyDomain):
+
+    # Fixed-size byte ranges covering a file, the last one may be shorter
+
+    def __init__(self, filepath, size, base=None):
+
+        if size <= 0:
+            raise ValueError("shard size must be positive")
+
+        self.filepath = filepath
+        self.path     = resolve(filepath, base)
+        self.size     = size
+        self._cache   = None
+
+    def _load(self):
+
+        return os.path.getsize(self.path)
+
+    def _cache_length(self):
+
+        return math.ceil(self._cache / self.size)
+
+    def _value(self, index):
+
+        offset = index * self.size
+        return Shard(offset, min(self.size, self._cache - offset))
+
+    def index(self, value):
+
+        offset, _ = str(value).split(':')
+        return int(offset) // self.size
+
+    def signature(self):
+
+        stat = file_signature(self.path)
+        return {'type': 'shard', 'file': self.filepath, 'size': self.size, 'file_size': stat['size'], 'mtime': stat['mtime']}
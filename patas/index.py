@@ -0,0 +1,115 @@
+from glob import glob
+
+import hashlib
+import yaml
+import os
+
+
+INDEX_FILENAME = ".tasks.tsv"
+
+
+def combination_key(combination):
+
+    # Hashable representation of a combination, stable across executions
+
+    return tuple(sorted((k, str(v)) for k, v in combination.items()))
+
+
+def task_key(combination, repeat_idd, cmd, workdir):
+
+    # Content-based identity of a task, independent of its position in the grid
+
+    data = repr((combination_key(combination), repeat_idd, list(cmd), workdir))
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
+class TaskIndex:
+
+    # Persistent mapping from task keys to task ids, stored as an append-only
+    # tsv file inside the experiment folder. Task ids name the task folders,
+    # so once a combination gets an id it keeps it, even if variables are
+    # extended or reordered. New keys take their preferred (positional) id
+    # when it is free, which keeps the layout of a fresh experiment unchanged.
+
+    def __init__(self, folder):
+
+        self.folder   = folder
+        self.filepath = os.path.join(folder, INDEX_FILENAME)
+        self.ids      = {}
+        self.used     = set()
+        self.next     = 0
+        self._pending = []
+
+    def load(self, cmd, workdir):
+
+        # Experiments created before the index existed have it rebuilt from their task folders
+
+        if os.path.exists(self.filepath):
+            with open(self.filepath, "r") as fin:
+                for line in fin:
+                    cells = line.rstrip("\n").split("\t")
+
+                    if len(cells) == 2:
+                        self._set(cells[0], int(cells[1]))
+        else:
+            for info_filepath in glob(os.path.join(self.folder, "*", "info.yml")):
+                try:
+                    with open(info_filepath, "r") as fin:
+                        data = yaml.load(fin, Loader=yaml.FullLoader)
+
+                    key = task_key(data["combination"], data["repeat_id"], cmd, workdir)
+                    self._set(key, int(data["task_id"]))
+                    self._pending.append((key, int(data["task_id"])))
+
+                except (OSError, yaml.YAMLError, KeyError, TypeError, ValueError):
+                    continue
+
+        return self
+
+    def _set(self, key, task_idd):
+
+        self.ids[key] = task_idd
+        self.used.add(task_idd)
+        self.next = max(self.next, task_idd + 1)
+
+    def get(self, key, preferred):
+
+        # Returns the id of a task, allocating a new one if the key is unknown
+
+        task_idd = self.ids.get(key)
+
+        if task_idd is not None:
+            return task_idd
+
+        task_idd = preferred if preferred not in self.used else self.next
+
+        self._set(key, task_idd)
+        self._pending.append((key, task_idd))
+
+        return task_idd
+
+    def remove(self, keys):
+
+        # Forgets the given keys, rewriting the file without them
+
+        for key in keys:
+            self.used.discard(self.ids.pop(key, None))
+
+        self._pending = []
+
+        os.makedirs(self.folder, exist_ok=True)
+
+        with open(self.filepath, "w") as fout:
+            fout.writelines(f"{key}\t{task_idd}\n" for key, task_idd in self.ids.items())
+
+    def flush(self):
+
+        if not self._pending:
+            return
+
+        os.makedirs(self.folder, exist_ok=True)
+
+        with open(self.filepath, "a") as fout:
+            fout.writelines(f"{key}\t{task_idd}\n" for key, task_idd in self._pending)
+
+        self._pending = []
@@ -5,15 +5,16 @@ try:
 except:
     from patas import consts as c
 
-from patas.utils import error, node_cpu_count, abort, warn
+from patas.utils import error, node_cpu_count, abort, warn, expand_path
 from collections import defaultdict
 from patas import argparsers
 from patas import schemas
 
 import sys
+import os
 
 
-BASIC_OPTIONS   = ['explore', 'parse', 'query', 'draw', 'doctor']
+BASIC_OPTIONS   = ['explore', 'parse', 'export', 'query', 'draw', 'doctor']
 DRAW_OPTIONS    = ['heatmap', 'categories', 'lines', 'bars']
 
 
@@ -40,18 +41,96 @@ def parse_base_experiment(args, experiment:schemas.BaseExperimentSchema):
     if args.cmd:
         experiment.cmd = args.cmd
 
+    if args.function:
+        experiment.function = args.function
+
+    if args.function_recycle:
+        experiment.function_recycle = args.function_recycle
+
+    if args.function_memory:
+        experiment.function_memory = args.function_memory
+
     if args.max_tries:
         experiment.max_tries = args.max_tries
 
     if args.redo_tasks:
         experiment.redo_tasks = args.redo_tasks
 
-def append_grid_experiment(args, experiments):
+    if args.goal:
+        experiment.goal = args.goal
 
-    experiment = schemas.GridExperimentSchema()
+    if args.constraints:
+        experiment.constraints = args.constraints
+
+    if args.coalesce:
+        if args.coalesce != 'auto' and (not args.coalesce.isdigit() or int(args.coalesce) < 1):
+            error("Parameter --coalesce must be a positive integer or auto")
+
+        experiment.coalesce = args.coalesce if args.coalesce == 'auto' else int(args.coalesce)
+
+    if args.setup:
+        experiment.setup = args.setup
+
+    if args.teardown:
+        experiment.teardown = args.teardown
+
+    if args.checkpoint:
+        experiment.checkpoint = True
+
+    if args.inputs:
+        experiment.inputs = args.inputs
+
+    if args.artifacts:
+        experiment.artifacts = args.artifacts
+
+    if args.store:
+        experiment.store = args.store
+
+    if args.compress:
+        experiment.compress = args.compress
+
+    if args.compress_dict:
+        experiment.compress_dict = True
+
+    if args.output_head:
+        experiment.output_head = args.output_head
+
+    if args.output_tail:
+        experiment.output_tail = args.output_tail
+
+    if args.output_limit:
+        experiment.output_limit = args.output_limit
+
+    if args.artifacts_limit:
+        experiment.artifacts_limit = args.artifacts_limit
+
+    if args.artifacts_streams:
+        experiment.artifacts_streams = args.artifacts_streams
+
+    if args.watch_pattern:
+        experiment.watch_pattern = args.watch_pattern
+
+    if args.prune:
+        experiment.prune = args.prune
+
+        if not experiment.watch_pattern:
+            error("Parameter --prune requires parameter --watch-pattern")
+
+    if args.prune_threshold is not None:
+        experiment.prune_threshold = args.prune_threshold
+
+    if args.prune_min_peers is not None:
+        experiment.prune_min_peers = args.prune_min_peers
+
+    if args.prune_warmup is not None:
+        experiment.prune_warmup = args.prune_warmup
+
+    if args.cache_inputs:
+        experiment.cache_inputs = args.cache_inputs
+
+
+def parse_variables(args, experiment:schemas.BaseExperimentSchema):
 
-    parse_base_experiment(args, experiment)
-    
     for values in args.var_list:
         var        = schemas.ListVariableSchema()
         var.name   = values[0]
@@ -64,7 +143,6 @@ def append_grid_experiment(args, experiments):
         var.min  = float(min)  if '.' in min  else int(min)
         var.max  = float(max)  if '.' in max  else int(max)
         var.step = float(step) if '.' in step else int(step)
-        var.update()
         experiment.vars.append(var)
 
     for name, min, max, step in args.var_geometric:
@@ -73,35 +151,134 @@ def append_grid_experiment(args, experiments):
         var.min    = float(min)  if '.' in min  else int(min)
         var.max    = float(max)  if '.' in max  else int(max)
         var.factor = float(step) if '.' in step else int(step)
-        var.update()
         experiment.vars.append(var)
 
-    if args.score_pattern:
+    for name, pattern in args.var_glob:
+        var         = schemas.GlobVariableSchema()
+        var.name    = name
+        var.pattern = pattern
+        experiment.vars.append(var)
+
+    for name, filepath in args.var_lines:
+        var      = schemas.LinesVariableSchema()
+        var.name = name
+        var.file = filepath
+        experiment.vars.append(var)
+
+    for name, filepath, size in args.var_shard:
+        var      = schemas.ShardVariableSchema()
+        var.name = name
+        var.file = filepath
+        var.size = size
+        experiment.vars.append(var)
+
+    experiment.bind_files()
+    experiment.use_function()
+
+
+def append_grid_experiment(args, experiments):
+
+    experiment = schemas.GridExperimentSchema()
+
+    parse_base_experiment(args, experiment)
+    parse_variables(args, experiment)
+
+    if args.budget:
+        warn("GridExperiment is not compatible with parameter --budget")
+
+    if args.adaptive_repeat:
+        min_repeat, max_repeat, ci_width = args.adaptive_repeat
+        experiment.adaptive_repeat = schemas.AdaptiveRepeatSchema({
+            'min_repeat': int(min_repeat),
+            'max_repeat': int(max_repeat),
+            'ci_width': float(ci_width),
+        })
+
+        if args.score_pattern:
+            experiment.score_pattern = args.score_pattern
+        else:
+            error("GridExperiment requires parameter --score-pattern when --adaptive-repeat is used")
+
+    elif args.score_pattern:
         warn("GridExperiment is not compatible with parameter --score-pattern")
 
+    for name, variables, cmd in args.stages:
+        experiment.stages.append(schemas.StageSchema({
+            'name': name,
+            'cmd' : cmd,
+            'vars': [] if variables == '-' else variables.split(','),
+        }))
+
     if experiment.cmd and experiment.vars:
         experiments.append(experiment)
     
     return experiments
 
 
+def append_hyperband_experiment(args, experiments:list):
+
+    experiment = schemas.HyperbandExperimentSchema()
+
+    parse_base_experiment(args, experiment)
+    parse_variables(args, experiment)
+
+    if not experiment.cmd:
+        return experiments
+
+    if args.budget:
+        name, min, max, eta = args.budget
+        experiment.budget      = schemas.BudgetSchema()
+        experiment.budget.name = name
+        experiment.budget.min  = float(min) if '.' in min else int(min)
+        experiment.budget.max  = float(max) if '.' in max else int(max)
+        experiment.budget.eta  = float(eta) if '.' in eta else int(eta)
+    else:
+        error("HyperbandExperiment requires parameter --budget")
+
+    if args.score_pattern:
+        experiment.score_pattern = args.score_pattern
+    else:
+        error("HyperbandExperiment requires parameter --score-pattern")
+
+    if args.brackets:
+        experiment.brackets = args.brackets
+
+    if args.adaptive_repeat:
+        warn("HyperbandExperiment is not compatible with parameter --adaptive-repeat")
+
+    if args.stages:
+        warn("HyperbandExperiment is not compatible with parameter --stage")
+
+    experiments.append(experiment)
+    return experiments
+
+
 def append_cdeepso_experiment(args, experiments:list):
     
     experiment = schemas.CDEEPSOExperimentSchema()
 
     parse_base_experiment(args, experiment)
+    parse_variables(args, experiment)
     
     if args.score_pattern:
         experiment.score_pattern = args.score_pattern
-    
-    if args.var_list:
-        warn("CDEEPSOExperiment is not compatible with parameter --vl")
+    elif experiment.cmd:
+        error("CDEEPSOExperiment requires parameter --score-pattern")
+
+    if args.population:
+        experiment.population = args.population
+
+    if args.evaluations:
+        experiment.evaluations = args.evaluations
 
-    if args.var_arithmetic:
-        warn("CDEEPSOExperiment is not compatible with parameter --va")
+    if args.seed is not None:
+        experiment.seed = args.seed
 
-    if args.var_geometric:
-        warn("CDEEPSOExperiment is not compatible with parameter --vg")
+    if args.adaptive_repeat:
+        warn("CDEEPSOExperiment is not compatible with parameter --adaptive-repeat")
+
+    if args.stages:
+        warn("CDEEPSOExperiment is not compatible with parameter --stage")
 
     if experiment.cmd and experiment.vars:
         experiments.append(experiment)
@@ -109,6 +286,141 @@ def append_cdeepso_experiment(args, experiments:list):
     return experiments
 
 
+def append_strategy_experiment(args, experiments:list):
+
+    experiment = schemas.StrategyExperimentSchema()
+
+    parse_base_experiment(args, experiment)
+    parse_variables(args, experiment)
+
+    if not experiment.cmd:
+        return experiments
+
+    if args.strategy:
+        experiment.strategy = args.strategy
+    else:
+        error("StrategyExperiment requires parameter --strategy")
+
+    if args.score_pattern:
+        experiment.score_pattern = args.score_pattern
+
+    if args.evaluations:
+        experiment.evaluations = args.evaluations
+
+    if args.seed is not None:
+        experiment.seed = args.seed
+
+    if args.adaptive_repeat:
+        warn("StrategyExperiment is not compatible with parameter --adaptive-repeat")
+
+    if args.stages:
+        warn("StrategyExperiment is not compatible with parameter --stage")
+
+    experiments.append(experiment)
+    return experiments
+
+
+def append_sampling_experiment(args, experiments:list):
+
+    experiment = schemas.SamplingExperimentSchema(args.type)
+
+    parse_base_experiment(args, experiment)
+    parse_variables(args, experiment)
+
+    if args.continuous:
+        for var in experiment.vars:
+            if var.type in ['arithmetic', 'geometric']:
+                var.continuous = True
+
+    if args.samples:
+        experiment.samples = args.samples
+
+    if args.seed is not None:
+        experiment.seed = args.seed
+
+    if args.adaptive_repeat:
+        warn("SamplingExperiment is not compatible with parameter --adaptive-repeat")
+
+    if args.stages:
+        warn("SamplingExperiment is not compatible with parameter --stage")
+
+    if experiment.cmd and experiment.vars:
+        experiments.append(experiment)
+
+    return experiments
+
+
+def append_bayes_experiment(args, experiments:list):
+
+    experiment = schemas.BayesExperimentSchema()
+
+    parse_base_experiment(args, experiment)
+    parse_variables(args, experiment)
+
+    if args.score_pattern:
+        experiment.score_pattern = args.score_pattern
+    elif experiment.cmd:
+        error("BayesExperiment requires parameter --score-pattern")
+
+    if args.continuous:
+        for var in experiment.vars:
+            if var.type in ['arithmetic', 'geometric']:
+                var.continuous = True
+
+    if args.evaluations:
+        experiment.evaluations = args.evaluations
+
+    if args.seed is not None:
+        experiment.seed = args.seed
+
+    if args.adaptive_repeat:
+        warn("BayesExperiment is not compatible with parameter --adaptive-repeat")
+
+    if args.stages:
+        warn("BayesExperiment is not compatible with parameter --stage")
+
+    if experiment.cmd and experiment.vars:
+        experiments.append(experiment)
+
+    return experiments
+
+
+def append_refine_experiment(args, experiments:list):
+
+    experiment = schemas.RefineExperimentSchema()
+
+    parse_base_experiment(args, experiment)
+    parse_variables(args, experiment)
+
+    if args.score_pattern:
+        experiment.score_pattern = args.score_pattern
+    elif experiment.cmd:
+        error("RefineExperiment requires parameter --score-pattern")
+
+    if args.levels is not None:
+        experiment.levels = args.levels
+
+    if args.top is not None:
+        experiment.top = args.top
+
+    if args.points is not None:
+        experiment.points = args.points
+
+    if args.evaluations:
+        experiment.evaluations = args.evaluations
+
+    if args.adaptive_repeat:
+        warn("RefineExperiment is not compatible with parameter --adaptive-repeat")
+
+    if args.stages:
+        warn("RefineExperiment is not compatible with parameter --stage")
+
+    if experiment.cmd and experiment.vars:
+        experiments.append(experiment)
+
+    return experiments
+
+
 def load_experiments_from_files(args):
 
     experiments = []
@@ -166,6 +478,10 @@ def create_clusters(args):
 
             if node.workers is None:
                 node.workers = node_cpu_count(node.user, node.hostname, node.port, 1)
+
+            node.executor         = args.executor
+            node.pin              = args.pin
+            node.cores_per_worker = args.cores_per_worker
                 
             cluster.nodes.append(node)
 
@@ -175,10 +491,13 @@ def create_clusters(args):
 
         from multiprocessing import cpu_count
 
-        node          = NodeSchema()
-        node.name     = 'localhost'
-        node.hostname = 'localhost'
-        node.workers  = cpu_count()
+        node                  = NodeSchema()
+        node.name             = 'localhost'
+        node.hostname         = 'localhost'
+        node.workers          = cpu_count()
+        node.executor         = args.executor
+        node.pin              = args.pin
+        node.cores_per_worker = args.cores_per_worker
 
         cluster       = ClusterSchema()
         cluster.name  = 'cluster'
@@ -237,6 +556,16 @@ def create_patterns(args):
     return [Pattern(name, pattern) for name, pattern in args.patterns]
 
 
+def create_cache(args, experiments):
+
+    from patas.cache import ResultCache
+
+    if not any(x.cache for x in experiments):
+        return None
+
+    return ResultCache(args.cache_dir, args.cache_size)
+
+
 def create_linebreakers(args):
 
     from patas.parse import Pattern
@@ -257,9 +586,24 @@ def do_explore(argv):
     if args.type == 'grid':
         append_grid_experiment(args, experiments)
 
+    elif args.type == 'hyperband':
+        append_hyperband_experiment(args, experiments)
+
     elif args.type == 'cdeepso':
         append_cdeepso_experiment(args, experiments)
 
+    elif args.type == 'strategy':
+        append_strategy_experiment(args, experiments)
+
+    elif args.type in ['random', 'lhs', 'sobol']:
+        append_sampling_experiment(args, experiments)
+
+    elif args.type == 'bayes':
+        append_bayes_experiment(args, experiments)
+
+    elif args.type == 'refine':
+        append_refine_experiment(args, experiments)
+
     for x in experiments:
         x.task_filters = task_filters.pop(x.name, [])
     
@@ -270,7 +614,13 @@ def do_explore(argv):
         names = ', '.join([x for x in task_filters])
         warn(f"Ignoring task-filters for the following experiments: {names}")
 
-    scheduler = Scheduler(node_filters, args.output_folder, args.redo_tasks, args.confirmed, experiments, clusters, args.quiet)
+    if args.cache:
+        for x in experiments:
+            x.cache = True
+
+    cache = create_cache(args, experiments)
+
+    scheduler = Scheduler(node_filters, args.output_folder, args.redo_tasks, args.confirmed, experiments, clusters, args.quiet, cache)
     scheduler.start()
 
 
@@ -286,6 +636,24 @@ def do_parse(argv):
     parser.start(args.experiment_folder, args.output_file)
 
 
+def do_export(argv):
+
+    from patas.store import open_store
+
+    args   = argparsers.parse_patas_export(argv)
+    folder = expand_path(args.experiment_folder)
+    store  = open_store(folder)
+
+    if store is None:
+        abort(f"Experiment folder has no packed store: {folder}")
+
+    for task_idd in args.task_ids:
+        if store.state(task_idd) is None:
+            abort(f"Task not found: {task_idd}")
+
+        store.export(task_idd, os.path.join(expand_path(args.output_folder or folder), task_idd))
+
+
 def do_query(argv):
 
     from patas.query import QueryEngine
@@ -1,4 +1,6 @@
 from patas.utils import expand_path, abort, warn
+from patas.compression import find_output, open_output
+from patas.store import open_store
 from glob import glob
 
 import yaml
@@ -51,6 +53,72 @@ class Pattern:
             return False
 
 
+class ScorePattern(Pattern):
+
+    def __init__(self, pattern):
+
+        super().__init__("score", pattern)
+
+    def parse(self, stdout):
+
+        # Returns the last value captured in the task output, as a float
+
+        if stdout is None:
+            return None
+
+        if isinstance(stdout, bytes):
+            stdout = stdout.decode("utf-8", errors="replace")
+
+        score = None
+
+        for m in self.regex.finditer(stdout):
+            score = m.groups()[0]
+
+        try:
+            return float(score) if score is not None else None
+        except ValueError:
+            return None
+
+
+class WatchPattern(Pattern):
+
+    # Captures the progress of a task while it runs. With one group, the
+    # group is the value and the step is the number of matches so far. With
+    # two groups, the first is the step and the second is the value.
+
+    def __init__(self, pattern):
+
+        super().__init__("watch", pattern)
+        self.matches = 0
+
+    def reset(self):
+
+        self.matches = 0
+
+    def match(self, line):
+
+        # Returns (step, value) if the line reports progress, None otherwise
+
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="replace")
+
+        m = self.regex.search(line)
+
+        if m is None:
+            return None
+
+        self.matches += 1
+        groups        = m.groups()
+
+        try:
+            if len(groups) >= 2:
+                return float(groups[0]), float(groups[1])
+            else:
+                return self.matches, float(groups[0])
+        except (TypeError, ValueError):
+            return None
+
+
 class TaskParser:
 
     def __init__(self, experiment_info_filepath, patterns, linebreakers, verbose=False):
@@ -101,14 +169,9 @@ class TaskParser:
         # Filepaths for each task files
 
         info_filepath   = os.path.join(task_folderpath, "info.yml")
-        output_filepath = os.path.join(task_folderpath, "success.stdout")
+        output_filepath = find_output(task_folderpath, "success.stdout")
         done_filepath   = os.path.join(task_folderpath, ".success")
 
-        # We clean the output row, as we will populate it with the data from the task
-
-        for i in range(len(self.row_values)):
-            self.row_values[i] = None
-
         # If the done file does not exist, it means the task was not completed, this is likely a user mistake
 
         if not os.path.exists(done_filepath):
@@ -119,7 +182,21 @@ class TaskParser:
 
         with open(info_filepath, "r") as fin:
             data = yaml.load(fin, Loader=yaml.FullLoader)
-        
+
+        # Compressed outputs are decompressed while they are read
+
+        with open_output(output_filepath) as fin:
+            self.digest_data(data, fin, writer)
+
+    def digest_data(self, data, lines, writer):
+
+        # Writes the rows of a task, given its info and the lines of its output
+
+        # We clean the output row, as we will populate it with the data from the task
+
+        for i in range(len(self.row_values)):
+            self.row_values[i] = None
+
         # Load the variable values
 
         for name, value in data["combination"].items():
@@ -166,27 +243,26 @@ class TaskParser:
 
         pattern:Pattern = None
 
-        with open(output_filepath, "r") as fin:
-            for line in fin:
+        for line in lines:
 
-                # Check all patterns and capture the desired variables
+            # Check all patterns and capture the desired variables
 
-                for pattern in self.patterns:
-                    if pattern.check(line):
-                        self.row_values[self.header_map[pattern.get_name()]] = pattern.get_value()
-                
-                # If line breaks are defined, we will write a row every time one of them is detected and clean the captured patterns so far
+            for pattern in self.patterns:
+                if pattern.check(line):
+                    self.row_values[self.header_map[pattern.get_name()]] = pattern.get_value()
+            
+            # If line breaks are defined, we will write a row every time one of them is detected and clean the captured patterns so far
 
-                for linebreaker in self.linebreakers:
-                    if linebreaker.check(line):
+            for linebreaker in self.linebreakers:
+                if linebreaker.check(line):
 
-                        writer.writerow(self.row_values)
+                    writer.writerow(self.row_values)
 
-                        break_idd += 1
-                        self.row_values[self.header_map["break_id"]] = str(break_idd)
+                    break_idd += 1
+                    self.row_values[self.header_map["break_id"]] = str(break_idd)
 
-                        for pattern in self.patterns:
-                            self.row_values[self.header_map[pattern.get_name()]] = None
+                    for pattern in self.patterns:
+                        self.row_values[self.header_map[pattern.get_name()]] = None
         
         # If we are not using line breakers, we always write the row after all lines were processed
 
@@ -220,6 +296,22 @@ class ExperimentParser:
             writer = csv.writer(fout, delimiter=",")
             writer.writerow(parser.header_names)
 
+            # Experiments with a packed store keep their tasks in it, only
+            # the artifacts and the store itself are folders
+
+            store = open_store(experiment_folder)
+
+            if store is not None:
+                for task_idd in sorted(store.ids(), key=lambda x: (len(x), x)):
+                    if store.state(task_idd) != 'success':
+                        warn("Task not completed:", task_idd)
+                        continue
+
+                    data, outputs = store.get(task_idd)
+                    parser.digest_data(data, outputs[-1].decode('utf-8', errors='replace').splitlines(keepends=True), writer)
+
+                return
+
             for task_folderpath in task_folderpaths:
                 if os.path.isdir(task_folderpath):
                     parser.digest(task_folderpath, writer)
@@ -0,0 +1,85 @@
+# Lists the logical CPUs of a node as CPU,CORE,NODE lines. Machines
+# without lscpu are read from /sys, with cores named by package and id.
+
+TOPOLOGY_CMD = (
+    b'lscpu -p=CPU,CORE,NODE 2> /dev/null || '
+    b'for c in /sys/devices/system/cpu/cpu[0-9]* ; do '
+    b'n=$(ls -d $c/node[0-9]* 2> /dev/null | head -n 1) ; '
+    b'echo "${c##*cpu},$(cat $c/topology/physical_package_id)-$(cat $c/topology/core_id),${n##*node}" ; '
+    b'done'
+)
+
+
+def parse_topology(output):
+
+    # Returns (cpu, core, numa node) for each logical CPU in the output of
+    # TOPOLOGY_CMD. Machines without NUMA information have a single node 0.
+
+    topology = []
+
+    for line in output.decode('utf-8', errors='replace').splitlines():
+        line = line.strip()
+
+        if not line or line.startswith('#'):
+            continue
+
+        cells = line.split(',')
+
+        try:
+            cpu = int(cells[0])
+        except ValueError:
+            continue
+
+        core = cells[1] if len(cells) > 1 and cells[1] else str(cpu)
+        node = int(cells[2]) if len(cells) > 2 and cells[2].isdigit() else 0
+
+        topology.append((cpu, core, node))
+
+    return topology
+
+
+def assign_cpus(topology, worker, workers, cores=None):
+
+    # Dedicated CPUs of a worker, as (cpus, numa nodes). Each worker takes
+    # `cores` consecutive physical cores, with their hyperthreads, walking
+    # the cores node by node so a worker only spans several NUMA nodes when
+    # it does not fit in one. If the node has fewer cores than the workers
+    # need, logical CPUs are assigned instead, and they are shared once all
+    # of them are taken. Without `cores`, the cores are split evenly.
+
+    physical = {}
+
+    for cpu, core, node in topology:
+        physical.setdefault((node, core), []).append(cpu)
+
+    units = sorted(physical.items(), key=lambda x: (x[0][0], min(x[1])))
+    units = [(node, sorted(cpus)) for (node, _), cpus in units]
+
+    if workers * (cores or 1) > len(units):
+        units = [(node, [cpu]) for node, cpus in units for cpu in cpus]
+
+    if not units:
+        return [], []
+
+    size   = cores or max(1, len(units) // workers)
+    chosen = [units[(worker * size + i) % len(units)] for i in range(size)]
+
+    cpus  = sorted({cpu for _, cpus in chosen for cpu in cpus})
+    nodes = sorted({node for node, _ in chosen})
+
+    return cpus, nodes
+
+
+def format_cpus(cpus):
+
+    # Compact list of CPUs, as accepted by taskset and numactl, like 0-3,8,10-11
+
+    ranges = []
+
+    for cpu in sorted(cpus):
+        if ranges and ranges[-1][1] == cpu - 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
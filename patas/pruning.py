@@ -0,0 +1,58 @@
+from .index import combination_key
+from .utils import error
+
+import statistics
+
+
+PRUNING_RULES = ['median', 'threshold']
+
+
+class PruningRule:
+
+    # Decides whether a running task must stop, from the values it reports
+    # while running. The median rule stops a task whose value at some step
+    # is worse than the median of the values other combinations reported at
+    # the same step, once at least min_peers of them did. The threshold rule
+    # stops a task whose value is worse than a fixed threshold. Nothing is
+    # stopped before the step warmup.
+
+    def __init__(self, rule, goal='max', threshold=None, min_peers=5, warmup=0):
+
+        if rule not in PRUNING_RULES:
+            error(f"Invalid pruning rule: {rule}")
+
+        if rule == 'threshold' and threshold is None:
+            error("The threshold pruning rule requires a threshold")
+
+        self.rule      = rule
+        self.goal      = goal
+        self.threshold = threshold
+        self.min_peers = min_peers
+        self.warmup    = warmup
+        self.steps     = {}  # step -> {combination key -> value}
+
+    def _worse(self, value, reference):
+
+        return value < reference if self.goal == 'max' else value > reference
+
+    def report(self, combination, step, value):
+
+        # Records a value and returns True if the task reporting it must stop
+
+        key    = combination_key(combination)
+        values = self.steps.setdefault(step, {})
+
+        values[key] = value
+
+        if step < self.warmup:
+            return False
+
+        if self.rule == 'threshold':
+            return self._worse(value, self.threshold)
+
+        peers = [v for k, v in values.items() if k != key]
+
+        if len(peers) < self.min_peers:
+            return False
+
+        return self._worse(value, statistics.median(peers))
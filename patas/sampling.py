@@ -0,0 +1,172 @@
+from .utils import error
+
+import numpy as np
+
+
+# Primitive polynomials and initial direction numbers from Joe and Kuo
+# (new-joe-kuo-6.21201) for dimensions 2 to 64. The polynomial includes its
+# leading and trailing bits, the first dimension is the van der Corput sequence.
+
+SOBOL_DIRECTIONS = [
+    (3, [1]),
+    (7, [1, 3]),
+    (11, [1, 3, 1]),
+    (13, [1, 1, 1]),
+    (19, [1, 1, 3, 3]),
+    (25, [1, 3, 5, 13]),
+    (37, [1, 1, 5, 5, 17]),
+    (41, [1, 1, 5, 5, 5]),
+    (47, [1, 1, 7, 11, 19]),
+    (55, [1, 1, 5, 1, 1]),
+    (59, [1, 1, 1, 3, 11]),
+    (61, [1, 3, 5, 5, 31]),
+    (67, [1, 3, 3, 9, 7, 49]),
+    (91, [1, 1, 1, 15, 21, 21]),
+    (97, [1, 3, 1, 13, 27, 49]),
+    (103, [1, 1, 1, 15, 7, 5]),
+    (109, [1, 3, 1, 15, 13, 25]),
+    (115, [1, 1, 5, 5, 19, 61]),
+    (131, [1, 3, 7, 11, 23, 15, 103]),
+    (137, [1, 3, 7, 13, 13, 15, 69]),
+    (143, [1, 1, 3, 13, 7, 35, 63]),
+    (145, [1, 3, 5, 9, 1, 25, 53]),
+    (157, [1, 3, 1, 13, 9, 35, 107]),
+    (167, [1, 3, 1, 5, 27, 61, 31]),
+    (171, [1, 1, 5, 11, 19, 41, 61]),
+    (185, [1, 3, 5, 3, 3, 13, 69]),
+    (191, [1, 1, 7, 13, 1, 19, 1]),
+    (193, [1, 3, 7, 5, 13, 19, 59]),
+    (203, [1, 1, 3, 9, 25, 29, 41]),
+    (211, [1, 3, 5, 13, 23, 1, 55]),
+    (213, [1, 3, 7, 3, 13, 59, 17]),
+    (229, [1, 3, 1, 3, 5, 53, 69]),
+    (239, [1, 1, 5, 5, 23, 33, 13]),
+    (241, [1, 1, 7, 7, 1, 61, 123]),
+    (247, [1, 1, 7, 9, 13, 61, 49]),
+    (253, [1, 3, 3, 5, 3, 55, 33]),
+    (285, [1, 3, 1, 15, 31, 13, 49, 245]),
+    (299, [1, 3, 5, 15, 31, 59, 63, 97]),
+    (301, [1, 3, 1, 11, 11, 11, 77, 249]),
+    (333, [1, 3, 1, 11, 27, 43, 71, 9]),
+    (351, [1, 1, 7, 15, 21, 11, 81, 45]),
+    (355, [1, 3, 7, 3, 25, 31, 65, 79]),
+    (357, [1, 3, 1, 1, 19, 11, 3, 205]),
+    (361, [1, 1, 5, 9, 19, 21, 29, 157]),
+    (369, [1, 3, 7, 11, 1, 33, 89, 185]),
+    (391, [1, 3, 3, 3, 15, 9, 79, 71]),
+    (397, [1, 3, 7, 11, 15, 39, 119, 27]),
+    (425, [1, 1, 3, 1, 11, 31, 97, 225]),
+    (451, [1, 1, 1, 3, 23, 43, 57, 177]),
+    (463, [1, 3, 7, 7, 17, 17, 37, 71]),
+    (487, [1, 3, 1, 5, 27, 63, 123, 213]),
+    (501, [1, 1, 3, 5, 11, 43, 53, 133]),
+    (529, [1, 3, 5, 5, 29, 17, 47, 173, 479]),
+    (539, [1, 3, 3, 11, 3, 1, 109, 9, 69]),
+    (545, [1, 1, 1, 5, 17, 39, 23, 5, 343]),
+    (557, [1, 3, 1, 5, 25, 15, 31, 103, 499]),
+    (563, [1, 1, 1, 11, 11, 17, 63, 105, 183]),
+    (601, [1, 1, 5, 11, 9, 29, 97, 231, 363]),
+    (607, [1, 1, 5, 15, 19, 45, 41, 7, 383]),
+    (617, [1, 3, 7, 7, 31, 19, 83, 137, 221]),
+    (623, [1, 1, 1, 3, 23, 15, 111, 223, 83]),
+    (631, [1, 1, 5, 13, 31, 15, 55, 25, 161]),
+    (637, [1, 1, 3, 13, 25, 47, 39, 87, 257]),
+]
+
+SOBOL_BITS = 32
+
+
+class RandomSequence:
+
+    # Uniform random points, each one generated independently from (seed, index)
+
+    def __init__(self, dims, seed=0):
+
+        self.dims = dims
+        self.seed = seed
+
+    def __getitem__(self, index):
+
+        return np.random.default_rng([self.seed, index]).random(self.dims)
+
+
+class LatinHypercubeSequence:
+
+    # Latin hypercube samples, generated in independent batches. Every batch
+    # of size batch is a latin hypercube on its own, so extending the number
+    # of samples adds new batches and never changes the existing points.
+
+    def __init__(self, dims, seed=0, batch=100):
+
+        self.dims   = dims
+        self.seed   = seed
+        self.batch  = batch
+        self._cache = None
+
+    def __getitem__(self, index):
+
+        batch_idd, offset = divmod(index, self.batch)
+
+        if self._cache is None or self._cache[0] != batch_idd:
+            rng = np.random.default_rng([self.seed, batch_idd])
+            permutations = np.array([rng.permutation(self.batch) for _ in range(self.dims)])
+            jitter = rng.random((self.dims, self.batch))
+            self._cache = (batch_idd, (permutations + jitter) / self.batch)
+
+        return self._cache[1][:, offset]
+
+
+class SobolSequence:
+
+    # Sobol low discrepancy sequence with random access, point i is computed
+    # directly from the gray code of i. A digital shift derived from the seed
+    # randomizes the sequence while keeping its low discrepancy.
+
+    def __init__(self, dims, seed=0, scramble=True):
+
+        if dims > len(SOBOL_DIRECTIONS) + 1:
+            error(f"Sobol sequences support up to {len(SOBOL_DIRECTIONS) + 1} dimensions")
+
+        self.dims       = dims
+        self.directions = np.array([self._directions(d) for d in range(dims)], dtype=np.uint64)
+
+        if scramble:
+            rng = np.random.default_rng(seed)
+            self.shift = rng.integers(0, 2**SOBOL_BITS, dims, dtype=np.uint64)
+        else:
+            self.shift = np.zeros(dims, dtype=np.uint64)
+
+    def _directions(self, dim):
+
+        if dim == 0:
+            return [1 << (SOBOL_BITS - k - 1) for k in range(SOBOL_BITS)]
+
+        poly, m = SOBOL_DIRECTIONS[dim - 1]
+        s = poly.bit_length() - 1
+        a = (poly >> 1) & ((1 << (s - 1)) - 1)
+        m = list(m)
+
+        for k in range(s, SOBOL_BITS):
+            value = m[k - s] ^ (m[k - s] << s)
+
+            for l in range(1, s):
+                if (a >> (s - 1 - l)) & 1:
+                    value ^= m[k - l] << l
+
+            m.append(value)
+
+        return [m[k] << (SOBOL_BITS - k - 1) for k in range(SOBOL_BITS)]
+
+    def __getitem__(self, index):
+
+        gray   = index ^ (index >> 1)
+        result = self.shift.copy()
+        k      = 0
+
+        while gray:
+            if gray & 1:
+                result ^= self.directions[:, k]
+            gray >>= 1
+            k += 1
+
+        return result.astype(float) / 2**SOBOL_BITS
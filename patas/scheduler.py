@@ -1,12 +1,21 @@
-from .utils import expand_path, error, warn, info, debug, critical, abort, readlines, estimate, human_time, quote, colors, confirm, plural
-from .schemas import ClusterSchema, NodeSchema, Task
-
-from multiprocessing import Process, Queue
-from subprocess import Popen, PIPE, STDOUT
-from datetime import datetime
-
+from .utils import expand_path, is_local, error, warn, info, debug, critical, abort, readlines, estimate, human_time, quote, colors, confirm, plural
+from .schemas import ClusterSchema, NodeSchema, Task, artifacts_dir
+from .cache import parse_size
+from .pinning import TOPOLOGY_CMD, parse_topology, assign_cpus, format_cpus
+from .capture import OutputCapture, split_lines, MAX_LINE
+
+from multiprocessing import Process, Queue, Value, BoundedSemaphore
+from subprocess import Popen, PIPE, STDOUT, TimeoutExpired
+from datetime import datetime, timedelta
+
+import contextlib
+import tempfile
+import shutil
 import select
+import signal
 import shlex
+import math
+import re
 import copy
 import time
 import pty
@@ -18,6 +27,7 @@ KEY_SSH_ON  = b'74ffc7c4-a6ad-4315-94cb-59d045a230c0'
 KEY_SSH_OFF = b'93dfc971-fa64-4beb-a24e-d8874738b9ca'
 KEY_CMD_ON  = b'15e6896c-3ea7-42a0-aa32-23e2ab3c0e12'
 KEY_CMD_OFF = b'e04a4348-8092-46a6-8e0c-d30d10c86fb3'
+KEY_TASK_OFF = b'5b0c2a7e-61d4-4d0f-9a59-3f1e7c2d8b46'
 
 build_echo_cmd = lambda x: b" echo -e \"%s\"" % x.replace(b"-", b"-\b-")
 
@@ -26,6 +36,11 @@ ECHO_SSH_OFF = build_echo_cmd(KEY_SSH_OFF)
 ECHO_CMD_ON  = build_echo_cmd(KEY_CMD_ON)
 ECHO_CMD_OFF = b" echo -en \"\n $? %s\"" % KEY_CMD_OFF.replace(b"-", b"-\b-")
 
+# Marks the end of each task in a batch. The key is split in two quoted halves,
+# so it only appears in the output, never in the echo of the command line.
+
+ECHO_TASK_OFF = b" printf \"\\n%%s %%s %%s\\n\" $? \"${EPOCHREALTIME:-0}\" \"%s\"\"%s\"" % (KEY_TASK_OFF[:8], KEY_TASK_OFF[8:])
+
 
 class WorkerMessage(dict):
 
@@ -63,8 +78,47 @@ class BashExecutor:
 
         self.is_alive = True
         self.node = node
+        self.env = None
+        self.wrapper = []
     
-    def execute(self, initrc, cmds):
+    def bind(self, wrapper):
+
+        # Every task starts under wrapper, like numactl with its options
+
+        self.wrapper = wrapper
+
+    def setup(self, initrc, cmds):
+
+        # Each task runs in a new bash, so the environment left by the setup
+        # commands is captured and given to the next commands, as if they all
+        # ran in the same shell
+
+        fd, filepath = tempfile.mkstemp(prefix='patas-env-')
+        os.close(fd)
+
+        try:
+            success, stdout, status = self.execute(initrc, b" && ".join(cmds) + b" && env -0 > \"%s\"" % filepath.encode())
+
+            if success:
+                with open(filepath, 'rb') as fin:
+                    env = dict(x.decode('utf-8', errors='replace').split('=', 1) for x in fin.read().split(b'\0') if b'=' in x)
+
+                # Variables that describe the setup shell itself are restored
+
+                for name in ['_', 'SHLVL', 'PWD', 'OLDPWD']:
+                    if name in os.environ:
+                        env[name] = os.environ[name]
+                    else:
+                        env.pop(name, None)
+
+                self.env = env
+
+        finally:
+            os.remove(filepath)
+
+        return success, stdout, status
+
+    def execute(self, initrc, cmds, on_output=None, capture=None):
 
         if type(cmds) is not list:
             cmds = [cmds]
@@ -77,8 +131,14 @@ class BashExecutor:
         cmd_str = " bash -c " + quote(cmd_str)
         # print(cmd_str)
         
-        ps = Popen(shlex.split(cmd_str), stdout=PIPE, stderr=STDOUT)
-        stdout, _ = ps.communicate()
+        if on_output is None and capture is None:
+            ps = Popen(self.wrapper + shlex.split(cmd_str), stdout=PIPE, stderr=STDOUT, env=self.env)
+            stdout, _ = ps.communicate()
+        else:
+            ps = Popen(self.wrapper + shlex.split(cmd_str), stdout=PIPE, stderr=STDOUT, env=self.env, start_new_session=True)
+            stdout = read_output(ps.stdout.fileno(), ps.pid, on_output, capture)
+            ps.wait()
+
         status = ps.returncode
         # print(status)
 
@@ -89,6 +149,309 @@ class BashExecutor:
         return (status == 0), stdout, status
 
 
+
+class LocalExecutor:
+
+    # Executes tasks in the local machine with as little overhead as
+    # possible. Commands without shell syntax are spawned directly, with the
+    # variables of the task in their environment. Everything else goes to a
+    # bash kept open by the worker, through pipes, which is also where the
+    # setup commands run. Tasks run in subshells of it, so they inherit what
+    # the setup prepared without changing the shell for the next ones.
+
+    def __init__(self, node):
+
+        self.node = node
+        self.env = None
+        self.cwd = os.getcwd()
+        self.wrapper = []
+        self.is_alive = True
+        self.shell = Popen(["bash"], stdin=PIPE, stdout=PIPE, stderr=STDOUT, start_new_session=True)
+
+    def bind(self, wrapper):
+
+        # Starts the shell again under wrapper, so it and everything it runs
+        # inherit its bindings. Commands spawned directly are wrapped too.
+        # Only called before the setup, the new shell has nothing to lose.
+
+        self.stop()
+
+        self.wrapper = wrapper
+        self.is_alive = True
+        self.shell = Popen(wrapper + ["bash"], stdin=PIPE, stdout=PIPE, stderr=STDOUT, start_new_session=True)
+
+    def setup(self, initrc, cmds):
+
+        # Runs in the shell itself, so its changes persist. The resulting
+        # environment is captured for the commands spawned directly.
+
+        fd, filepath = tempfile.mkstemp(prefix='patas-env-')
+        os.close(fd)
+
+        try:
+            script = b"{ %s ; } < /dev/null" % b" ; ".join(initrc + [b" && ".join(cmds + [b"env -0 > \"%s\"" % filepath.encode()])])
+            success, stdout, status = self._shell(script)
+
+            if success:
+                with open(filepath, 'rb') as fin:
+                    env = dict(x.decode('utf-8', errors='replace').split('=', 1) for x in fin.read().split(b'\0') if b'=' in x)
+
+                for name in ['_', 'SHLVL', 'PWD', 'OLDPWD']:
+                    if name in os.environ:
+                        env[name] = os.environ[name]
+                    else:
+                        env.pop(name, None)
+
+                self.env = env
+
+        finally:
+            os.remove(filepath)
+
+        return success, stdout, status
+
+    def execute(self, initrc, cmds, on_output=None, capture=None):
+
+        if type(cmds) is not list:
+            cmds = [cmds]
+
+        return self._shell(b"( %s ) < /dev/null" % b" ; ".join(initrc + cmds), on_output, capture)
+
+    def run(self, initrc, env_variables, work_dir, commands, on_output=None, capture=None):
+
+        # Spawns the commands directly when neither them nor the variables
+        # need a shell, otherwise executes them like execute does
+
+        argvs = [split_simple_command(x) for x in commands]
+
+        if not commands or any(x is None for x in argvs) or any(needs_shell(x) for x in env_variables.values()):
+            return self.execute(initrc, " ; ".join(commands).encode(), on_output, capture)
+
+        env = dict(self.env if self.env is not None else os.environ)
+
+        for name, value in env_variables.items():
+            env[name] = expand_variables(value, env)
+
+        capture = OutputCapture() if capture is None else capture
+
+        try:
+            os.chdir(expand_variables(work_dir, env) if work_dir else self.cwd)
+        except OSError as e:
+            capture.write(b"cd: %s\n" % str(e).encode())
+            return False, capture.getvalue(), 1
+
+        for argv in argvs:
+            success, status = self._spawn(argv, env, on_output, capture)
+
+            if not success:
+                break
+
+        return success, capture.getvalue(), status
+
+    def _spawn(self, argv, env, on_output, capture):
+
+        # Output goes to capture, shared by all the commands of the task
+
+        program = shutil.which(argv[0], path=env.get('PATH')) if '/' not in argv[0] else argv[0]
+
+        if program is None:
+            capture.write(b"%s: command not found\n" % argv[0].encode())
+            return False, 127
+
+        if self.wrapper:
+            argv, program = self.wrapper + [program] + argv[1:], self.wrapper[0]
+
+        r, w    = os.pipe()
+        actions = [
+            (os.POSIX_SPAWN_OPEN, 0, '/dev/null', os.O_RDONLY, 0),
+            (os.POSIX_SPAWN_DUP2, w, 1),
+            (os.POSIX_SPAWN_DUP2, w, 2),
+            (os.POSIX_SPAWN_CLOSE, r),
+            (os.POSIX_SPAWN_CLOSE, w),
+        ]
+
+        try:
+            pid = os.posix_spawn(program, argv, env, file_actions=actions, setsid=True)
+        except OSError as e:
+            os.close(r)
+            os.close(w)
+            capture.write(b"%s: %s\n" % (argv[0].encode(), str(e).encode()))
+            return False, 126
+
+        os.close(w)
+
+        read_output(r, pid, on_output, capture)
+        os.close(r)
+
+        _, wstatus = os.waitpid(pid, 0)
+        status     = os.waitstatus_to_exitcode(wstatus)
+
+        return status == 0, status
+
+    def _shell(self, script, on_output=None, capture=None):
+
+        # Writes the script to the shell and reads its output up to the
+        # marker with its exit status. A script that must stop takes the
+        # shell with it, the worker starts a new executor afterwards. Only
+        # the end of the output that may hold the beginning of the marker is
+        # kept aside, the rest goes to capture as it arrives.
+
+        marker  = b' ; printf "\\n%%s %%s\\n" $? "%s""%s"\n' % (KEY_CMD_OFF[:8], KEY_CMD_OFF[8:])
+        fd      = self.shell.stdout.fileno()
+        data    = b''
+        partial = b''
+        keep    = len(KEY_CMD_OFF) + 16
+        capture = OutputCapture() if capture is None else capture
+
+        try:
+            self.shell.stdin.write(script + marker)
+            self.shell.stdin.flush()
+        except OSError:
+            self.is_alive = False
+            return False, None, None
+
+        pattern = re.compile(rb'\n(-?\d+) ' + re.escape(KEY_CMD_OFF) + rb'\n')
+
+        while True:
+            r, _, _ = select.select([fd], [], [], 0.5)
+            chunk   = os.read(fd, 65536) if r else None
+
+            if chunk == b'':
+                self.is_alive = False
+                capture.write(data)
+                return False, capture.getvalue(), None
+
+            if chunk:
+                data  += chunk
+                match  = pattern.search(data)
+
+                if match:
+                    capture.write(data[:match.start()])
+                    status = int(match.group(1))
+                    return status == 0, capture.getvalue(), status
+
+                # The marker starts with a line break
+
+                cut  = data.rfind(b'\n', max(0, len(data) - keep))
+                cut  = len(data) if cut == -1 else cut
+                capture.write(data[:cut])
+                data = data[cut:]
+
+                if on_output is not None:
+                    lines, partial = split_lines(partial, chunk)
+
+                    if on_output(lines):
+                        self.stop()
+                        capture.write(data)
+                        return False, capture.getvalue(), -signal.SIGTERM
+
+            elif on_output is not None and on_output([]):
+                self.stop()
+                capture.write(data)
+                return False, capture.getvalue(), -signal.SIGTERM
+
+    def stop(self):
+
+        for sig in [signal.SIGTERM, signal.SIGKILL]:
+            try:
+                os.killpg(self.shell.pid, sig)
+                self.shell.wait(10)
+                break
+            except OSError:
+                break
+            except TimeoutExpired:
+                continue
+
+        self.is_alive = False
+
+
+SHELL_CHARACTERS = set('|&;<>()$`\\*?[]#~!{}\n')
+SHELL_BUILTINS   = {'cd', 'export', 'source', '.', 'exit', 'set', 'unset', 'alias', 'eval', 'exec', 'ulimit', 'umask', 'trap', 'wait'}
+
+
+def split_simple_command(cmd):
+
+    # Arguments of a command that does not need a shell, or None. Quotes are
+    # fine, expansions, redirections, pipes, globs and builtins are not.
+
+    if any(c in SHELL_CHARACTERS for c in cmd):
+        return None
+
+    try:
+        argv = shlex.split(cmd)
+    except ValueError:
+        return None
+
+    if not argv or argv[0] in SHELL_BUILTINS or '=' in argv[0]:
+        return None
+
+    return argv
+
+
+def expand_variables(value, env):
+
+    # Expands $NAME and ${NAME} like the shell would, for values given to commands spawned directly
+
+    if '$' not in value:
+        return value
+
+    return re.sub(r'\$(?:\{(\w+)\}|(\w+))', lambda m: env.get(m.group(1) or m.group(2), ''), value)
+
+
+def needs_shell(value):
+
+    # Values with substitutions or escapes that expand_variables does not handle
+
+    return '`' in value or '\\' in value or '$(' in value or '"' in value
+
+
+def read_output(fd, pid, on_output, capture=None):
+
+    # Reads the output of a process until it closes it, passing complete
+    # lines to on_output. If it returns True, the process group is terminated,
+    # and killed if it is still alive after a few seconds. The output is
+    # written to capture, and the whole output is kept without it.
+
+    capture  = OutputCapture() if capture is None else capture
+    partial  = b''
+    stopping = None
+
+    while True:
+        r, _, _ = select.select([fd], [], [], 0.5) if on_output is not None else ([fd], None, None)
+        data    = os.read(fd, 65536) if r else None
+
+        if data == b'':
+            break
+
+        lines = []
+
+        if data:
+            capture.write(data)
+            lines, partial = split_lines(partial, data)
+
+        if on_output is None:
+            continue
+
+        if stopping is None and on_output(lines):
+            stopping = time.time()
+            signal_group(pid, signal.SIGTERM)
+
+        elif stopping is not None and time.time() - stopping > 10:
+            signal_group(pid, signal.SIGKILL)
+
+    if partial and on_output is not None and stopping is None:
+        on_output([partial])
+
+    return capture.getvalue()
+
+
+def signal_group(pid, sig):
+
+    try:
+        os.killpg(pid, sig)
+    except OSError:
+        pass
+
+
 class SSHExecutor:
 
     def __init__(self, node):
@@ -184,14 +547,32 @@ class SSHExecutor:
             time.sleep(1)
             conn_try += 1
 
-    def execute(self, initrc, cmds):
+    def setup(self, initrc, cmds):
+
+        # The remote shell is persistent, tasks inherit whatever the setup commands change
+
+        return self.execute(initrc, b" && ".join(cmds))
+
+    def bind(self, wrapper):
+
+        # Replaces the remote shell by a new one running under wrapper. The
+        # new shell reads the next lines typed in the terminal, so the
+        # connection stays the same. Only called before the setup.
+
+        os.write(self.master, b" exec %s bash\n" % shlex.join(wrapper).encode())
+
+    def execute(self, initrc, cmds, on_output=None, capture=None):
 
         if type(cmds) is not list:
             cmds = [cmds]
 
         lines = []
-        output_start = 0
+        output_start = None
         output_end = None
+        written = False
+        continued = False
+        stopping = False
+        capture = OutputCapture() if capture is None else capture
 
         p1 = b" ; ".join(initrc)
         p2 = ECHO_CMD_ON
@@ -206,7 +587,12 @@ class SSHExecutor:
             if self.popen.poll() is not None:
                 return False, None, None
             
-            r, _, _ = select.select([self.master], [], [])
+            r, _, _ = select.select([self.master], [], [], None if on_output is None else 0.5)
+
+            if on_output is not None and not r:
+                if not stopping and on_output([]):
+                    stopping = self._interrupt()
+                continue
 
             if not self.master in r:
                 warn("Unexpected file descriptor while searching for command output")
@@ -233,7 +619,82 @@ class SSHExecutor:
                 status = lines[output_end].strip().split()[0].decode("utf-8") if output_end < len(lines) else "255"
                 break
 
-        return (status == "0"), b'\n'.join(lines[output_start:output_end]), status
+            # Complete lines of output go to capture and are passed to
+            # on_output as they arrive, the last line may still be incomplete.
+            # Once it grows beyond MAX_LINE, like a progress bar redrawn with
+            # \r, it goes to capture too and the rest of it continues there.
+            # The end marker always starts a line, it is never flushed.
+
+            if output_start is not None:
+                complete = lines[output_start:-1]
+                del lines[output_start:-1]
+
+                for line in complete:
+                    capture.write(b'\n' + line if written and not continued else line)
+                    written, continued = True, False
+
+                if len(lines) > output_start and len(lines[-1]) > MAX_LINE:
+                    capture.write(b'\n' + lines[-1] if written and not continued else lines[-1])
+                    written, continued = True, True
+                    lines[-1] = b''
+
+                if on_output is not None and not stopping and on_output([x.rstrip(b'\r\n') for x in complete]):
+                    stopping = self._interrupt()
+
+        for line in lines[output_start or 0:output_end]:
+            capture.write(b'\n' + line if written and not continued else line)
+            written, continued = True, False
+
+        return (status == "0"), capture.getvalue(), status
+
+    def _interrupt(self):
+
+        # Interrupts the running command and prints the end marker again, as
+        # the interrupted command line never reaches it
+
+        os.write(self.master, b'\x03')
+        os.write(self.master, ECHO_CMD_OFF + b'\n')
+
+        return True
+
+
+class Coalescing:
+
+    # Decides how many consecutive tasks of an experiment are sent to a
+    # worker in a single invocation. A fixed size is used as is. With 'auto',
+    # batches start small and grow until the overhead of an invocation, its
+    # duration minus the time spent in the tasks, is at most target of it.
+
+    def __init__(self, size, target=0.1, max_size=64):
+
+        self.auto     = size == 'auto'
+        self.current  = 2 if self.auto else int(size)
+        self.target   = target
+        self.max_size = max_size
+        self.overhead = None
+        self.task     = None
+
+    def observe(self, duration, durations):
+
+        # Exponential moving averages of the overhead per invocation and of the duration of a task
+
+        if not self.auto or not durations:
+            return
+
+        overhead = max(0.0, duration - sum(durations))
+        task     = sum(durations) / len(durations)
+
+        self.overhead = overhead if self.overhead is None else 0.8 * self.overhead + 0.2 * overhead
+        self.task     = task     if self.task     is None else 0.8 * self.task     + 0.2 * task
+
+        wanted       = self.overhead * (1.0 - self.target) / (self.target * max(self.task, 1e-6))
+        self.current = max(1, min(self.max_size, math.ceil(wanted)))
+
+    def size(self, pending, workers):
+
+        # Batches never take more than a fair share of the pending tasks
+
+        return max(1, min(self.current, math.ceil(pending / max(1, workers))))
 
 
 class WorkerProcess:
@@ -247,17 +708,23 @@ class WorkerProcess:
         self.env_variables = env_variables
         self.process = None
         self.queue = None
+        self.kill = None
+        self.ready = {}
+        self.caller = None
+        self.cpus = None
+        self.collectors = None
 
     def start(self, queue_master):
 
         self.queue   = Queue()
+        self.kill    = Value('q', -1)
         self.process = Process(target=self.run, args=(self.queue, queue_master))
         self.process.start()
 
     def run(self, queue_in, queue_master):
 
         try:
-            executor = self.executor_builder()
+            executor = self._start_executor()
 
             msg_out = WorkerMessage("ready", self.worker_idd_in_lab)
             queue_master.put(msg_out)
@@ -268,16 +735,26 @@ class WorkerProcess:
                 if msg_in.action == "execute":
 
                     msg_out = WorkerMessage("finished", self.worker_idd_in_lab)
-                    msg_out.task = self.execute(msg_in, executor)
+
+                    if "tasks" in msg_in:
+                        msg_out.tasks, msg_out.duration = self.execute_batch(msg_in, executor)
+                    else:
+                        msg_out.task = self.execute(msg_in, executor, queue_master)
+
                     queue_master.put(msg_out)
 
                     if not executor.is_alive:
-                        executor = self.executor_builder()
+                        executor = self._start_executor()
 
                     msg_out = WorkerMessage("ready", self.worker_idd_in_lab)
                     queue_master.put(msg_out)
                 
                 elif msg_in.action == "terminate":
+                    self._teardown(executor)
+
+                    if self.caller is not None:
+                        self.caller.stop()
+
                     break
                 
                 else:
@@ -289,25 +766,145 @@ class WorkerProcess:
         except KeyboardInterrupt:
             pass
 
-    def execute(self, msg_in, executor):
+    def _setuprc(self, work_dir=None):
+
+        # Setup and teardown commands see the variables of the worker, but not the ones of a task
+
+        initrc = [b"export %s=\"%s\"" % (a.encode(), b.encode()) for a, b in self.env_variables.items()]
+
+        if work_dir:
+            initrc.insert(0, b"cd \"%s\"" % work_dir.encode())
+
+        return initrc
+
+    def _start_executor(self):
+
+        # Creates the executor and runs the setup commands of the node in it.
+        # Experiment setups run again in new executors.
+
+        executor   = self.executor_builder()
+        node       = self.executor_builder.node
+        self.ready = {}
+
+        if node.pin:
+            self._pin(executor, node)
+
+        if node.setup:
+            success, stdout, status = executor.setup(self._setuprc(), [x.encode() for x in node.setup])
+
+            if not success:
+                warn(f"Setup of node {node.name} failed with exit code {status} in worker {self.worker_idd_in_lab}")
+                os.write(sys.stdout.fileno(), stdout or b'')
+
+        return executor
+
+    def _pin(self, executor, node):
+
+        # Restricts the worker to its dedicated CPUs and their memory. When
+        # the node has numactl, tasks run under numactl --membind and
+        # --physcpubind. Otherwise the shells that persist between tasks are
+        # pinned with taskset, and memory is not bound, only allocated in the
+        # NUMA node of the CPU touching it by default. The worker process
+        # itself is pinned in local nodes. Tasks also receive the CPUs and
+        # nodes in PATAS_CPUS and PATAS_NUMA_NODES.
+
+        if self.cpus is None:
+            success, stdout, _ = executor.execute([b'true'], TOPOLOGY_CMD)
+            topology           = parse_topology(stdout or b'') if success else []
+
+            if not topology:
+                warn(f"Could not discover the CPUs of node {node.name}, worker {self.worker_idd_in_lab} will not be pinned")
+                return
+
+            self.cpus, nodes = assign_cpus(topology, self.worker_idd_in_node, node.workers, node.cores_per_worker)
+
+            self.env_variables["PATAS_CPUS"]       = format_cpus(self.cpus)
+            self.env_variables["PATAS_NUMA_NODES"] = format_cpus(nodes)
+
+        cpus  = self.env_variables["PATAS_CPUS"]
+        nodes = self.env_variables["PATAS_NUMA_NODES"]
+
+        success, stdout, _ = executor.execute([b'true'], b'command -v numactl')
+        numactl            = (stdout or b'').decode('utf-8', errors='replace').strip() if success else ''
+
+        if numactl:
+            executor.bind([numactl, f'--membind={nodes}', f'--physcpubind={cpus}'])
+
+        elif self.worker_idd_in_node == 0:
+            warn(f"numactl not found in node {node.name}, its workers are pinned to their CPUs but their memory is not bound")
+
+        if isinstance(executor, (LocalExecutor, SSHExecutor)) and not numactl:
+            success, stdout, status = executor.setup([b'true'], [b'taskset -apc %s $$ > /dev/null' % cpus.encode()])
+
+            if not success:
+                warn(f"Could not pin worker {self.worker_idd_in_lab} to CPUs {cpus}, exit code {status}")
+                os.write(sys.stdout.fileno(), stdout or b'')
+
+        if not isinstance(executor, SSHExecutor):
+            os.sched_setaffinity(0, self.cpus)
+
+    def _teardown(self, executor):
+
+        # Teardowns run in reverse order of their setups, experiments first
+
+        if not executor.is_alive:
+            return
+
+        node = self.executor_builder.node
+
+        for work_dir, teardown in reversed(list(self.ready.values())):
+            if teardown:
+                executor.setup(self._setuprc(work_dir), [x.encode() for x in teardown])
+
+        if node.teardown:
+            executor.setup(self._setuprc(), [x.encode() for x in node.teardown])
+
+    def _setup_experiment(self, task:Task, msg_in, executor):
+
+        # Runs the setup of the experiment before its first task in this
+        # executor. Returns None on success, or the failed attempt.
+
+        if task.experiment_idd in self.ready:
+            return None
+
+        if msg_in.setup:
+            started_at = datetime.now()
+            success, stdout, status = executor.setup(self._setuprc(task.work_dir), [x.encode() for x in msg_in.setup])
+            ended_at = datetime.now()
+
+            if not success:
+                return {
+                    'env_variables': self.env_variables,
+                    'started_at': started_at,
+                    'ended_at': ended_at,
+                    'duration': (ended_at - started_at).total_seconds(),
+                    'stdout': stdout or b'',
+                    'status': status,
+                    'setup': True,
+                }
+
+        self.ready[task.experiment_idd] = (task.work_dir, msg_in.teardown)
+        return None
+
+    def execute(self, msg_in, executor, queue_master):
 
         task:Task = msg_in.task
 
-        # Prepare the initrc
+        # A task whose experiment setup failed fails too, without being executed
 
-        env_variables = copy.copy(self.env_variables)
-        env_variables["PATAS_WORK_DIR"] = task.work_dir
-        env_variables["PATAS_ATTEMPT"] = str(task.tries + 1)
+        failed = self._setup_experiment(task, msg_in, executor)
 
-        for k,v in task.combination.items():
-            env_variables["PATAS_VAR_" + k] = str(v)
+        if failed is not None:
+            task.success = False
+            task.attempts.append(failed)
+            return task
 
-        initrc = [b"export %s=\"%s\"" % (a.encode(), b.encode()) for a, b in env_variables.items()]
+        checkpoint = "PATAS_CHECKPOINT_DIR" in task.env
 
-        if task.work_dir:
-            initrc.insert(0, b"cd \"%s\"" % task.work_dir.encode())
+        if checkpoint and not task.tries and not task.fresh:
+            task.env["PATAS_RESUME"] = "1" if self._left_checkpoint(task, executor) else "0"
 
-        initrc.insert(0, b'set -e')
+        env_variables, initrc, envrc = self._initrc(task)
 
         # Prepare the command line we will execute
 
@@ -315,9 +912,30 @@ class WorkerProcess:
 
         # Execute this task
 
+        env_variables["PATAS_WORK_DIR"] = task.work_dir
+        env_variables["PATAS_ATTEMPT"] = str(task.tries + 1)
+
+        on_output = self._watcher(task, queue_master) if task.watch is not None else None
+        capture   = OutputCapture.from_limits(msg_in.output_limits)
+
+        # Tasks printing beyond the limit are stopped, and not retried
+
+        if capture.limit is not None:
+            on_output = capture.watch(on_output)
+
         started_at = datetime.now()
-        task.success, stdout, status = executor.execute(initrc, cmdline)
+
+        if msg_in.function and isinstance(executor, (BashExecutor, LocalExecutor)):
+            task.success, stdout, status = self._call(msg_in, executor, initrc, env_variables, on_output, capture)
+        elif isinstance(executor, LocalExecutor) and not checkpoint:
+            task.success, stdout, status = executor.run(initrc, env_variables, task.work_dir, task.commands, on_output, capture)
+        else:
+            task.success, stdout, status = executor.execute(initrc, cmdline, on_output, capture)
+
         ended_at = datetime.now()
+
+        task.pruned   = task.watch is not None and self.kill.value == task.token
+        task.exceeded = capture.exceeded and not task.success and not task.pruned
         duration = (ended_at - started_at).total_seconds()
 
         # Add result to the task results
@@ -331,16 +949,287 @@ class WorkerProcess:
             'status': status,
         }
 
+        result.update(capture.report())
+
+        if checkpoint:
+            result.update(self._checkpoint_usage(executor, envrc, task.success, duration))
+            result['resumed'] = env_variables["PATAS_RESUME"] == "1"
+
+        if task.artifacts:
+            result.update(self._collect(task, executor, envrc, msg_in.artifacts_limit))
+
         task.attempts.append(result)
         
         # Return True if the task succeeded
 
         return task
 
+    def _initrc(self, task:Task):
+
+        # Variables and commands that prepare the shell of a task. Returns
+        # them with the initrc without the checkpoint commands.
+
+        env_variables = copy.copy(self.env_variables)
+        env_variables["PATAS_WORK_DIR"] = task.work_dir
+        env_variables["PATAS_ATTEMPT"] = str(task.tries + 1)
+
+        for k,v in task.combination.items():
+            env_variables["PATAS_VAR_" + k] = str(v)
+
+        env_variables.update(task.env)
+
+        initrc = [b"export %s=\"%s\"" % (a.encode(), b.encode()) for a, b in env_variables.items()]
+
+        if task.work_dir:
+            initrc.insert(0, b"cd \"%s\"" % task.work_dir.encode())
+
+        initrc.insert(0, b'set -e')
+
+        # Checkpoints left by previous executions are kept for the task to
+        # validate, the folder is only emptied for tasks starting over
+
+        checkpoint = "PATAS_CHECKPOINT_DIR" in task.env
+        envrc      = list(initrc)
+
+        if checkpoint and task.fresh:
+            initrc.append(b'rm -rf "$PATAS_CHECKPOINT_DIR"')
+
+        if checkpoint:
+            initrc.append(b'mkdir -p "$PATAS_CHECKPOINT_DIR"')
+
+        return env_variables, initrc, envrc
+
+    def _left_checkpoint(self, task:Task, executor):
+
+        # Whether a previous execution left checkpoints for a first attempt,
+        # like one interrupted when the master stopped or one given up
+
+        _, _, envrc = self._initrc(task)
+        ok, stdout, _ = executor.execute(envrc, b'ls -A "$PATAS_CHECKPOINT_DIR" 2> /dev/null | head -n 1')
+
+        return bool(ok and stdout and stdout.strip())
+
+    def execute_batch(self, msg_in, executor):
+
+        # Executes several tasks in a single invocation of the executor. Each
+        # task runs in its own subshell, followed by a marker with its exit
+        # status and the time it ended, which splits the output afterwards.
+        # Returns the tasks and the duration of the whole invocation.
+
+        tasks:list[Task] = msg_in.tasks
+        failed           = self._setup_experiment(tasks[0], msg_in, executor)
+
+        if failed is not None:
+            for task in tasks:
+                task.success = False
+                task.attempts.append(failed)
+            return tasks, failed['duration']
+
+        envs    = []
+        envrcs  = []
+        scripts = [b' printf "%%s %%s\\n" "${EPOCHREALTIME:-0}" "%s""%s"' % (KEY_TASK_OFF[:8], KEY_TASK_OFF[8:])]
+
+        for task in tasks:
+            env_variables, initrc, envrc = self._initrc(task)
+            envs.append(env_variables)
+            envrcs.append(envrc)
+            scripts.append(b"( %s ; %s ) ;%s" % (b" ; ".join(initrc), " ; ".join(task.commands).encode(), ECHO_TASK_OFF))
+
+        started_at = datetime.now()
+        _, stdout, _ = executor.execute([b'true'], b" ; ".join(scripts))
+        ended_at   = datetime.now()
+        duration   = (ended_at - started_at).total_seconds()
+
+        # Segments alternate between outputs and the captures of each marker
+
+        parts   = re.split(rb'(?:(-?\d+) )?([0-9.,]+) ' + re.escape(KEY_TASK_OFF) + rb'\r?\n?', stdout or b'')
+        reports = [(parts[i], parts[i + 1], parts[i + 2]) for i in range(1, len(parts) - 2, 3)]
+        clock   = float(reports[0][1].replace(b',', b'.')) if reports else 0.0
+        elapsed = 0.0
+
+        for i, task in enumerate(tasks):
+            if i + 1 < len(reports):
+                status, end, output = reports[i + 1][0], float(reports[i + 1][1].replace(b',', b'.')), reports[i][2]
+                output = output.rstrip(b'\r\n')
+                output = output + b'\n' if output else output
+                status = int(status) if status is not None else None
+                spent  = end - clock if clock and end else duration / len(tasks)
+                clock  = end
+            else:
+                status, output, spent = None, b'', 0.0
+
+            task.success = status == 0
+            task.attempts.append({
+                'env_variables': envs[i],
+                'started_at': started_at + timedelta(seconds=elapsed),
+                'ended_at': started_at + timedelta(seconds=elapsed + spent),
+                'duration': round(spent, 6),
+                'stdout': output,
+                'status': status,
+                'batch': len(tasks),
+            })
+
+            if task.artifacts:
+                task.attempts[-1].update(self._collect(task, executor, envrcs[i], msg_in.artifacts_limit))
+
+            elapsed += spent
+
+        return tasks, duration
+
+    def _call(self, msg_in, executor, initrc, env_variables, on_output, capture):
+
+        # Local workers call the function in process, through a CallExecutor
+        # they keep between tasks. Its environment includes the one prepared
+        # by the setup commands.
+
+        from .call import CallExecutor
+
+        task:Task = msg_in.task
+        max_calls, max_memory = msg_in.recycle
+
+        if self.caller is None:
+            self.caller = CallExecutor()
+
+        self.caller.max_calls  = max_calls
+        self.caller.max_memory = parse_size(max_memory) if max_memory else None
+
+        # The checkpoint folder is prepared by the shell, as for commands
+
+        if "PATAS_CHECKPOINT_DIR" in task.env:
+            executor.execute(initrc, b"true")
+
+        env = dict(executor.env or os.environ)
+
+        for name, value in env_variables.items():
+            env[name] = expand_variables(value, env)
+
+        return self.caller.execute(msg_in.function, task.combination, env, task.work_dir, on_output, capture)
+
+    def _collect(self, task:Task, executor, initrc, limit):
+
+        # Copies the files matching the artifact globs of a task into its
+        # output folder, through the connection of the worker. Files are
+        # listed first, so the ones beyond the size limit are left behind,
+        # then streamed as a compressed tar. Only a few workers collect at
+        # the same time, the others keep executing their tasks meanwhile.
+
+        import tarfile
+        import base64
+        import io
+
+        usage = {'artifacts': [], 'artifacts_size': 0}
+
+        if not executor.is_alive:
+            return usage
+
+        patterns = b" ".join(x.encode() for x in task.artifacts)
+        limit    = parse_size(limit) if limit else None
+        files    = []
+        skipped  = []
+        size     = 0
+
+        with self.collectors if self.collectors is not None else contextlib.nullcontext():
+            cmd = b'shopt -s nullglob globstar ; for f in %s ; do find "$f" -type f -printf "%%s\t%%p\n" 2> /dev/null || true ; done' % patterns
+            ok, stdout, _ = executor.execute(initrc, cmd)
+
+            for line in (stdout or b'').decode('utf-8', errors='replace').splitlines() if ok else []:
+                length, _, filepath = line.strip('\r').partition('\t')
+
+                if not length.isdigit() or filepath in files:
+                    continue
+
+                if limit is not None and size + int(length) > limit:
+                    skipped.append(filepath)
+                    continue
+
+                files.append(filepath)
+                size += int(length)
+
+            if files:
+                cmd           = b'tar -czf - -- %s | base64' % b" ".join(quote(x).encode() for x in files)
+                ok, stdout, _ = executor.execute(initrc, cmd)
+
+                if not ok:
+                    warn(f"Could not collect the artifacts of task {task.task_idd}")
+                    return usage
+
+                folder = artifacts_dir(task)
+                shutil.rmtree(folder, ignore_errors=True)
+
+                with tarfile.open(fileobj=io.BytesIO(base64.b64decode(b"".join(stdout.split()))), mode='r:gz') as tar:
+                    if hasattr(tarfile, 'data_filter'):
+                        tar.extractall(folder, filter='data')
+                    else:
+                        tar.extractall(folder, [x for x in tar.getmembers() if not x.name.startswith('/') and '..' not in x.name.split('/')])
+
+        usage['artifacts']      = files
+        usage['artifacts_size'] = size
+
+        if skipped:
+            usage['artifacts_skipped'] = skipped
+
+        return usage
+
+    def _checkpoint_usage(self, executor, initrc, success, duration):
+
+        # Measures the checkpoint folder after an attempt: its size and how
+        # many seconds of the attempt it preserves, from the start of the
+        # attempt to its most recent file. The folder of a task that
+        # succeeded is no longer needed and is removed.
+
+        usage = {'checkpoint_size': None, 'checkpoint_saved': None}
+
+        if not executor.is_alive:
+            return usage
+
+        cmd = b'date +%s.%N ; find "$PATAS_CHECKPOINT_DIR" -type f -printf "%s %T@\\n"'
+
+        if success:
+            cmd += b' ; rm -rf "$PATAS_CHECKPOINT_DIR"'
+
+        try:
+            ok, stdout, _ = executor.execute(initrc, cmd)
+            lines         = [[float(x) for x in line.split()] for line in stdout.splitlines() if line.strip()] if ok else []
+        except (OSError, ValueError):
+            return usage
+
+        if not lines:
+            return usage
+
+        now, files = lines[0][0], lines[1:]
+
+        usage['checkpoint_size']  = int(sum(x[0] for x in files))
+        usage['checkpoint_saved'] = round(max(0.0, duration - (now - max(x[1] for x in files))), 3) if files else 0.0
+
+        return usage
+
+    def _watcher(self, task:Task, queue_master):
+
+        # Reports the progress captured in the live output to the scheduler,
+        # and tells the executor to stop once the scheduler prunes the task
+
+        task.watch.reset()
+
+        def on_output(lines):
+
+            for line in lines:
+                progress = task.watch.match(line)
+
+                if progress is not None:
+                    msg_out       = WorkerMessage("progress", self.worker_idd_in_lab)
+                    msg_out.token = task.token
+                    msg_out.step  = progress[0]
+                    msg_out.value = progress[1]
+                    queue_master.put(msg_out)
+
+            return self.kill.value == task.token
+
+        return on_output
+
 
 class Scheduler():
 
-    def __init__(self, node_filters, output_dir, redo_tasks, confirmed, experiments, clusters, quiet):
+    def __init__(self, node_filters, output_dir, redo_tasks, confirmed, experiments, clusters, quiet, cache=None):
 
         self.output_folder = expand_path(output_dir)
         self.node_filters  = node_filters
@@ -349,6 +1238,9 @@ class Scheduler():
         self.confirmed     = confirmed
         self.clusters      = clusters
         self.quiet         = quiet
+        self.cache         = cache
+        self.tokens        = 0
+        self.coalescing    = {}
         self.todo          = []
 
         self.workers:list[WorkerProcess] = None
@@ -358,9 +1250,46 @@ class Scheduler():
         os.makedirs(self.output_folder, exist_ok=True)
 
         self.show_summary(self.experiments, self.clusters, self.confirmed)
+        self._stage_inputs(self.clusters, self.node_filters)
+        self._check_stages(self.clusters, self.node_filters)
         self.workers = self._create_workers(self.clusters, self.node_filters)
         self._exec()
 
+    def _stage_inputs(self, clusters, node_filters):
+
+        # Copies the inputs of the experiments to the nodes that will execute them
+
+        experiments = [x for x in self.experiments if x.inputs]
+
+        if not experiments:
+            return
+
+        from .staging import Staging
+
+        staging = Staging(self._nodes(clusters, node_filters))
+
+        for experiment in experiments:
+            experiment.input_env = staging.stage(experiment.inputs, experiment.workdir)
+
+    def _check_stages(self, clusters, node_filters):
+
+        # Stage outputs stay in the workdir of the node that ran the stage, so
+        # tasks on other machines only find them if the workdir is shared
+
+        experiments = [x for x in self.experiments if getattr(x, 'stages', None)]
+        machines    = {'localhost' if is_local(x.hostname) else x.hostname for x in self._nodes(clusters, node_filters)}
+
+        if len(machines) < 2:
+            return
+
+        for experiment in experiments:
+            warn(f"Experiment {experiment.name} has stages and runs on {len(machines)} machines, its workdir must be on storage shared by all of them")
+
+    def _nodes(self, clusters, node_filters):
+
+        return [node for cluster in clusters for node in cluster.nodes
+                if not node_filters or any(all(tag in node.tags for tag in filter) for filter in node_filters)]
+
     def push_todo(self, task):
         self.todo.append(task)
 
@@ -370,6 +1299,15 @@ class Scheduler():
     def push_filtered(self, task):
         self.filtered.append(task)
 
+    def push_given_up(self, task):
+        self.given_up.append(task)
+
+    def push_pruned(self, task):
+        self.pruned.append(task)
+
+    def push_exceeded(self, task):
+        self.exceeded.append(task)
+
     def show_summary(self, experiments, clusters, confirmed):
 
         # Display experiments
@@ -416,7 +1354,7 @@ class Scheduler():
 
         if issues:
             names = ', '.join([x.name for x in issues])
-            warn(f"The following experiments have changed their configuration, proceeding will restart all their tasks: {names}")
+            warn(f"The following experiments have changed their configuration, proceeding will archive the results that no longer match it: {names}")
 
         # Confirm
 
@@ -426,7 +1364,7 @@ class Scheduler():
         # Clean diverging experiments
 
         if issues:
-            warn("Cleaning diverging experiments...")
+            warn("Archiving diverging results...")
             for experiment in issues:
                 experiment.clean_output()
 
@@ -448,6 +1386,11 @@ class Scheduler():
         cluster:ClusterSchema = None
         node:NodeSchema = None
 
+        # Workers share a limit on how many of them collect artifacts at once
+
+        streams    = min([x.artifacts_streams for x in self.experiments if x.artifacts], default=None)
+        collectors = BoundedSemaphore(streams) if streams else None
+
         for cluster in clusters:
 
             worker_idd_in_cluster = -1
@@ -472,11 +1415,14 @@ class Scheduler():
                     if node_filters and not any(all(tag in node.tags for tag in filter) for filter in node_filters):
                         continue
 
-                    if node.hostname in ['localhost', '127.0.0.1']:
-                        builder = ExecutorBuilder(BashExecutor, node)
+                    if node.executor == 'ssh' or (node.executor is None and not is_local(node.hostname)):
+                        builder = ExecutorBuilder(SSHExecutor, node)
+
+                    elif node.executor == 'local':
+                        builder = ExecutorBuilder(LocalExecutor, node)
 
                     else:
-                        builder = ExecutorBuilder(SSHExecutor, node)
+                        builder = ExecutorBuilder(BashExecutor, node)
 
                     env_variables = {
                         "PATAS_CLUSTER_NAME": cluster.name,
@@ -491,6 +1437,7 @@ class Scheduler():
                     }
 
                     worker = WorkerProcess(worker_idd_in_lab, worker_idd_in_cluster, worker_idd_in_node, builder, env_variables)
+                    worker.collectors = collectors
                     workers.append(worker)
         
         if not workers:
@@ -507,6 +1454,9 @@ class Scheduler():
         self.done     = []
         self.given_up = []
         self.filtered = []
+        self.cached   = []
+        self.pruned   = []
+        self.exceeded = []
 
         self.idle     = []
         self.ended    = []
@@ -545,10 +1495,23 @@ class Scheduler():
             print()
             info("Starting main loop...")
 
-            while self.todo or self.doing:
+            while self.todo or self.doing or self._request_tasks(max(1, len(self.idle))):
+
+                self._dispatch()
+
+                # Tasks completed from the cache may have emptied the queues
+
+                if not self.todo and not self.doing:
+                    continue
 
                 msg_in = self.queue.get()
 
+                # Progress reports are frequent, they do not change the queues
+
+                if msg_in.action == "progress":
+                    self._on_task_progress(msg_in)
+                    continue
+
                 if not self.quiet:
                     l1 = str(len(self.todo    ))
                     l2 = str(len(self.doing   ))
@@ -578,6 +1541,9 @@ class Scheduler():
 
         except KeyboardInterrupt:
 
+            for experiment in self.experiments:
+                experiment.flush_results()
+
             print("Operation interrupted")
             return
 
@@ -588,6 +1554,7 @@ class Scheduler():
 
         for experiment in self.experiments:
             experiment.on_finish()
+            experiment.flush_results()
 
         # Terminate workers
 
@@ -632,8 +1599,11 @@ class Scheduler():
 
         print(f"    Time to execute experiments: {human_time(main_loop_duration)}")
         print(f"    Time to terminate workers:   {human_time(terminate_loop_duration)}")
-        print(f"    Tasks requested: {len(self.done) + len(self.given_up)}")
+        print(f"    Tasks requested: {len(self.done) + len(self.given_up) + len(self.cached) + len(self.pruned) + len(self.exceeded)}")
         print(f"    Tasks completed: {len(self.done)}")
+        print(f"    Tasks cached:    {len(self.cached)}")
+        print(f"    Tasks pruned:    {len(self.pruned)}")
+        print(f"    Tasks exceeded:  {len(self.exceeded)}")
         print(f"    Tasks given up:  {len(self.given_up)}")
         print()
 
@@ -645,50 +1615,195 @@ class Scheduler():
 
     def _on_worker_is_ready(self, msg_in):
 
-        # If there is a task to be done, send it back to the worker
+        # Move the worker to the list of idle workers and send it a task, if there is one
 
-        if self.todo:
-            msg_out = WorkerMessage("execute")
-            msg_out.task = self.todo.pop()
-            msg_out.task.assigned_to = msg_in.source
+        self.idle.append(msg_in.source)
+        self._dispatch()
 
-            self.doing.append(msg_out.task)
-            self.workers[msg_in.source].queue.put(msg_out)
+    def _request_tasks(self, count):
 
-            # if not self.quiet:
-            #     print(f"Sending task {msg_out.task.task_idd} to worker {msg_in.source}")
-        
-        # Otherwise, move the worker to the like of idle workers
+        # Ask experiments that create tasks on demand for up to count new tasks,
+        # returns True if any task was created
 
-        else:
-            self.idle.append(msg_in.source)
+        before = len(self.todo)
 
-            # if not self.quiet:
-            #     print(f"Moving worker {msg_in.source} to idle")
+        for experiment in self.experiments:
+            missing = count - (len(self.todo) - before)
 
-    def _on_task_finished(self, msg_in):
+            if missing <= 0:
+                break
 
-        # Find the position of the task we just received in the message
+            experiment.on_workers_idle(self, missing)
 
-        for i, x in enumerate(self.doing):
-            if x.assigned_to == msg_in.source:
+        return len(self.todo) != before
+
+    def _dispatch(self):
+
+        # Experiments may push new tasks when others complete, send them to idle workers
+
+        if len(self.idle) > len(self.todo):
+            self._request_tasks(len(self.idle) - len(self.todo))
+
+        while self.todo and self.idle:
+            task = self.todo.pop()
+
+            if self._complete_from_cache(task):
+                continue
+
+            batch = self._coalesce(task)
+
+            if len(batch) == 1:
+                self._execute(task, self.idle.pop())
+            else:
+                self._execute_batch(batch, self.idle.pop())
+
+    def _coalesce(self, task:Task):
+
+        # Groups the task with the next pending tasks of the same experiment.
+        # Stages, functions, watched tasks, tasks with bounded outputs and
+        # tasks with checkpoints are always executed alone.
+
+        experiment = self.experiments[task.experiment_idd]
+
+        if experiment.coalesce == 1 or experiment.function or task.stage is not None or experiment.watch(task) is not None or experiment.output_limits() or experiment.checkpoint_dir(task) is not None:
+            return [task]
+
+        if task.experiment_idd not in self.coalescing:
+            self.coalescing[task.experiment_idd] = Coalescing(experiment.coalesce)
+
+        size  = self.coalescing[task.experiment_idd].size(len(self.todo) + 1, len(self.workers))
+        batch = [task]
+
+        while len(batch) < size and self.todo and self.todo[-1].experiment_idd == task.experiment_idd and self.todo[-1].stage is None:
+            other = self.todo.pop()
+
+            if not self._complete_from_cache(other):
+                batch.append(other)
+
+        return batch
+
+    def _prepare(self, task:Task, worker_idd):
+
+        # Each execution gets a new token, so a worker only stops the
+        # execution the scheduler has pruned
+
+        self.tokens += 1
+
+        experiment = self.experiments[task.experiment_idd]
+        checkpoint = experiment.checkpoint_dir(task)
+
+        task.assigned_to = worker_idd
+        task.token       = self.tokens
+        task.watch       = experiment.watch(task)
+        task.artifacts   = experiment.artifact_patterns(task)
+
+        task.env.update(experiment.input_env)
+
+        # Retries resume from the checkpoints saved by the previous attempts
+
+        if checkpoint is not None:
+            task.env["PATAS_CHECKPOINT_DIR"] = checkpoint
+            task.env["PATAS_RESUME"]         = "1" if task.tries else "0"
+            task.fresh                       = experiment.redo_tasks and not task.tries
+
+        msg_out = WorkerMessage("execute")
+        msg_out.setup = experiment.setup
+        msg_out.teardown = experiment.teardown
+        msg_out.function = experiment.function
+        msg_out.recycle = (experiment.function_recycle, experiment.function_memory)
+        msg_out.artifacts_limit = experiment.artifacts_limit
+        msg_out.output_limits = experiment.output_limits()
+
+        self.doing.append(task)
+        return msg_out
+
+    def _execute(self, task:Task, worker_idd):
+
+        # Sends the task to a worker
+
+        msg_out = self._prepare(task, worker_idd)
+        msg_out.task = task
+
+        self.workers[worker_idd].queue.put(msg_out)
+
+    def _execute_batch(self, tasks, worker_idd):
+
+        # Sends several tasks to a worker, executed in a single invocation
+
+        for task in tasks:
+            msg_out = self._prepare(task, worker_idd)
+
+        msg_out.tasks = tasks
+
+        self.workers[worker_idd].queue.put(msg_out)
+
+    def _on_task_progress(self, msg_in):
+
+        # A running task reported a value, prune it if its experiment decides so
+
+        for task in self.doing:
+            if task.assigned_to == msg_in.source and task.token == msg_in.token:
                 break
         else:
-            critical(f"Received finished event for task {msg_in.task.task_idd}, which was not found inside the doing list")
             return
-        
-        # Retrieve the task we sent the worker
 
-        task_sent:Task = self.doing[i]
+        worker = self.workers[msg_in.source]
 
-        # Retrieve the task we received back
+        if worker.kill.value == task.token:
+            return
 
-        task:Task = msg_in.task
+        if self.experiments[task.experiment_idd].on_task_progress(self, task, msg_in.step, msg_in.value):
+            worker.kill.value = task.token
+
+    def _complete_from_cache(self, task:Task):
+
+        # Completes the task with a result from the cache, without executing it
+
+        experiment = self.experiments[task.experiment_idd]
+
+        if self.cache is None or not experiment.cache or task.attempts:
+            return False
+
+        hit = self.cache.get(experiment.cache_key(self.cache, task))
+
+        if hit is None:
+            return False
+
+        task.cached, attempt = hit
+        task.success         = True
+        task.attempts.append(attempt)
 
-        # Check if they are the same, otherwise something weird is happening
+        self.cached.append(task)
+        experiment.on_task_completed(self, task)
 
-        if not task.task_idd == task_sent.task_idd:
-            critical("Received finished event for a task that was not the task we found in the doing list")
+        return True
+
+    def _on_task_finished(self, msg_in):
+
+        if "tasks" not in msg_in:
+            self._on_task_result(msg_in.source, msg_in.task)
+            return
+
+        # Batches report all their tasks at once, and how long the whole invocation took
+
+        tasks      = msg_in.tasks
+        coalescing = self.coalescing.get(tasks[0].experiment_idd)
+
+        if coalescing is not None:
+            coalescing.observe(msg_in.duration, [x.attempts[-1]['duration'] for x in tasks if x.attempts and x.attempts[-1]['status'] is not None])
+
+        for task in tasks:
+            self._on_task_result(msg_in.source, task)
+
+    def _on_task_result(self, source, task:Task):
+
+        # Find the position of the task we just received, among the ones we sent the worker
+
+        for i, x in enumerate(self.doing):
+            if x.assigned_to == source and x.task_idd == task.task_idd and x.experiment_idd == task.experiment_idd:
+                break
+        else:
+            critical(f"Received finished event for task {task.task_idd}, which was not found inside the doing list")
             return
     
         # This is a valid task, proceed
@@ -697,6 +1812,24 @@ class Scheduler():
         task.tries += 1
         del self.doing[i]
 
+        # Pruned tasks did not fail, they are neither reported nor retried
+
+        if task.pruned:
+            self.pruned.append(task)
+            experiment.on_task_completed(self, task)
+            info(f"Pruned task {task.task_idd}")
+            self._dispatch()
+            return
+
+        # Tasks stopped by the output limit would print as much again, they are not retried
+
+        if task.exceeded:
+            self.exceeded.append(task)
+            experiment.on_task_completed(self, task)
+            warn(f"Task {task.task_idd} stopped, its output exceeded the limit of {experiment.output_limit}")
+            self._dispatch()
+            return
+
         # Print stdout if the task has failed
 
         if not task.success and task.attempts:
@@ -709,7 +1842,12 @@ class Scheduler():
 
         if task.success:
             self.done.append(task)
+
+            if self.cache is not None and experiment.cache:
+                self.cache.put(experiment.cache_key(self.cache, task), task.attempts[-1])
+
             experiment.on_task_completed(self, task)
+            self._dispatch()
 
             # if not self.quiet:
             #     print(f"Moving task {task.task_idd} to done")
@@ -720,19 +1858,12 @@ class Scheduler():
             self.given_up.append(task)
             experiment.on_task_completed(self, task)
             critical(f"Giving up on task {task.task_idd}, max_tries reached.")
+            self._dispatch()
         
         # If a worker is available, ask it to execute the task again
 
         elif self.idle:
-            worker_idd = self.idle.pop()
-
-            task.assigned_to = worker_idd
-            self.doing.append(task)
-
-            msg_out = WorkerMessage("execute")
-            msg_out.task = task
-
-            self.workers[worker_idd].queue.put(msg_out)
+            self._execute(task, self.idle.pop())
 
             # if not self.quiet:
             #     print(f"Reassigning task {task.task_idd} to new worker {worker_idd} after fail")
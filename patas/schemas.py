@@ -1,7 +1,17 @@
-from .utils import error, warn, abort, clean_folder, indent_lines, plural
+from .utils import error, warn, info, abort, clean_folder, indent_lines, plural
+from .stats import ci_width, required_samples
+from .cache import link_or_copy, parse_size
+from .index import TaskIndex, combination_key, task_key
+from .domains import ArithmeticDomain, GeometricDomain, GlobDomain, LinesDomain, ShardDomain
+from .constraints import compile_constraints
+from datetime import datetime
 from functools import reduce
+from bisect import insort
+from glob import glob
 
 import hashlib
+import shutil
+import math
 import base64
 import yaml
 import copy
@@ -25,6 +35,34 @@ def format_as_dict(obj):
     return obj
 
 
+def format_as_options(obj):
+
+    # Like format_as_dict, but schemas only keep their type, the properties
+    # loaded from a file and the options that differ from their defaults, so
+    # saved files only list what was set. Signatures still use
+    # format_as_dict, they must not change.
+
+    if isinstance(obj, Schema):
+        defaults = obj.__class__().__dict__
+        loaded   = obj.__dict__.get('_loaded', ())
+        obj      = {k:v for k,v in obj.__dict__.items() if k == 'type' or k in loaded or k not in defaults or differs(v, defaults[k])}
+
+    if isinstance(obj, list):
+        return [format_as_options(x) for x in obj]
+
+    if isinstance(obj, dict):
+        return {k:format_as_options(v) for k,v in obj.items() if not k.startswith('_')}
+
+    return format_as_dict(obj)
+
+
+def differs(a, b):
+
+    try:
+        return bool(a != b)
+    except (TypeError, ValueError):
+        return True
+
 
 class Schema:
 
@@ -32,6 +70,7 @@ class Schema:
         
         if name in data:
             setattr(self, name, data[name])
+            self.__dict__.setdefault('_loaded', set()).add(name)
         
         elif mandatory:
             error(f"Missing required property in {self.__class__.__name__}: {name}")
@@ -55,6 +94,16 @@ class Task:
         self.commands        = cmdlines
         self.assigned_to     = None
         self.success         = None
+        self.cache_key       = None
+        self.cached          = None
+        self.stage           = None
+        self.env             = {}
+        self.watch           = None
+        self.token           = None
+        self.pruned          = False
+        self.exceeded        = False
+        self.fresh           = False
+        self.artifacts       = []
         self.attempts        = []
         self.tries           = 0
     
@@ -64,6 +113,14 @@ class Task:
         return f"{self.experiment_idd} {self.combination_idd} {self.repeat_idd} {self.task_idd} {combination} {self.commands}"
 
 
+def artifacts_dir(task:Task):
+
+    # Where the worker leaves the artifacts of a task, until they are moved
+    # into its folder together with the rest of its results
+
+    return os.path.join(os.path.dirname(task.output_dir), f".{os.path.basename(task.output_dir)}.artifacts")
+
+
 class NodeSchema(Schema):
 
     def __init__(self, data=None):
@@ -79,6 +136,11 @@ class NodeSchema(Schema):
         self.hostname    = ""
         self.port        = 22
         self.workers     = 1
+        self.setup       = []
+        self.teardown    = []
+        self.executor    = None
+        self.pin         = False
+        self.cores_per_worker = None
 
         if data is not None:
             self.init_from(data)
@@ -91,6 +153,17 @@ class NodeSchema(Schema):
         self.load_property('user', data)
         self.load_property('port', data)
         self.load_property('name', data)
+        self.load_property('setup', data)
+        self.load_property('teardown', data)
+        self.load_property('executor', data)
+        self.load_property('pin', data)
+        self.load_property('cores_per_worker', data)
+
+        if self.executor not in [None, 'local', 'bash', 'ssh']:
+            error(f"Invalid property value in {self.__class__.__name__}: executor must be local, bash or ssh")
+
+        if self.cores_per_worker is not None and self.cores_per_worker < 1:
+            error(f"Invalid property value in {self.__class__.__name__}: cores_per_worker must be at least 1")
 
         return self
 
@@ -124,6 +197,19 @@ class NodeSchema(Schema):
 
         ]
 
+        if self.setup:
+            lines.append(f"setup: {self.setup}")
+
+        if self.teardown:
+            lines.append(f"teardown: {self.teardown}")
+
+        if self.executor:
+            lines.append(f"executor: {self.executor}")
+
+        if self.pin:
+            lines.append(f"pin: {self.pin}")
+            lines.append(f"cores_per_worker: {self.cores_per_worker or 'auto'}")
+
         lines = '\n'.join(lines)
         return indent_lines(lines, indent) if indent else lines
 
@@ -183,26 +269,55 @@ class ListVariableSchema(Schema):
 
         return self
 
+    def signature(self):
+
+        return self.values
+
+    def decode(self, u):
+
+        # Maps u in [0, 1] to one of the values
+
+        return self.values[min(int(u * len(self.values)), len(self.values) - 1)]
+
+    def sample(self, u):
+
+        return self.decode(u)
+
+    def encode(self, value):
+
+        try:
+            return (self.values.index(value) + 0.5) / len(self.values)
+        except ValueError:
+            return None
+
 
 class ArithmeticVariableSchema(Schema):
     
     def __init__(self, data=None):
 
-        self.type   = 'arithmetic'
-        self.name   = None
-        self.values = []
-        self.step   = 1
-        self.min    = 0
-        self.max    = 10
+        self.type       = 'arithmetic'
+        self.name       = None
+        self.step       = 1
+        self.min        = 0
+        self.max        = 10
+        self.continuous = False
 
         if data is not None:
             self.init_from(data)
 
-        self.update()
-    
-    def update(self):
-        from numpy import arange
-        self.values = arange(self.min, self.max, self.step).tolist()
+    @property
+    def values(self):
+
+        # Lazy domain, the same values as numpy.arange(min, max, step)
+
+        try:
+            return ArithmeticDomain(self.min, self.max, self.step)
+        except ValueError as e:
+            error(f"Invalid arithmetic variable {self.name}: {e}")
+
+    def signature(self):
+
+        return self.values.signature()
     
     def init_from(self, data):
 
@@ -210,34 +325,58 @@ class ArithmeticVariableSchema(Schema):
         self.load_property('name', data)
         self.load_property('min', data)
         self.load_property('max', data)
+        self.load_property('continuous', data)
 
         return self
 
+    def decode(self, u):
+
+        # Maps u in [0, 1] to the continuous range [min, max]
+
+        value = self.min + float(u) * (self.max - self.min)
+        return round(value) if all(isinstance(x, int) for x in [self.min, self.max, self.step]) else value
+
+    def encode(self, value):
+
+        return (float(value) - self.min) / (self.max - self.min) if self.max != self.min else 0.0
+
+    def sample(self, u):
+
+        # Maps u in [0, 1] to a value, continuous or one of the values in the progression
+
+        if self.continuous:
+            return self.decode(u)
+
+        return self.values[min(int(u * len(self.values)), len(self.values) - 1)]
+
 
 class GeometricVariableSchema(Schema):
     
     def __init__(self, data=None):
 
-        self.type   = 'geometric'
-        self.name   = None
-        self.values = []
-        self.factor = 2
-        self.min    = 1
-        self.max    = 17
+        self.type       = 'geometric'
+        self.name       = None
+        self.factor     = 2
+        self.min        = 1
+        self.max        = 17
+        self.continuous = False
 
         if data is not None:
             self.init_from(data)
-    
-        self.update()
-    
-    def update(self):
-        
-        self.values = list()
-        current = self.first
-        
-        while current < self.last:
-            self.values.append(current)
-            current = current * self.factor
+
+    @property
+    def values(self):
+
+        # Lazy domain with the values min * factor^i smaller than max
+
+        try:
+            return GeometricDomain(self.min, self.max, self.factor)
+        except ValueError as e:
+            error(f"Invalid geometric variable {self.name}: {e}")
+
+    def signature(self):
+
+        return self.values.signature()
     
     def init_from(self, data):
 
@@ -245,309 +384,2083 @@ class GeometricVariableSchema(Schema):
         self.load_property('name', data)
         self.load_property('min', data)
         self.load_property('max', data)
+        self.load_property('continuous', data)
 
         return self
 
+    def decode(self, u):
 
-class BaseExperimentSchema(Schema):
+        # Maps u in [0, 1] to the continuous range [min, max], in log scale
+
+        value = self.min * (self.max / self.min) ** float(u)
+        return round(value) if all(isinstance(x, int) for x in [self.min, self.max, self.factor]) else value
+
+    def encode(self, value):
+
+        return math.log(float(value) / self.min) / math.log(self.max / self.min) if self.max != self.min else 0.0
+
+    def sample(self, u):
+
+        # Maps u in [0, 1] to a value, continuous in log scale or one of the values in the progression
+
+        if self.continuous:
+            return self.decode(u)
+
+        return self.values[min(int(u * len(self.values)), len(self.values) - 1)]
+
+
+class FileVariableSchema(Schema):
+
+    # Base for variables whose values come from the filesystem. The domain
+    # is created once and expanded lazily, the signature only depends on its
+    # parameters, so the values never reach info.yml or the summary.
 
     def __init__(self):
-        
-        self.type           = 'base'
-        self.redo_tasks     = False
-        self.name           = None
-        self.workdir        = None
-        self.task_filters   = []
-        self.experiment_idd = None
-        self.cmd            = []
-        self.max_tries      = 3
-        self.repeat         = 1
 
-    def init_from(self, data):
-        
-        self.load_property('name', data)
-        self.load_property('workdir', data)
-        self.load_property('cmd', data, mandatory=True)
-        self.load_property('max_tries', data)
-        self.load_property('repeat', data)
-        self.load_property('redo_tasks', data)
+        self._domain  = None
+        self._workdir = None
 
-        # TODO: Load task filters
+    def bind(self, workdir):
 
-        if not isinstance(self.cmd, list):
-            self.cmd = [self.cmd]
-        
-        return self
+        # Relative paths are found in the workdir of the experiment
 
-    def number_of_tasks(self):
-        raise NotImplementedError()
-        
-    def show_summary(self):
-        raise NotImplementedError()
+        self._workdir = workdir
+        self._domain  = None
 
-    def check_signature(self, output_folder):
-        raise NotImplementedError()
+    @property
+    def values(self):
 
-    def write_info(self):
-        raise NotImplementedError()
+        # The domain is expanded here, so missing or unreadable files are
+        # reported at once instead of wherever its values are first needed
 
-    def clean_output(self):
-        raise NotImplementedError()
+        if self._domain is None:
+            try:
+                domain = self.create_domain()
+                len(domain)
+                self._domain = domain
+            except (ValueError, OSError) as e:
+                error(f"Invalid {self.type} variable {self.name}: {e}")
 
-    def on_start(self, scheduler):
-        raise NotImplementedError()
+        return self._domain
 
-    def on_task_completed(self, scheduler, task:Task):
+    def create_domain(self):
         raise NotImplementedError()
 
-    def on_finish(self):
-        raise NotImplementedError()
+    def signature(self):
 
+        return self.values.signature()
 
-class GridExperimentSchema(BaseExperimentSchema):
+    def decode(self, u):
 
-    def __init__(self):
-        
-        super().__init__()
-        self.type = 'grid'
-        self.vars = []
-    
-    def init_from(self, data):
+        # Maps u in [0, 1] to one of the values
 
-        super().init_from(data)
+        return self.values[min(int(u * len(self.values)), len(self.values) - 1)]
 
-        if 'vars' in data:
-            self.vars = []
+    def sample(self, u):
 
-            for data2 in data['vars']:
+        return self.decode(u)
 
-                if 'type' in data2:
-                    if data2['type'] == 'list':
-                        self.vars.append(ListVariableSchema(data2))
+    def encode(self, value):
 
-                    elif data2['type'] == 'arithmetic':
-                        self.vars.append(ArithmeticVariableSchema(data2))
+        try:
+            return (self.values.index(value) + 0.5) / len(self.values)
+        except ValueError:
+            return None
 
-                    elif data2['type'] == 'geometric':
-                        self.vars.append(GeometricVariableSchema(data2))
 
-                    else:
-                        error(f"Invalid property value in {self.__class__.__name__}: type={data2['type']}")
-                else:
-                    error(f'Missing required property in {self.__class__.__name__}: type')
+class GlobVariableSchema(FileVariableSchema):
+
+    def __init__(self, data=None):
+
+        super().__init__()
+        self.type    = 'glob'
+        self.name    = None
+        self.pattern = None
+
+        if data is not None:
+            self.init_from(data)
+
+    def init_from(self, data):
+
+        self.load_property('pattern', data, mandatory=True)
+        self.load_property('name', data)
 
         return self
 
-    def number_of_tasks(self):
-        
-        return reduce(lambda a,b: a*len(b.values), self.vars, 1) * self.repeat
-    
-    def summary(self, indent=None):
+    def create_domain(self):
 
-        combinations = reduce(lambda a,b: a*len(b.values), self.vars, 1)
-        tasks = combinations * self.repeat
-        filters = len(self.task_filters)
+        return GlobDomain(self.pattern, self._workdir)
 
-        attrs = ['experiment_idd', 'redo_tasks', 'workdir', 'task_filters', 'cmd', 'max_tries', 'repeat']
 
-        lines  = [f"'{self.name}' ({tasks} {plural(tasks, 'task')}):"]
-        lines += [f"    {name}: {getattr(self, name)}" for name in attrs]
-        lines += [f"    combinations: {combinations}"]
-        lines += [f'    variables ({len(self.vars)}):']
-        lines += [f"        {v.name} = {str(v.values)}, len = {len(v.values)}" for v in self.vars]
-        
-        lines = '\n'.join(lines)
-        return indent_lines(lines, indent) if indent else lines
+class LinesVariableSchema(FileVariableSchema):
 
-    def _combinations(self, variables, combination={}):
+    def __init__(self, data=None):
 
-        if len(variables) == len(combination):
-            yield copy.copy(combination)
-        
-        else:
-            var  = variables[len(combination)]
-            name = var.name
-            
-            for value in var.values:
-                combination[name] = value
-                
-                for output in self._combinations(variables, combination):
-                    yield output
-                
-            del combination[name]
+        super().__init__()
+        self.type = 'lines'
+        self.name = None
+        self.file = None
 
-    def check_signature(self, output_folder):
-        
-        # Define filepaths
+        if data is not None:
+            self.init_from(data)
 
-        self.output_folder = os.path.join(output_folder, self.name)
-        self.info_filepath = os.path.join(self.output_folder, "info.yml")
+    def init_from(self, data):
 
-        # Data to identify the signature
+        self.load_property('file', data, mandatory=True)
+        self.load_property('name', data)
 
-        signature_data = {
-            "type"      : self.type,
-            "commands"  : self.cmd,
-            "variables" : {v.name:v.values for v in self.vars},
-            "workdir"   : self.workdir,
-            "repeat"    : self.repeat
-        }
+        return self
 
-        # Calculate signature
-        
-        key = hashlib.md5()
-        key.update(str(format_as_dict(signature_data)).encode())
-        signature = base64.b64encode(key.digest()).decode("utf-8")
+    def create_domain(self):
 
-        # Data to represent the experiment
+        return LinesDomain(self.file, self._workdir)
 
-        self.info = {
-            'name': self.name,
-            "type": self.type,
-            "commands": self.cmd,
-            "variables": {v.name:v.values for v in self.vars},
-            "workdir": self.workdir,
-            'task_filters': self.task_filters,
-            'signature': signature,
-            'commands': self.cmd,
-            'max_tries': self.max_tries,
-            'repeat': self.repeat,
-            'redo_tasks': self.redo_tasks,
-        }
 
-        # Load previous signature, if it exists
+class ShardVariableSchema(FileVariableSchema):
 
-        try:
-            with open(self.info_filepath, "r") as fin:
-                other = yaml.load(fin, Loader=yaml.FullLoader)
-        except:
-            other = None
+    def __init__(self, data=None):
 
-        # Return true if the signature do not exist or if they are the same
+        super().__init__()
+        self.type = 'shard'
+        self.name = None
+        self.file = None
+        self.size = '64M'
 
-        return not other or 'signature' not in other or other["signature"] == signature
+        if data is not None:
+            self.init_from(data)
 
-    def write_info(self):
-        
-        os.makedirs(self.output_folder, exist_ok=True)
+    def init_from(self, data):
 
-        with open(self.info_filepath, "w") as fout:
-            yaml.dump(self.info, fout, default_flow_style=False)
+        self.load_property('file', data, mandatory=True)
+        self.load_property('size', data)
+        self.load_property('name', data)
 
-    def clean_output(self):
+        return self
 
-        clean_folder(self.output_folder)
+    def create_domain(self):
 
-    def on_start(self, scheduler):
-        
-        # TODO: Generate tasks in parallel
-        # TODO: Start tasks while generating them
+        return ShardDomain(self.file, parse_size(self.size), self._workdir)
 
-        combination_idd = -1
-        task_idd        = -1
 
-        for combination in self._combinations(self.vars):
-            combination_idd += 1
+class AdaptiveRepeatSchema(Schema):
 
-            for repeat_idd in range(self.repeat):
-                task_idd += 1
+    def __init__(self, data=None):
 
-                task_output_folder = os.path.join(self.output_folder, str(task_idd))
+        self.min_repeat = 3
+        self.max_repeat = 30
+        self.ci_width   = None
+        self.confidence = 0.95
 
-                cmds = [x.format(**combination) for x in self.cmd]
+        if data is not None:
+            self.init_from(data)
 
-                task = Task(self.name, task_output_folder, self.workdir, self.experiment_idd, combination_idd, repeat_idd, task_idd, combination, cmds, self.max_tries)
+    def init_from(self, data):
 
-                if self.task_filters and not any(a <= task_idd < b for a, b in self.task_filters):
-                    scheduler.push_filtered(task)
+        self.load_property('min_repeat', data)
+        self.load_property('max_repeat', data)
+        self.load_property('ci_width', data, mandatory=True)
+        self.load_property('confidence', data)
 
-                elif not self.redo_tasks and os.path.exists(os.path.join(task_output_folder, ".success")):
-                    scheduler.push_done(task)
+        if self.min_repeat < 2:
+            error(f"Invalid property value in {self.__class__.__name__}: min_repeat must be at least 2")
 
-                else:
-                    scheduler.push_todo(task)
+        if self.max_repeat < self.min_repeat:
+            error(f"Invalid property value in {self.__class__.__name__}: max_repeat must not be smaller than min_repeat")
 
-    def on_task_completed(self, scheduler, task:Task):
+        return self
 
-        # Define filepaths
+    def summary(self):
 
-        success_filepath = os.path.join(task.output_dir, ".success")
-        failure_filepath = os.path.join(task.output_dir, ".failure")
-        info_filepath    = os.path.join(task.output_dir, "info.yml")
-                
-        # Create the task folder
+        return f"{self.min_repeat}..{self.max_repeat} repeats, ci_width={self.ci_width}, confidence={self.confidence}"
 
-        os.makedirs(task.output_dir, exist_ok=True)
-        
-        # Clean anything inside the task folder
 
-        clean_folder(task.output_dir, quiet=True)
+class BudgetSchema(Schema):
 
-        # Dump task info
-        
-        info = {
-            "task_id"        : task.task_idd        ,
-            "repeat_id"      : task.repeat_idd      ,
-            "experiment_id"  : task.experiment_idd  ,
-            "experiment_name": task.experiment_name ,
-            "combination_id" : task.combination_idd ,
-            "combination"    : task.combination     ,
-            "max_tries"      : task.max_tries       ,
-            "tries"          : task.tries           ,
-            "results"        : []                   ,
-            "output_dir"     : task.output_dir      ,
-            "work_dir"       : task.work_dir        ,
-            "commands"       : task.commands        ,
-            "success"        : task.success         ,
-            "assigned_to"    : task.assigned_to     ,
+    def __init__(self, data=None):
+
+        self.name = None
+        self.min  = 1
+        self.max  = 81
+        self.eta  = 3
+
+        if data is not None:
+            self.init_from(data)
+
+    def init_from(self, data):
+
+        self.load_property('name', data, mandatory=True)
+        self.load_property('min', data)
+        self.load_property('max', data)
+        self.load_property('eta', data)
+
+        return self
+
+    def rungs(self):
+
+        # Budget of each rung, growing by a factor of eta from min up to max
+
+        if self.eta <= 1:
+            error(f"Invalid property value in {self.__class__.__name__}: eta must be greater than 1")
+
+        if not 0 < self.min <= self.max:
+            error(f"Invalid property value in {self.__class__.__name__}: expected 0 < min <= max")
+
+        budgets = []
+        budget  = self.min
+
+        while budget <= self.max * (1 + 1e-9):
+            budgets.append(budget)
+            budget = budget * self.eta
+
+        return budgets
+
+    def summary(self):
+
+        return f"{self.name} in {self.rungs()}, eta={self.eta}"
+
+
+class StageSchema(Schema):
+
+    def __init__(self, data=None):
+
+        self.name  = None
+        self.cmd   = []
+        self.vars  = None   # None means all variables
+        self.after = []
+
+        if data is not None:
+            self.init_from(data)
+
+    def init_from(self, data):
+
+        self.load_property('name', data, mandatory=True)
+        self.load_property('cmd', data, mandatory=True)
+        self.load_property('vars', data)
+        self.load_property('after', data)
+
+        if not isinstance(self.cmd, list):
+            self.cmd = [self.cmd]
+
+        if not isinstance(self.after, list):
+            self.after = [self.after]
+
+        return self
+
+    def summary(self):
+
+        variables = 'all variables' if self.vars is None else (', '.join(self.vars) or 'no variables')
+        after     = f", after {', '.join(self.after)}" if self.after else ''
+
+        return f"{self.name} (depends on {variables}{after}): {self.cmd}"
+
+
+class StageInstance:
+
+    # One execution of a stage, shared by every task whose combination
+    # agrees on the variables the stage depends on
+
+    def __init__(self, stage, key, task, folder):
+
+        self.stage   = stage
+        self.key     = key
+        self.task    = task
+        self.folder  = folder
+        self.state   = 'pending'   # pending, done or failed
+        self.waiting = []          # Tasks and stage instances blocked by this one
+
+
+class BaseExperimentSchema(Schema):
+
+    def __init__(self):
+        
+        self.type              = 'base'
+        self.redo_tasks        = False
+        self.name              = None
+        self.workdir           = None
+        self.task_filters      = []
+        self.experiment_idd    = None
+        self.cmd               = []
+        self.max_tries         = 3
+        self.repeat            = 1
+        self.score_pattern     = None
+        self.goal              = 'max'
+        self.vars              = []
+        self.cache             = False
+        self.cache_inputs      = []
+        self.cache_env         = []
+        self.cache_version     = None
+        self.constraints       = []
+        self.watch_pattern     = None
+        self.prune             = None
+        self.prune_threshold   = None
+        self.prune_min_peers   = 5
+        self.prune_warmup      = 0
+        self.checkpoint        = False
+        self.checkpoint_folder = '.patas_checkpoints'
+        self.setup             = []
+        self.teardown          = []
+        self.function          = None
+        self.function_recycle  = 1000
+        self.function_memory   = None
+        self.coalesce          = 1
+        self.inputs            = []
+        self.input_env         = {}
+        self.artifacts         = []
+        self.artifacts_limit   = None
+        self.artifacts_streams = 4
+        self.store             = 'folders'
+        self.compress          = None
+        self.compress_dict     = False
+        self.output_head       = None
+        self.output_tail       = None
+        self.output_limit      = None
+        self._store            = None
+        self._compression      = None
+        self._num_combos       = None
+        self._checks           = None
+        self._watch            = None
+        self._pruning          = None
+
+    def init_from(self, data):
+        
+        self.load_property('name', data)
+        self.load_property('workdir', data)
+        self.load_property('function', data)
+        self.load_property('function_recycle', data)
+        self.load_property('function_memory', data)
+        self.load_property('cmd', data, mandatory=self.function is None)
+        self.load_property('max_tries', data)
+        self.load_property('repeat', data)
+        self.load_property('redo_tasks', data)
+        self.load_property('score_pattern', data)
+        self.load_property('goal', data)
+        self.load_property('cache', data)
+        self.load_property('cache_inputs', data)
+        self.load_property('cache_env', data)
+        self.load_property('cache_version', data)
+        self.load_property('constraints', data)
+        self.load_property('watch_pattern', data)
+        self.load_property('prune', data)
+        self.load_property('prune_threshold', data)
+        self.load_property('prune_min_peers', data)
+        self.load_property('prune_warmup', data)
+        self.load_property('checkpoint', data)
+        self.load_property('checkpoint_folder', data)
+        self.load_property('setup', data)
+        self.load_property('teardown', data)
+        self.load_property('coalesce', data)
+        self.load_property('inputs', data)
+        self.load_property('artifacts', data)
+        self.load_property('artifacts_limit', data)
+        self.load_property('artifacts_streams', data)
+        self.load_property('store', data)
+        self.load_property('compress', data)
+        self.load_property('compress_dict', data)
+        self.load_property('output_head', data)
+        self.load_property('output_tail', data)
+        self.load_property('output_limit', data)
+
+        if self.goal not in ['max', 'min']:
+            error(f"Invalid property value in {self.__class__.__name__}: goal={self.goal}")
+
+        if self.coalesce != 'auto' and (not isinstance(self.coalesce, int) or self.coalesce < 1):
+            error(f"Invalid property value in {self.__class__.__name__}: coalesce={self.coalesce}")
+
+        if self.store not in ['folders', 'packed']:
+            error(f"Invalid property value in {self.__class__.__name__}: store={self.store}")
+
+        if self.compress not in [None, False, True, 'none', 'auto', 'zstd', 'gzip']:
+            error(f"Invalid property value in {self.__class__.__name__}: compress={self.compress}")
+
+        for name in ['output_head', 'output_tail', 'output_limit']:
+            try:
+                if getattr(self, name) is not None:
+                    parse_size(getattr(self, name))
+            except (ValueError, KeyError, IndexError):
+                error(f"Invalid property value in {self.__class__.__name__}: {name}={getattr(self, name)}")
+
+        if 'vars' in data:
+            self.vars = []
+
+            for data2 in data['vars']:
+
+                if 'type' in data2:
+                    if data2['type'] == 'list':
+                        self.vars.append(ListVariableSchema(data2))
+
+                    elif data2['type'] == 'arithmetic':
+                        self.vars.append(ArithmeticVariableSchema(data2))
+
+                    elif data2['type'] == 'geometric':
+                        self.vars.append(GeometricVariableSchema(data2))
+
+                    elif data2['type'] == 'glob':
+                        self.vars.append(GlobVariableSchema(data2))
+
+                    elif data2['type'] == 'lines':
+                        self.vars.append(LinesVariableSchema(data2))
+
+                    elif data2['type'] == 'shard':
+                        self.vars.append(ShardVariableSchema(data2))
+
+                    else:
+                        error(f"Invalid property value in {self.__class__.__name__}: type={data2['type']}")
+                else:
+                    error(f'Missing required property in {self.__class__.__name__}: type')
+
+        # TODO: Load task filters
+
+        if not isinstance(self.cmd, list):
+            self.cmd = [self.cmd]
+
+        self.bind_files()
+        self.use_function()
+        
+        return self
+
+    def bind_files(self):
+
+        for var in self.vars:
+            if isinstance(var, FileVariableSchema):
+                var.bind(self.workdir)
+
+    def use_function(self):
+
+        # Experiments that call a function get a command calling it in a new
+        # interpreter, used by remote workers. Local workers call it in process.
+
+        if self.function and not self.cmd:
+            from .call import call_command
+            self.cmd = [call_command(self.function, [v.name for v in self.vars])]
+
+    def number_of_tasks(self):
+        raise NotImplementedError()
+        
+    def show_summary(self):
+        raise NotImplementedError()
+
+    def _combinations(self, variables, combination={}, constraints=None):
+
+        # Constraints are checked as soon as their variables are bound,
+        # pruning whole sub-trees of invalid combinations
+
+        if constraints is None:
+            constraints = compile_constraints(self.constraints, variables)
+
+        if len(variables) == len(combination):
+            yield copy.copy(combination)
+        
+        else:
+            var    = variables[len(combination)]
+            name   = var.name
+            checks = constraints[len(combination)]
+            
+            for value in var.values:
+                combination[name] = value
+
+                if checks and not all(check(combination) for check in checks):
+                    continue
+                
+                for output in self._combinations(variables, combination, constraints):
+                    yield output
+                
+            combination.pop(name, None)
+
+    def number_of_combinations(self):
+
+        # Without constraints this is the product of the domain sizes, otherwise the valid combinations are counted once
+
+        if not self.constraints:
+            return reduce(lambda a,b: a*len(b.values), self.vars, 1)
+
+        if self._num_combos is None:
+            self._num_combos = sum(1 for _ in self._combinations(self.vars))
+
+        return self._num_combos
+
+    def _satisfies(self, combination):
+
+        # Checks a complete combination against all constraints
+
+        if self._checks is None:
+            self._checks = [check for checks in compile_constraints(self.constraints, self.vars) for check in checks]
+
+        return all(check(combination) for check in self._checks)
+
+    def signature_data(self):
+
+        # Data used to identify the signature, any change here restarts the experiment
+
+        signature_data = {
+            "type"      : self.type,
+            "commands"  : self.cmd,
+            "variables" : {v.name:v.signature() for v in self.vars},
+            "workdir"   : self.workdir,
+            "repeat"    : self.repeat
+        }
+
+        if self.constraints:
+            signature_data["constraints"] = self.constraints
+
+        if self.store != 'folders':
+            signature_data["store"] = self.store
+
+        return signature_data
+
+    def check_signature(self, output_folder):
+        
+        # Define filepaths
+
+        self.output_folder = os.path.join(output_folder, self.name)
+        self.info_filepath = os.path.join(self.output_folder, "info.yml")
+
+        # Data to identify the signature
+
+        signature_data = self.signature_data()
+
+        # Calculate signature
+        
+        key = hashlib.md5()
+        key.update(str(format_as_dict(signature_data)).encode())
+        signature = base64.b64encode(key.digest()).decode("utf-8")
+
+        # Data to represent the experiment
+
+        self.info = {
+            'name': self.name,
+            "type": self.type,
+            "commands": self.cmd,
+            "variables": {v.name:v.signature() for v in self.vars},
+            "workdir": self.workdir,
+            'task_filters': self.task_filters,
+            'signature': signature,
+            'commands': self.cmd,
+            'max_tries': self.max_tries,
+            'repeat': self.repeat,
+            'redo_tasks': self.redo_tasks,
         }
 
-        for attempt in task.attempts:
-            attempt = copy.copy(attempt)
-            del attempt['stdout']
-            info['results'].append(attempt)
-        
-        with open(info_filepath, "w") as fout:
-            yaml.dump(info, fout, default_flow_style=False)
+        self.info.update({k:format_as_dict(v) for k, v in signature_data.items() if k not in self.info})
+
+        # Load previous signature, if it exists
+
+        try:
+            with open(self.info_filepath, "r") as fin:
+                other = yaml.load(fin, Loader=yaml.FullLoader)
+        except:
+            other = None
+
+        # Return true if the signature do not exist or if they are the same
+
+        return not other or 'signature' not in other or other["signature"] == signature
+
+    def write_info(self):
+        
+        os.makedirs(self.output_folder, exist_ok=True)
+
+        with open(self.info_filepath, "w") as fout:
+            yaml.dump(self.info, fout, default_flow_style=False)
+
+    def clean_output(self):
+
+        # Previous results are archived instead of deleted
+
+        self._archive(glob(os.path.join(self.output_folder, "*")) + glob(os.path.join(self.output_folder, ".tasks.tsv")))
+
+    def _archive(self, paths):
+
+        paths = [x for x in paths if os.path.exists(x)]
+
+        if not paths:
+            return
+
+        archive_folder = os.path.join(self.output_folder, ".archive", datetime.now().strftime("%Y%m%d-%H%M%S-%f"))
+        os.makedirs(archive_folder, exist_ok=True)
+
+        info(f"Archiving {len(paths)} previous {plural(len(paths), 'result')} of {self.name} in {archive_folder}")
+
+        for path in paths:
+            shutil.move(path, os.path.join(archive_folder, os.path.basename(path)))
+
+    def _submit(self, scheduler, task:Task):
+
+        # Sends the task to the scheduler, returns its initial state: filtered, done or todo
+
+        if self.task_filters and not any(a <= task.task_idd < b for a, b in self.task_filters):
+            scheduler.push_filtered(task)
+            return 'filtered'
+
+        elif not self.redo_tasks and self._is_done(task):
+            scheduler.push_done(task)
+            return 'done'
+
+        else:
+            scheduler.push_todo(task)
+            return 'todo'
+
+    def watch(self, task:Task):
+
+        # Pattern the worker matches against the live output of a task, if it must be watched
+
+        if not self.watch_pattern or not self.prune or task.stage is not None:
+            return None
+
+        if self._watch is None:
+            from .parse import WatchPattern
+            from .pruning import PruningRule
+
+            self._watch   = WatchPattern(self.watch_pattern)
+            self._pruning = PruningRule(self.prune, self.goal, self.prune_threshold, self.prune_min_peers, self.prune_warmup)
+
+        return self._watch
+
+    def checkpoint_dir(self, task:Task):
+
+        # Folder where a task saves its checkpoints, shared by all its attempts.
+        # It lives inside the workdir, so retries on other nodes find it when
+        # the workdir is on shared storage.
+
+        if not self.checkpoint or task.stage is not None:
+            return None
+
+        return os.path.join(self.workdir or '', self.checkpoint_folder, self.name, str(task.task_idd))
+
+    def artifact_patterns(self, task:Task):
+
+        # Globs of the files collected after a task, formatted like its commands
+
+        if task.stage is not None:
+            return []
+
+        return [x.format(**task.combination) for x in self.artifacts]
+
+    def output_limits(self):
+
+        # Sizes that bound the output kept from each task, as (head, tail,
+        # limit), or None when the whole output is kept
+
+        limits = (self.output_head, self.output_tail, self.output_limit)
+        return limits if any(x is not None for x in limits) else None
+
+    def on_task_progress(self, scheduler, task:Task, step, value):
+
+        # Called for every value the task reports while running, returns True if it must be pruned
+
+        return self._pruning.report(task.combination, step, value)
+
+    def cache_key(self, cache, task:Task):
+
+        # Key of the task in the result cache, computed once
+
+        if task.cache_key is None:
+            task.cache_key = cache.key(task, self.cache_env, self.cache_inputs, self.cache_version)
+
+        return task.cache_key
+
+    def _load_stdout(self, task:Task):
+
+        # Reads the output of a task that was completed in a previous execution
+
+        if self._packed(task):
+            if self._results().state(task.task_idd) != 'success':
+                return None
+
+            _, outputs = self._results().get(task.task_idd)
+            return outputs[-1] if outputs else None
+
+        from .compression import find_output, read_output
+
+        filepath = find_output(task.output_dir, "success.stdout")
+
+        try:
+            return read_output(filepath) if filepath else None
+        except OSError:
+            return None
+
+    def _load_previous_tasks(self):
+
+        # Tasks completed in previous executions, with their outputs. Used by
+        # experiments that generate combinations on the fly to resume a search.
+
+        if self.store == 'packed':
+            store = self._results()
+
+            for task_idd in store.ids():
+                if store.state(task_idd) != 'success':
+                    continue
+
+                data, outputs = store.get(task_idd)
+                task          = Task(self.name, data["output_dir"], self.workdir, self.experiment_idd, data["combination_id"], data["repeat_id"], data["task_id"], data["combination"], data["commands"], self.max_tries)
+
+                yield task, outputs[-1] if outputs else None
+
+            return
+
+        for info_filepath in glob(os.path.join(self.output_folder, "*", "info.yml")):
+            task_folder = os.path.dirname(info_filepath)
+
+            if not os.path.exists(os.path.join(task_folder, ".success")):
+                continue
+
+            with open(info_filepath, "r") as fin:
+                data = yaml.load(fin, Loader=yaml.FullLoader)
+
+            task = Task(self.name, task_folder, self.workdir, self.experiment_idd, data["combination_id"], data["repeat_id"], data["task_id"], data["combination"], data["commands"], self.max_tries)
+            
+            yield task, self._load_stdout(task)
+
+    def _task_info(self, task:Task):
+
+        # Everything about a task and its attempts, except their outputs
+
+        info = {
+            "task_id"        : task.task_idd        ,
+            "repeat_id"      : task.repeat_idd      ,
+            "experiment_id"  : task.experiment_idd  ,
+            "experiment_name": task.experiment_name ,
+            "combination_id" : task.combination_idd ,
+            "combination"    : task.combination     ,
+            "max_tries"      : task.max_tries       ,
+            "tries"          : task.tries           ,
+            "results"        : []                   ,
+            "output_dir"     : task.output_dir      ,
+            "work_dir"       : task.work_dir        ,
+            "commands"       : task.commands        ,
+            "success"        : task.success         ,
+            "assigned_to"    : task.assigned_to     ,
+        }
+
+        if task.pruned:
+            info["pruned"] = True
+
+        if task.exceeded:
+            info["exceeded"] = True
+
+        for attempt in task.attempts:
+            attempt = copy.copy(attempt)
+            del attempt['stdout']
+            info['results'].append(attempt)
+
+        return info
+
+    def _write_task(self, task:Task):
+
+        if self._packed(task):
+            return self._pack_task(task)
+
+        # Define filepaths
+
+        success_filepath = os.path.join(task.output_dir, ".success")
+        failure_filepath = os.path.join(task.output_dir, ".failure")
+        info_filepath    = os.path.join(task.output_dir, "info.yml")
+                
+        # Create the task folder
+
+        os.makedirs(task.output_dir, exist_ok=True)
+        
+        # Clean anything inside the task folder
+
+        clean_folder(task.output_dir, quiet=True)
+
+        # Artifacts collected by the worker are waiting beside the task folder
+
+        staged = artifacts_dir(task)
+
+        if os.path.isdir(staged):
+            os.rename(staged, os.path.join(task.output_dir, "artifacts"))
+
+        # Dump task info
+
+        info = self._task_info(task)
+
+        with open(info_filepath, "w") as fout:
+            yaml.dump(info, fout, default_flow_style=False)
+        
+        # Dump fail and success outputs
+
+        compressor = self._compressor()
+
+        for i, attempt in enumerate(task.attempts):
+            attempt = task.attempts[i]
+
+            if str(attempt['status']) == '0':
+                filepath = os.path.join(task.output_dir, f'success.stdout{compressor.extension}')
+            else:
+                filepath = os.path.join(task.output_dir, f'fail{i}.stdout{compressor.extension}')
+
+            # Results from the cache share the file with it, unless outputs are compressed
+
+            if task.cached and i == len(task.attempts) - 1 and not compressor.method:
+                link_or_copy(os.path.join(task.cached, 'stdout'), filepath)
+                continue
+            
+            with open(filepath, "wb") as fout:
+                fout.write(compressor.compress(attempt['stdout']))
+        
+        # Create .success, .pruned, .exceeded or .failure file
+
+        if task.success:
+            filepath = success_filepath
+        elif task.pruned:
+            filepath = os.path.join(task.output_dir, ".pruned")
+        elif task.exceeded:
+            filepath = os.path.join(task.output_dir, ".exceeded")
+        else:
+            filepath = failure_filepath
+        
+        with open(filepath, 'a'):
+            os.utime(filepath, None)
+
+    def _compressor(self):
+
+        if self._compression is None:
+            from .compression import OutputCompressor
+            self._compression = OutputCompressor(self.compress, self.output_folder, self.compress_dict)
+
+        return self._compression
+
+    def _packed(self, task:Task):
+
+        # Stages always have their own folders, they are few and tasks read their outputs
+
+        return self.store == 'packed' and task.stage is None
+
+    def _results(self):
+
+        if self._store is None:
+            from .store import PackedStore, STORE_FOLDER
+            self._store = PackedStore(os.path.join(self.output_folder, STORE_FOLDER))
+
+        return self._store
+
+    def _pack_task(self, task:Task):
+
+        # Appends the task to the packed store. Its artifacts still need a
+        # folder, in artifacts/<task id> inside the experiment folder.
+
+        staged = artifacts_dir(task)
+
+        if os.path.isdir(staged):
+            folder = os.path.join(self.output_folder, "artifacts", str(task.task_idd))
+            shutil.rmtree(folder, ignore_errors=True)
+            os.makedirs(os.path.dirname(folder), exist_ok=True)
+            os.rename(staged, folder)
+
+        outputs = [x['stdout'] or b'' for x in task.attempts]
+
+        # Results from the cache are copied from it
+
+        if task.cached and outputs:
+            with open(os.path.join(task.cached, 'stdout'), 'rb') as fin:
+                outputs[-1] = fin.read()
+
+        state = 'success' if task.success else 'pruned' if task.pruned else 'exceeded' if task.exceeded else 'failure'
+        self._results().put(task.task_idd, self._task_info(task), outputs, state)
+
+    def _is_done(self, task:Task):
+
+        # Whether the task succeeded in a previous execution
+
+        if self._packed(task):
+            return self._results().state(task.task_idd) == 'success'
+
+        return os.path.exists(os.path.join(task.output_dir, ".success"))
+
+    def flush_results(self):
+
+        # Writes the results still buffered, called when the execution ends
+
+        if self._store is not None:
+            self._store.flush()
+
+    def on_start(self, scheduler):
+        raise NotImplementedError()
+
+    def on_workers_idle(self, scheduler, count):
+
+        # Called when workers are free and no task is waiting. Experiments that
+        # create tasks on demand may push up to count tasks here.
+
+        pass
+
+    def on_task_completed(self, scheduler, task:Task):
+        raise NotImplementedError()
+
+    def on_finish(self):
+        raise NotImplementedError()
+
+
+class GridExperimentSchema(BaseExperimentSchema):
+
+    def __init__(self):
+        
+        super().__init__()
+        self.type            = 'grid'
+        self.adaptive_repeat = None
+        self.stages          = []
+        self.stage_folder    = '.patas_stages'
+        self._repeats        = {}
+        self._index          = None
+        self._template       = None
+        self._instances      = {}
+        self._missing        = {}
+    
+    def init_from(self, data):
+
+        super().init_from(data)
+
+        if 'adaptive_repeat' in data:
+            self.adaptive_repeat = AdaptiveRepeatSchema(data['adaptive_repeat'])
+
+        if 'stages' in data:
+            self.stages = [StageSchema(x) for x in data['stages']]
+
+        self.load_property('stage_folder', data)
+
+        return self
+
+    def check_stages(self):
+
+        # Stages may only depend on variables and on stages declared before them, so they form a DAG
+
+        names     = [v.name for v in self.vars]
+        previous  = set()
+
+        for stage in self.stages:
+            for name in stage.vars or []:
+                if name not in names:
+                    error(f"Stage {stage.name} depends on an unknown variable: {name}")
+
+            for name in stage.after:
+                if name not in previous:
+                    error(f"Stage {stage.name} must be declared after stage {name}")
+
+            if stage.name in previous:
+                error(f"Duplicated stage name: {stage.name}")
+
+            previous.add(stage.name)
+
+    def signature_data(self):
+
+        signature_data = super().signature_data()
+
+        if self.adaptive_repeat:
+            signature_data["adaptive_repeat"] = self.adaptive_repeat
+            signature_data["score_pattern"]   = self.score_pattern
+
+        if self.stages:
+            signature_data["stages"] = self.stages
+
+        return signature_data
+
+    def number_of_repeats(self):
+
+        # Maximum number of repeats for each combination, also used to define task ids
+
+        return self.adaptive_repeat.max_repeat if self.adaptive_repeat else self.repeat
+
+    def number_of_tasks(self):
+        
+        return self.number_of_combinations() * self.number_of_repeats()
+    
+    def summary(self, indent=None):
+
+        combinations = self.number_of_combinations()
+        tasks = combinations * self.number_of_repeats()
+        filters = len(self.task_filters)
+
+        attrs = ['experiment_idd', 'redo_tasks', 'workdir', 'task_filters', 'cmd', 'max_tries', 'repeat']
+
+        if self.adaptive_repeat:
+            lines  = [f"'{self.name}' (up to {tasks} {plural(tasks, 'task')}):"]
+        else:
+            lines  = [f"'{self.name}' ({tasks} {plural(tasks, 'task')}):"]
+
+        lines += [f"    {name}: {getattr(self, name)}" for name in attrs]
+
+        if self.adaptive_repeat:
+            lines += [f"    adaptive_repeat: {self.adaptive_repeat.summary()}"]
+            lines += [f"    score_pattern: {self.score_pattern}"]
+
+        if self.constraints:
+            lines += [f"    constraints: {self.constraints}"]
+
+        if self.stages:
+            lines += [f"    stages ({len(self.stages)}):"]
+            lines += [f"        {x.summary()}" for x in self.stages]
+
+        lines += [f"    combinations: {combinations}"]
+        lines += [f'    variables ({len(self.vars)}):']
+        lines += [f"        {v.name} = {str(v.values)}, len = {len(v.values)}" for v in self.vars]
+        
+        lines = '\n'.join(lines)
+        return indent_lines(lines, indent) if indent else lines
+
+    def clean_output(self):
+
+        # Only tasks whose combination, repeat or command no longer exist are
+        # archived, the others keep their folders and are not executed again
+
+        try:
+            with open(self.info_filepath, "r") as fin:
+                other = yaml.load(fin, Loader=yaml.FullLoader)
+            cmd, workdir = self._task_template(other["commands"], other.get("stages", []), other.get("variables", {})), other["workdir"]
+        except Exception:
+            cmd, workdir = self._task_template(), self.workdir
+
+        index    = TaskIndex(self.output_folder).load(cmd, workdir)
+        template = self._task_template()
+        current  = set()
+
+        for combination in self._combinations(self.vars):
+            for repeat_idd in range(self.number_of_repeats()):
+                current.add(task_key(combination, repeat_idd, template, self.workdir))
+
+        stale = [key for key in index.ids if key not in current]
+
+        self._archive([os.path.join(self.output_folder, str(index.ids[key])) for key in stale])
+
+        if stale and self.store == 'packed':
+            self._results().forget([index.ids[key] for key in stale])
+
+        index.remove(stale)
+
+        self._index = index
+
+    def _task_index(self):
+
+        if self._index is None:
+            self._index = TaskIndex(self.output_folder).load(self._task_template(), self.workdir)
+
+        return self._index
+
+    def _task_template(self, cmd=None, stages=None, variables=None):
+
+        # Commands that define the identity of a task, including the stages it
+        # depends on and the contents of the files read by lines and shard
+        # variables, as their values stay the same when the files change
+
+        cmd       = self.cmd if cmd is None else cmd
+        stages    = self.stages if stages is None else stages
+        variables = {v.name:v.signature() for v in self.vars} if variables is None else variables
+        files     = [repr(sorted(x.items())) for _, x in sorted(variables.items()) if isinstance(x, dict) and x.get('type') in ['lines', 'shard']]
+
+        return list(cmd) + [repr(sorted(format_as_dict(x).items())) for x in stages] + files
+
+    def _create_task(self, combination_idd, combination, repeat_idd):
+
+        # Task ids come from the task index, so they survive changes in the variables
+
+        if self._template is None:
+            self._template = self._task_template()
+
+        key                = task_key(combination, repeat_idd, self._template, self.workdir)
+        task_idd           = self._task_index().get(key, combination_idd * self.number_of_repeats() + repeat_idd)
+        task_output_folder = os.path.join(self.output_folder, str(task_idd))
+        cmds               = [x.format(**combination) for x in self.cmd]
+
+        return Task(self.name, task_output_folder, self.workdir, self.experiment_idd, combination_idd, repeat_idd, task_idd, combination, cmds, self.max_tries)
+
+    def on_start(self, scheduler):
+        
+        # TODO: Generate tasks in parallel
+        # TODO: Start tasks while generating them
+
+        self.check_stages()
+
+        if self.adaptive_repeat:
+            return self._start_adaptive(scheduler)
+
+        combination_idd = -1
+
+        for combination in self._combinations(self.vars):
+            combination_idd += 1
+
+            for repeat_idd in range(self.repeat):
+                self._submit_after_stages(scheduler, self._create_task(combination_idd, combination, repeat_idd))
+
+        self._task_index().flush()
+
+    def _start_adaptive(self, scheduler):
+
+        from .parse import ScorePattern
+
+        if not self.score_pattern:
+            error(f"Missing required property in {self.__class__.__name__}: score_pattern")
+
+        self._score  = ScorePattern(self.score_pattern)
+        self._combos = {}
+
+        combination_idd = -1
+
+        for combination in self._combinations(self.vars):
+            combination_idd += 1
+
+            self._combos[combination_idd] = combination
+            self._repeats[combination_idd] = {
+                "scores"  : [],   # Scores captured so far
+                "pending" : 0,    # Tasks sent to the scheduler that did not finish yet
+                "next"    : 0,    # Next repeat_idd to be scheduled
+            }
+
+            self._schedule_repeats(scheduler, combination_idd, self.adaptive_repeat.min_repeat)
+
+        self._task_index().flush()
+
+    def _schedule_repeats(self, scheduler, combination_idd, count):
+
+        state       = self._repeats[combination_idd]
+        combination = self._combos[combination_idd]
+        count       = min(count, self.adaptive_repeat.max_repeat - state["next"])
+
+        if count <= 0:
+            return
+
+        state["pending"] += count
+        done              = []
+
+        for _ in range(count):
+            task = self._create_task(combination_idd, combination, state["next"])
+            state["next"] += 1
+
+            status = self._submit_after_stages(scheduler, task)
+
+            if status == 'done':
+                done.append(task)
+
+            elif status == 'filtered':
+                state["pending"] -= 1
+                state["next"]     = self.adaptive_repeat.max_repeat
+
+        # Tasks completed in a previous execution count as results
+
+        for task in done:
+            self._on_repeat_finished(scheduler, task, self._load_stdout(task))
+
+    def _on_repeat_finished(self, scheduler, task:Task, stdout):
+
+        ar    = self.adaptive_repeat
+        state = self._repeats[task.combination_idd]
+        score = self._score.parse(stdout) if stdout is not None else None
+
+        state["pending"] -= 1
+
+        if score is not None:
+            state["scores"].append(score)
+        
+        elif stdout is not None:
+            warn(f"Score pattern not found in the output of task {task.task_idd}")
+
+        # Wait until all repeats in flight finish before deciding
+
+        if state["pending"] > 0 or state["next"] >= ar.max_repeat:
+            return
+
+        scores = state["scores"]
+
+        if len(scores) >= ar.min_repeat and ci_width(scores, ar.confidence) <= ar.ci_width:
+            return
+
+        # Not converged, schedule the number of repeats we expect to need at once
+
+        needed = max(required_samples(scores, ar.ci_width, ar.confidence), ar.min_repeat)
+        self._schedule_repeats(scheduler, task.combination_idd, max(1, needed - len(scores)))
+
+    def _submit_after_stages(self, scheduler, task:Task):
+
+        # Same as _submit, but the task only goes to todo once all stage instances it depends on are done
+
+        if not self.stages:
+            return self._submit(scheduler, task)
+
+        if self.task_filters and not any(a <= task.task_idd < b for a, b in self.task_filters):
+            scheduler.push_filtered(task)
+            return 'filtered'
+
+        if not self.redo_tasks and self._is_done(task):
+            scheduler.push_done(task)
+            return 'done'
+
+        upstream = [self._stage_instance(scheduler, stage, task.combination) for stage in self.stages]
+        task.env = self._stage_env(upstream)
+
+        self._wait(scheduler, task, upstream)
+        return 'todo'
+
+    def _stage_env(self, instances):
+
+        return {f"PATAS_STAGE_{x.stage.name.upper()}": x.folder for x in instances}
+
+    def _stage_instance(self, scheduler, stage:StageSchema, combination):
+
+        # Stage instances are identified by the values they depend on, their
+        # commands and their upstream instances, each one is executed once
+
+        names    = [v.name for v in self.vars] if stage.vars is None else stage.vars
+        values   = {k: combination[k] for k in names}
+        upstream = [self._stage_instance(scheduler, self._stage(name), combination) for name in stage.after]
+
+        try:
+            cmds = [x.format(**values) for x in stage.cmd]
+        except KeyError as e:
+            error(f"Stage {stage.name} uses the variable {e} but does not depend on it")
+
+        key = hashlib.sha1(repr((stage.name, cmds, self.workdir, [x.key for x in upstream])).encode()).hexdigest()[:16]
+
+        if key in self._instances:
+            return self._instances[key]
+
+        # Stage outputs live on the nodes, in the stage folder inside the workdir.
+        # The stage task itself is stored with the other tasks of the experiment.
+
+        folder     = os.path.join(self.workdir or '', self.stage_folder, self.name, stage.name, key)
+        output_dir = os.path.join(self.output_folder, ".stages", stage.name, key)
+        cmds       = ['mkdir -p "$PATAS_STAGE_DIR"'] + cmds
+        task       = Task(self.name, output_dir, self.workdir, self.experiment_idd, -1, 0, f"{stage.name}:{key}", values, cmds, self.max_tries)
+        instance   = StageInstance(stage, key, task, folder)
+
+        task.stage = key
+        task.env   = self._stage_env(upstream)
+        task.env["PATAS_STAGE_DIR"] = folder
+
+        self._instances[key] = instance
+        self._wait(scheduler, instance, upstream)
+
+        return instance
+
+    def _stage(self, name):
+
+        return next(x for x in self.stages if x.name == name)
+
+    def _wait(self, scheduler, item, upstream):
+
+        # Blocks a task or stage instance until its upstream stage instances are done
+
+        if any(x.state == 'failed' for x in upstream):
+            return self._fail(scheduler, item)
+
+        pending = [x for x in upstream if x.state != 'done']
+
+        if not pending:
+            return self._release(scheduler, item)
+
+        self._missing[id(item)] = len(pending)
+
+        for x in pending:
+            x.waiting.append(item)
+
+    def _release(self, scheduler, item):
+
+        if not isinstance(item, StageInstance):
+            self._submit(scheduler, item)
+
+        elif not self.redo_tasks and self._is_done(item.task):
+            scheduler.push_done(item.task)
+            self._on_stage_finished(scheduler, item, True)
+
+        else:
+            scheduler.push_todo(item.task)
+
+    def _fail(self, scheduler, item):
+
+        # Everything downstream of a failed stage instance is given up without being executed
+
+        if isinstance(item, StageInstance):
+            warn(f"Giving up on stage {item.task.task_idd}, an upstream stage has failed")
+            scheduler.push_given_up(item.task)
+            self._on_stage_finished(scheduler, item, False)
+
+        else:
+            warn(f"Giving up on task {item.task_idd}, an upstream stage has failed")
+            item.success = False
+            scheduler.push_given_up(item)
+            self.on_task_completed(scheduler, item)
+
+    def _on_stage_finished(self, scheduler, instance:StageInstance, success):
+
+        instance.state = 'done' if success else 'failed'
+        waiting        = instance.waiting
+
+        instance.waiting = []
+
+        for item in waiting:
+
+            # Items missing here were already given up because of another upstream instance
+
+            if id(item) not in self._missing:
+                continue
+
+            if not success:
+                del self._missing[id(item)]
+                self._fail(scheduler, item)
+                continue
+
+            self._missing[id(item)] -= 1
+
+            if self._missing[id(item)] == 0:
+                del self._missing[id(item)]
+                self._release(scheduler, item)
+
+    def on_task_completed(self, scheduler, task:Task):
+
+        self._write_task(task)
+
+        if task.stage is not None:
+            return self._on_stage_finished(scheduler, self._instances[task.stage], task.success)
+
+        if self.adaptive_repeat:
+            stdout = task.attempts[-1]['stdout'] if task.success and task.attempts else None
+            self._on_repeat_finished(scheduler, task, stdout)
+            self._task_index().flush()
+
+    def on_finish(self):
+        pass
+
+
+class HyperbandExperimentSchema(BaseExperimentSchema):
+
+    def __init__(self):
+
+        super().__init__()
+        self.type      = 'hyperband'
+        self.budget    = None
+        self.brackets  = 1
+        self._budgets  = []
+        self._combos   = {}
+        self._rungs    = []
+        self._resuming = False
+
+    def init_from(self, data):
+
+        super().init_from(data)
+
+        self.load_property('score_pattern', data, mandatory=True)
+        self.load_property('brackets', data)
+
+        if 'budget' in data:
+            self.budget = BudgetSchema(data['budget'])
+        else:
+            error(f"Missing required property in {self.__class__.__name__}: budget")
+
+        return self
+
+    def number_of_tasks(self):
+
+        # Tasks executed when every rung promotes exactly its top 1/eta
+
+        combinations = self.number_of_combinations()
+        rungs        = len(self.budget.rungs())
+        tasks        = 0
+
+        for bracket in range(self.brackets):
+            survivors = combinations // self.brackets + (1 if bracket < combinations % self.brackets else 0)
+
+            for _ in range(bracket, rungs):
+                tasks    += survivors
+                survivors = int(survivors // self.budget.eta)
+
+        return tasks
+
+    def summary(self, indent=None):
+
+        combinations = self.number_of_combinations()
+        tasks        = self.number_of_tasks()
+
+        attrs = ['experiment_idd', 'redo_tasks', 'workdir', 'task_filters', 'cmd', 'max_tries', 'score_pattern', 'goal', 'brackets']
+
+        lines  = [f"'{self.name}' (about {tasks} {plural(tasks, 'task')}):"]
+        lines += [f"    {name}: {getattr(self, name)}" for name in attrs]
+        lines += [f"    budget: {self.budget.summary()}"]
+        if self.constraints:
+            lines += [f"    constraints: {self.constraints}"]
+
+        lines += [f"    combinations: {combinations}"]
+        lines += [f'    variables ({len(self.vars)}):']
+        lines += [f"        {v.name} = {str(v.values)}, len = {len(v.values)}" for v in self.vars]
+
+        lines = '\n'.join(lines)
+        return indent_lines(lines, indent) if indent else lines
+
+    def signature_data(self):
+
+        signature_data = super().signature_data()
+
+        signature_data["budget"]        = self.budget
+        signature_data["brackets"]      = self.brackets
+        signature_data["score_pattern"] = self.score_pattern
+        signature_data["goal"]          = self.goal
+
+        return signature_data
+
+    def _create_task(self, combination_idd, rung):
+
+        combination = copy.copy(self._combos[combination_idd])
+        combination[self.budget.name] = self._budgets[rung]
+
+        task_idd           = combination_idd * len(self._budgets) + rung
+        task_output_folder = os.path.join(self.output_folder, str(task_idd))
+        cmds               = [x.format(**combination) for x in self.cmd]
+
+        return Task(self.name, task_output_folder, self.workdir, self.experiment_idd, combination_idd, 0, task_idd, combination, cmds, self.max_tries)
+
+    def on_start(self, scheduler):
+
+        from .parse import ScorePattern
+
+        if self.repeat != 1:
+            warn(f"HyperbandExperiment ignores repeat={self.repeat}")
+
+        self._score   = ScorePattern(self.score_pattern)
+        self._budgets = self.budget.rungs()
+
+        if not 1 <= self.brackets <= len(self._budgets):
+            error(f"Invalid property value in {self.__class__.__name__}: brackets must be between 1 and {len(self._budgets)}")
+
+        # Each bracket keeps, for every rung, the results sorted from best to worst and the combinations promoted from it
+
+        self._rungs = [[{"results": [], "promoted": set()} for _ in self._budgets] for _ in range(self.brackets)]
+
+        # Bracket b starts its combinations directly in rung b, that is, with a larger budget.
+        # Promotions are postponed until all results from previous executions are known,
+        # this way resuming an experiment promotes the same combinations it did before.
+
+        self._resuming = True
+
+        for combination_idd, combination in enumerate(self._combinations(self.vars)):
+            self._combos[combination_idd] = combination
+            self._launch(scheduler, combination_idd, combination_idd % self.brackets)
+
+        for rung in range(len(self._budgets) - 1):
+            for bracket in range(self.brackets):
+                self._promote(scheduler, bracket, rung)
+
+        self._resuming = False
+
+    def _launch(self, scheduler, combination_idd, rung):
+
+        task = self._create_task(combination_idd, rung)
+
+        if self._submit(scheduler, task) == 'done':
+            self._on_rung_finished(scheduler, task, self._load_stdout(task))
+
+    def _on_rung_finished(self, scheduler, task:Task, stdout):
+
+        combination_idd = task.combination_idd
+        rung            = task.task_idd % len(self._budgets)
+        state           = self._rungs[combination_idd % self.brackets][rung]
+        score           = self._score.parse(stdout)
+
+        # Failed tasks and outputs without a score rank last
+
+        if score is None:
+            key = float('inf')
+        else:
+            key = -score if self.goal == 'max' else score
+
+        insort(state["results"], (key, combination_idd))
+
+        if not self._resuming:
+            self._promote(scheduler, combination_idd % self.brackets, rung)
+
+    def _promote(self, scheduler, bracket, rung):
+
+        # Asynchronous successive halving: as soon as a combination is in the
+        # top 1/eta of the results seen so far in its rung, it is promoted.
+        # Workers never wait for a rung to be complete.
+
+        if rung + 1 == len(self._budgets):
+            return
+
+        state      = self._rungs[bracket][rung]
+        top        = int(len(state["results"]) // self.budget.eta)
+        candidates = state["results"][:top]
+
+        # A previous execution may have promoted combinations before better
+        # ones were known, their results in the next rung are kept too
+
+        if self._resuming and not self.redo_tasks:
+            candidates += [x for x in state["results"][top:] if self._is_done(self._create_task(x[1], rung + 1))]
+
+        for key, candidate in candidates:
+            if candidate not in state["promoted"] and key != float('inf'):
+                state["promoted"].add(candidate)
+                self._launch(scheduler, candidate, rung + 1)
+
+    def on_task_completed(self, scheduler, task:Task):
+
+        self._write_task(task)
+
+        stdout = task.attempts[-1]['stdout'] if task.success and task.attempts else None
+        self._on_rung_finished(scheduler, task, stdout)
+
+    def on_finish(self):
+
+        # Report the best combination that reached the largest budget
+
+        for bracket, rungs in enumerate(self._rungs):
+            for rung in reversed(range(len(rungs))):
+                results = rungs[rung]["results"]
+
+                if results and results[0][0] != float('inf'):
+                    key, combination_idd = results[0]
+                    score = -key if self.goal == 'max' else key
+                    info(f"Best in bracket {bracket} ({self.budget.name}={self._budgets[rung]}): {self._combos[combination_idd]}, score={score}")
+                    break
+
+
+class CDEEPSOExperimentSchema(BaseExperimentSchema):
+
+    def __init__(self):
         
-        # Dump fail and success outputs
+        super().__init__()
+        self.type          = 'cdeepso'
+        self.population    = None
+        self.evaluations   = 1000
+        self.seed          = None
+        self.tau           = 0.2
+        self.communication = 0.75
+        self._swarm        = None
+        self._pending      = {}
+        self._launched     = 0
+        self._next_task    = 0
+    
+    def init_from(self, data):
 
-        for i, attempt in enumerate(task.attempts):
-            attempt = task.attempts[i]
+        super().init_from(data)
+        self.load_property('score_pattern', data, mandatory=True)
+        self.load_property('population', data)
+        self.load_property('evaluations', data)
+        self.load_property('seed', data)
+        self.load_property('tau', data)
+        self.load_property('communication', data)
+        return self
+
+    def number_of_tasks(self):
+
+        return self.evaluations
+
+    def summary(self, indent=None):
+
+        tasks = self.number_of_tasks()
+        attrs = ['experiment_idd', 'redo_tasks', 'workdir', 'cmd', 'max_tries', 'score_pattern', 'goal', 'population', 'evaluations', 'seed']
+
+        lines  = [f"'{self.name}' ({tasks} {plural(tasks, 'task')}):"]
+        lines += [f"    {name}: {getattr(self, name)}" for name in attrs]
+        lines += [f'    variables ({len(self.vars)}):']
+        lines += [f"        {v.name} = {self._bounds(v)}" for v in self.vars]
+
+        lines = '\n'.join(lines)
+        return indent_lines(lines, indent) if indent else lines
+
+    def _bounds(self, var):
+
+        if var.type == 'list':
+            return str(var.values)
+        elif var.type == 'geometric':
+            return f"[{var.min}, {var.max}], log scale"
+        else:
+            return f"[{var.min}, {var.max}]"
+
+    def signature_data(self):
+
+        signature_data = super().signature_data()
+
+        signature_data["score_pattern"] = self.score_pattern
+        signature_data["goal"]          = self.goal
+
+        return signature_data
+
+    def _fitness(self, stdout):
+
+        # The swarm maximizes, minimization goals are negated
+
+        score = self._score.parse(stdout)
+
+        if score is None:
+            return None
+
+        return score if self.goal == 'max' else -score
+
+    def _load_previous(self):
+
+        # Evaluations completed in previous executions, used to resume the search
+
+        previous = []
+
+        for task, stdout in self._load_previous_tasks():
+            position = [v.encode(task.combination.get(v.name)) for v in self.vars]
+
+            if any(u is None for u in position):
+                continue
+
+            previous.append((task, position, self._fitness(stdout)))
 
-            if attempt['status'] == 0:
-                filepath = os.path.join(task.output_dir, f'success.stdout')
+        return previous
+
+    def on_start(self, scheduler):
+
+        from .parse import ScorePattern
+        from .cdeepso import Swarm
+
+        if not self.vars:
+            error(f"Missing required property in {self.__class__.__name__}: vars")
+
+        if self.task_filters:
+            warn(f"CDEEPSOExperiment ignores task filters")
+
+        population   = self.population or max(len(scheduler.workers), 10)
+        self._score  = ScorePattern(self.score_pattern)
+        self._swarm  = Swarm(len(self.vars), self.seed, self.tau, self.communication, memory=population)
+
+        # Resume from the evaluations done before, the best ones become particles
+
+        previous = [] if self.redo_tasks else self._load_previous()
+        previous.sort(key=lambda x: float('-inf') if x[2] is None else x[2], reverse=True)
+
+        for i, (task, position, fitness) in enumerate(previous):
+            scheduler.push_done(task)
+
+            self._launched  += 1
+            self._next_task  = max(self._next_task, task.task_idd + 1)
+
+            if i < population:
+                particle = self._swarm.spawn(position, fitness)
+                self._swarm.move(particle)
             else:
-                filepath = os.path.join(task.output_dir, f'fail{i}.stdout')
-            
-            with open(filepath, "wb") as fout:
-                fout.write(attempt['stdout'])
-        
-        # Create .success or .failure file
+                self._swarm.remember(position, fitness)
 
-        filepath = success_filepath if task.success else failure_filepath
-        
-        with open(filepath, 'a'):
-            os.utime(filepath, None)
+        if previous:
+            info(f"Resuming {self.name} from {len(previous)} previous {plural(len(previous), 'evaluation')}")
+
+        while len(self._swarm.particles) < population:
+            self._swarm.spawn()
+
+        # Every particle is evaluated in parallel, each one moves again as soon as its fitness arrives
+
+        for particle in self._swarm.particles:
+            self._evaluate(scheduler, particle)
+
+    def _evaluate(self, scheduler, particle):
+
+        if self._launched >= self.evaluations:
+            return
+
+        combination = {v.name: v.decode(u) for v, u in zip(self.vars, particle.position)}
+
+        # Particles in invalid regions keep moving without being evaluated
+
+        for _ in range(100):
+            if not self.constraints or self._satisfies(combination):
+                break
+
+            self._swarm.move(particle)
+            combination = {v.name: v.decode(u) for v, u in zip(self.vars, particle.position)}
+
+        else:
+            warn(f"Particle {particle.idd} could not reach a combination that satisfies the constraints")
+            return
+
+        task_idd    = self._next_task
+        output_dir  = os.path.join(self.output_folder, str(task_idd))
+        cmds        = [x.format(**combination) for x in self.cmd]
+        task        = Task(self.name, output_dir, self.workdir, self.experiment_idd, particle.idd, particle.moves, task_idd, combination, cmds, self.max_tries)
+
+        self._next_task += 1
+        self._launched  += 1
+        self._pending[task_idd] = particle
+
+        scheduler.push_todo(task)
+
+    def on_task_completed(self, scheduler, task:Task):
+
+        self._write_task(task)
+
+        particle = self._pending.pop(task.task_idd)
+        stdout   = task.attempts[-1]['stdout'] if task.success and task.attempts else None
+
+        self._swarm.report(particle, self._fitness(stdout))
+        self._swarm.move(particle)
+        self._evaluate(scheduler, particle)
+
+    def on_finish(self):
+
+        swarm = self._swarm
+
+        if swarm is not None and swarm.best_position is not None:
+            combination = {v.name: v.decode(u) for v, u in zip(self.vars, swarm.best_position)}
+            score       = swarm.best_fitness if self.goal == 'max' else -swarm.best_fitness
+            info(f"Best particle in {self.name}: {combination}, score={score}")
+
+
+class StrategyExperimentSchema(BaseExperimentSchema):
+
+    def __init__(self):
+
+        super().__init__()
+        self.type            = 'strategy'
+        self.strategy        = None
+        self.strategy_params = {}
+        self.patterns        = {}
+        self.evaluations     = 1000
+        self.seed            = None
+        self._strategy       = None
+        self._previous       = {}
+        self._launched       = 0
+        self._next_task      = 0
+        self._num_previous   = 0
+
+    def init_from(self, data):
+
+        super().init_from(data)
+        self.load_property('strategy', data, mandatory=self.strategy is None)
+        self.load_property('strategy_params', data)
+        self.load_property('patterns', data)
+        self.load_property('evaluations', data)
+        self.load_property('seed', data)
+        return self
+
+    def number_of_tasks(self):
+
+        return self.evaluations
+
+    def summary(self, indent=None):
+
+        tasks = self.number_of_tasks()
+        attrs = ['experiment_idd', 'redo_tasks', 'workdir', 'cmd', 'max_tries', 'strategy', 'strategy_params', 'score_pattern', 'goal', 'evaluations', 'seed']
+
+        lines  = [f"'{self.name}' (up to {tasks} {plural(tasks, 'task')}):"]
+        lines += [f"    {name}: {getattr(self, name)}" for name in attrs]
+        lines += [f'    variables ({len(self.vars)}):']
+        lines += [f"        {v.name} = {self._domain(v)}" for v in self.vars]
+
+        lines = '\n'.join(lines)
+        return indent_lines(lines, indent) if indent else lines
+
+    def _domain(self, var):
+
+        if not getattr(var, 'continuous', False):
+            return f"{str(var.values)}, len = {len(var.values)}"
+        elif var.type == 'geometric':
+            return f"[{var.min}, {var.max}], continuous, log scale"
+        else:
+            return f"[{var.min}, {var.max}], continuous"
+
+    def signature_data(self):
+
+        signature_data = super().signature_data()
+
+        signature_data["strategy"]        = self.strategy
+        signature_data["strategy_params"] = self.strategy_params
+        signature_data["score_pattern"]   = self.score_pattern
+        signature_data["goal"]            = self.goal
+        signature_data["seed"]            = self.seed
+
+        return signature_data
+
+    def _result(self, task:Task, stdout):
+
+        result = {
+            "score"   : self._score.parse(stdout) if self._score else None,
+            "scores"  : {name:p.parse(stdout) for name, p in self._patterns.items()},
+            "duration": task.attempts[-1]['duration'] if task.attempts else None,
+            "success" : stdout is not None,
+        }
+
+        return result
+
+    def on_start(self, scheduler):
+
+        from .parse import ScorePattern
+        from .strategies import load_strategy
+
+        if self.repeat != 1:
+            warn(f"StrategyExperiment ignores repeat={self.repeat}")
+
+        if self.task_filters:
+            warn(f"StrategyExperiment ignores task filters")
+
+        self._score    = ScorePattern(self.score_pattern) if self.score_pattern else None
+        self._patterns = {name:ScorePattern(x) for name, x in self.patterns.items()}
+
+        strategy_type  = load_strategy(self.strategy)
+        self._strategy = strategy_type(self.vars, self.strategy_params, self.seed, self.goal)
+
+        # Previous results warm start the strategy. If it asks for one of
+        # these combinations again, the previous result is reused.
+
+        if not self.redo_tasks:
+            for task, stdout in self._load_previous_tasks():
+                scheduler.push_done(task)
+
+                self._previous[self._previous_key(task)] = task
+                self._next_task     = max(self._next_task, task.task_idd + 1)
+                self._launched     += 1
+                self._num_previous += 1
+                self._strategy.tell(task.combination, self._result(task, stdout))
+
+        # Candidates are created on demand, whenever workers are free
+
+        self.on_workers_idle(scheduler, len(scheduler.workers))
+
+    def _previous_key(self, task:Task):
+
+        # Identity of a previous result, reused when the strategy asks for it again
+
+        return combination_key(task.combination)
+
+    def on_workers_idle(self, scheduler, count):
+
+        asked = 0
+
+        while count > 0 and self._launched < self.evaluations and not self._strategy.is_finished():
+            candidates = self._strategy.ask(min(count, self.evaluations - self._launched))
+
+            if not candidates:
+                break
+
+            for combination in candidates:
+                if self._previous.pop(combination_key(combination), None) is not None:
+                    continue
+
+                # Invalid combinations are reported as failures without being executed
+
+                if self.constraints and not self._satisfies(combination):
+                    self._strategy.tell(combination, {"score": None, "scores": {}, "duration": 0.0, "success": False})
+                    continue
+
+                task_idd   = self._next_task
+                output_dir = os.path.join(self.output_folder, str(task_idd))
+                cmds       = [x.format(**combination) for x in self.cmd]
+                task       = Task(self.name, output_dir, self.workdir, self.experiment_idd, task_idd, 0, task_idd, combination, cmds, self.max_tries)
+
+                self._next_task += 1
+                self._launched  += 1
+                count           -= 1
+
+                scheduler.push_todo(task)
+
+            # Avoid spinning when a strategy keeps proposing combinations done before
+
+            asked += len(candidates)
+
+            if asked > self._num_previous + 100 * len(scheduler.workers):
+                break
+
+    def on_task_completed(self, scheduler, task:Task):
+
+        self._write_task(task)
+
+        stdout = task.attempts[-1]['stdout'] if task.success and task.attempts else None
+        self._strategy.tell(task.combination, self._result(task, stdout))
 
     def on_finish(self):
         pass
 
 
-class CDEEPSOExperimentSchema(BaseExperimentSchema):
+class SamplingExperimentSchema(StrategyExperimentSchema):
+
+    def __init__(self, sampling='random'):
+
+        super().__init__()
+        self.type     = sampling
+        self.strategy = sampling
+        self.samples  = 100
+        self.batch    = 100
+        self.seed     = 0
+
+    def init_from(self, data):
+
+        super().init_from(data)
+        self.load_property('samples', data)
+        self.load_property('batch', data)
+        return self
+
+    def number_of_tasks(self):
+
+        return self.samples
+
+    def summary(self, indent=None):
+
+        tasks = self.number_of_tasks()
+        attrs = ['experiment_idd', 'redo_tasks', 'workdir', 'cmd', 'max_tries', 'samples', 'seed']
+
+        if self.type == 'lhs':
+            attrs.append('batch')
+
+        lines  = [f"'{self.name}' ({tasks} {plural(tasks, 'task')}):"]
+        lines += [f"    {name}: {getattr(self, name)}" for name in attrs]
+        lines += [f'    variables ({len(self.vars)}):']
+        lines += [f"        {v.name} = {self._domain(v)}" for v in self.vars]
+
+        lines = '\n'.join(lines)
+        return indent_lines(lines, indent) if indent else lines
+
+    def signature_data(self):
+
+        # The number of samples is not part of the signature, increasing it extends the experiment
+
+        signature_data = super().signature_data()
+
+        if self.type == 'lhs':
+            signature_data["batch"] = self.batch
+
+        return signature_data
+
+    def on_start(self, scheduler):
+
+        self.evaluations     = self.samples
+        self.strategy_params = {'batch': self.batch} if self.type == 'lhs' else {}
+
+        super().on_start(scheduler)
+
+    def _previous_key(self, task:Task):
+
+        # Samples are identified by their index in the sequence, which is also
+        # their task id, as discrete domains repeat values between samples
+
+        return task.task_idd
+
+    def on_workers_idle(self, scheduler, count):
+
+        while count > 0 and self._strategy.next < self.samples:
+            first      = self._strategy.next
+            candidates = self._strategy.ask(min(count, self.samples - first))
+
+            for task_idd, combination in enumerate(candidates, first):
+                if self._previous.pop(task_idd, None) is not None:
+                    continue
+
+                if self.constraints and not self._satisfies(combination):
+                    continue
+
+                output_dir = os.path.join(self.output_folder, str(task_idd))
+                cmds       = [x.format(**combination) for x in self.cmd]
+                task       = Task(self.name, output_dir, self.workdir, self.experiment_idd, task_idd, 0, task_idd, combination, cmds, self.max_tries)
+
+                count -= 1
+                scheduler.push_todo(task)
+
+
+class BayesExperimentSchema(StrategyExperimentSchema):
 
     def __init__(self):
-        
+
         super().__init__()
-        self.score_pattern = None
-        self.type = 'cdeepso'
-    
+        self.type        = 'bayes'
+        self.strategy    = 'bayes'
+        self.evaluations = 100
+        self.initial     = None
+        self.candidates  = 1000
+        self.max_history = 500
+        self.seed        = 0
+
     def init_from(self, data):
 
         super().init_from(data)
-        self.load_property('score_pattern', data, mandatory=True)
+        self.load_property('initial', data)
+        self.load_property('candidates', data)
+        self.load_property('max_history', data)
+        return self
+
+    def summary(self, indent=None):
+
+        tasks = self.number_of_tasks()
+        attrs = ['experiment_idd', 'redo_tasks', 'workdir', 'cmd', 'max_tries', 'score_pattern', 'goal', 'evaluations', 'initial', 'candidates', 'max_history', 'seed']
+
+        lines  = [f"'{self.name}' (up to {tasks} {plural(tasks, 'task')}):"]
+        lines += [f"    {name}: {getattr(self, name)}" for name in attrs]
+        lines += [f'    variables ({len(self.vars)}):']
+        lines += [f"        {v.name} = {self._domain(v)}" for v in self.vars]
+
+        lines = '\n'.join(lines)
+        return indent_lines(lines, indent) if indent else lines
+
+    def on_start(self, scheduler):
+
+        if not self.score_pattern:
+            error("BayesExperiment requires a score_pattern")
+
+        self.strategy_params = {'candidates': self.candidates, 'max_history': self.max_history}
+
+        if self.initial is not None:
+            self.strategy_params['initial'] = self.initial
+
+        super().on_start(scheduler)
+
+    def on_finish(self):
+
+        best = self._strategy.best if self._strategy is not None else None
+
+        if best is not None:
+            info(f"Best combination in {self.name}: {best[1]}, score={best[0]}")
+
+
+class RefineExperimentSchema(StrategyExperimentSchema):
+
+    def __init__(self):
+
+        super().__init__()
+        self.type        = 'refine'
+        self.strategy    = 'refine'
+        self.evaluations = None
+        self.levels      = 3
+        self.top         = 1
+        self.points      = 5
+        self.overlap     = 0.9
+
+    def init_from(self, data):
+
+        super().init_from(data)
+        self.load_property('levels', data)
+        self.load_property('top', data)
+        self.load_property('points', data)
+        self.load_property('overlap', data)
         return self
 
+    def number_of_tasks(self):
+
+        # Coarse grid plus the largest possible refined grids. Evaluations
+        # only limit the refined levels, the coarse grid always runs whole.
+
+        coarse  = self.number_of_combinations()
+        refined = reduce(lambda a,b: a*(self.points if b.type in ['arithmetic', 'geometric'] else min(self.top, len(b.values))), self.vars, 1)
+        tasks   = coarse + self.levels * refined
+
+        if self.evaluations is None:
+            return tasks
+
+        return max(coarse, min(self.evaluations, tasks))
+
+    def summary(self, indent=None):
+
+        tasks = self.number_of_tasks()
+        attrs = ['experiment_idd', 'redo_tasks', 'workdir', 'cmd', 'max_tries', 'score_pattern', 'goal', 'levels', 'top', 'points', 'overlap']
+
+        lines  = [f"'{self.name}' (up to {tasks} {plural(tasks, 'task')}):"]
+        lines += [f"    {name}: {getattr(self, name)}" for name in attrs]
+        lines += [f'    variables ({len(self.vars)}):']
+        lines += [f"        {v.name} = {self._domain(v)}" for v in self.vars]
+
+        lines = '\n'.join(lines)
+        return indent_lines(lines, indent) if indent else lines
+
+    def on_start(self, scheduler):
+
+        if not self.score_pattern:
+            error("RefineExperiment requires a score_pattern")
+
+        self.strategy_params = {'levels': self.levels, 'top': self.top, 'points': self.points, 'overlap': self.overlap}
+        self.evaluations     = self.number_of_tasks()
+
+        super().on_start(scheduler)
+
+    def on_finish(self):
+
+        best = self._strategy.best if self._strategy is not None else None
+
+        if best is not None:
+            info(f"Best combination in {self.name}: {best[1]}, score={best[0]}")
+
 
 def load_cluster(filepath):
     with open(filepath, "r") as fin:
@@ -562,22 +2475,32 @@ def load_experiment(filepath):
             data['type'] = 'grid'
         if data['type'] == 'grid':
             return GridExperimentSchema().init_from(data)
+        elif data['type'] == 'hyperband':
+            return HyperbandExperimentSchema().init_from(data)
         elif data['type'] == 'cdeepso':
             return CDEEPSOExperimentSchema().init_from(data)
+        elif data['type'] == 'strategy':
+            return StrategyExperimentSchema().init_from(data)
+        elif data['type'] in ['random', 'lhs', 'sobol']:
+            return SamplingExperimentSchema(data['type']).init_from(data)
+        elif data['type'] == 'bayes':
+            return BayesExperimentSchema().init_from(data)
+        elif data['type'] == 'refine':
+            return RefineExperimentSchema().init_from(data)
         else:
             abort(f'Invalid experiment type: {data["type"]}')
 
 
 def save_cluster(filepath:str, data:ClusterSchema):
     with open(filepath, "w") as fout:
-        yaml.dump(format_as_dict(data), fout, default_flow_style=False)
+        yaml.dump(format_as_options(data), fout, default_flow_style=False)
 
 
 def save_experiment(filepath:str, data:ClusterSchema):
     with open(filepath, "w") as fout:
-        yaml.dump(format_as_dict(data), fout, default_flow_style=False)
+        yaml.dump(format_as_options(data), fout, default_flow_style=False)
 
 
 def format_as_yaml(data:Schema):
-    return yaml.dump(format_as_dict(data), default_flow_style=False)
+    return yaml.dump(format_as_options(data), default_flow_style=False)
 
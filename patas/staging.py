@@ -0,0 +1,213 @@
+from .utils import error, warn, info, is_local
+
+from concurrent.futures import ThreadPoolExecutor
+
+import subprocess
+import hashlib
+import shutil
+import shlex
+import re
+import os
+
+
+STAGING_FOLDER = '.patas/inputs'
+
+
+def hash_path(path):
+
+    # Content hash of a file or folder, including the names inside the folder
+
+    digest = hashlib.sha256()
+    base   = os.path.dirname(path)
+
+    if os.path.isdir(path):
+        filepaths = sorted(os.path.join(root, x) for root, _, files in os.walk(path) for x in files)
+    else:
+        filepaths = [path]
+
+    for filepath in filepaths:
+        digest.update(os.path.relpath(filepath, base).encode() + b'\0')
+
+        with open(filepath, 'rb') as fin:
+            for block in iter(lambda: fin.read(1 << 20), b''):
+                digest.update(block)
+
+    return digest.hexdigest()[:32]
+
+
+def input_variable(path):
+
+    # Name of the variable pointing to the snapshot of an input, like PATAS_INPUT_DATASET_CSV
+
+    return "PATAS_INPUT_" + re.sub(r'\W', '_', os.path.basename(path.rstrip('/'))).upper()
+
+
+class Host:
+
+    # Machine receiving inputs. Nodes in the same machine share its home, so
+    # they are staged once.
+
+    def __init__(self, node):
+
+        self.local       = is_local(node.hostname)
+        self.name        = 'local' if self.local else node.name
+        self.credential  = node.credential
+        self.port        = node.port
+        self.private_key = node.private_key
+
+    def key(self):
+
+        return 'local' if self.local else (self.credential, self.port)
+
+    def ssh(self, cmd=None):
+
+        # Arguments of the ssh command that reaches this host
+
+        args = ['ssh', '-o', 'BatchMode=yes']
+
+        if self.private_key:
+            args += ['-i', self.private_key]
+
+        if self.port:
+            args += ['-p', str(self.port)]
+
+        return args + [self.credential] + ([cmd] if cmd else [])
+
+
+class Staging:
+
+    # Copies input files and folders into a content-addressed folder in the
+    # home of every node, ~/.patas/inputs/<hash>/<name>. Each content is
+    # transferred once per machine and only when it is not there yet.
+    # Transfers fan out: in each round, the master and every host that
+    # already received a content send it to another host that is missing
+    # it, so the number of copies doubles every round instead of all of them
+    # leaving the master. Hosts that cannot reach their peers receive their
+    # copies from the master.
+
+    def __init__(self, nodes, fanout=True, parallel=16):
+
+        hosts = {}
+
+        for node in nodes:
+            host = Host(node)
+            hosts.setdefault(host.key(), host)
+
+        self.hosts    = list(hosts.values())
+        self.fanout   = fanout
+        self.parallel = parallel
+
+    def stage(self, paths, workdir=None):
+
+        # Returns the variables that give tasks the path of each snapshot
+
+        base   = os.path.expandvars(os.path.expanduser(workdir)) if workdir else os.getcwd()
+        inputs = {}
+        env    = {}
+
+        for path in paths:
+            filepath = os.path.abspath(os.path.join(base, os.path.expanduser(path)))
+
+            if not os.path.exists(filepath):
+                error(f"Input not found: {path}")
+
+            name   = os.path.basename(filepath)
+            digest = hash_path(filepath)
+
+            inputs[digest]            = filepath
+            env[input_variable(path)] = f"$HOME/{STAGING_FOLDER}/{digest}/{name}"
+
+        present = self._present(list(inputs.keys()))
+
+        for digest, filepath in inputs.items():
+            missing = [x for x in self.hosts if digest not in present[x.key()]]
+
+            if missing:
+                info(f"Staging {os.path.basename(filepath)} ({digest[:8]}) to {len(missing)} of {len(self.hosts)} machines")
+                self._spread(digest, filepath, missing)
+
+        return env
+
+    def _present(self, digests):
+
+        # Contents each host already has, checked in parallel
+
+        def check(host):
+
+            if host.local:
+                return {x for x in digests if os.path.isdir(os.path.join(os.path.expanduser('~'), STAGING_FOLDER, x))}
+
+            cmd = " ; ".join(f'test -d {STAGING_FOLDER}/{x} && echo {x}' for x in digests) + " ; true"
+            result = subprocess.run(host.ssh(cmd), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL)
+            return set(result.stdout.decode('utf-8', errors='replace').split()) if result.returncode == 0 else set()
+
+        with ThreadPoolExecutor(self.parallel) as pool:
+            return dict(zip([x.key() for x in self.hosts], pool.map(check, self.hosts)))
+
+    def _spread(self, digest, filepath, missing):
+
+        # Transfers in rounds, every source sends to one missing host per round
+
+        sources = [None]
+        missing = list(missing)
+
+        while missing:
+            pairs = list(zip(sources, missing))
+
+            with ThreadPoolExecutor(self.parallel) as pool:
+                results = list(pool.map(lambda x: self._transfer(x[0], x[1], digest, filepath), pairs))
+
+            for (source, target), success in zip(pairs, results):
+                missing.remove(target)
+
+                if success:
+                    if self.fanout and not target.local:
+                        sources.append(target)
+
+                elif source is not None:
+                    warn(f"Peer transfer from {source.name} to {target.name} failed, using the master instead")
+                    sources.remove(source)
+                    missing.append(target)
+
+                else:
+                    error(f"Could not stage {filepath} to {target.name}")
+
+    def _transfer(self, source, target, digest, filepath):
+
+        # Copies a content from the master (source None) or from a host that
+        # already has it. The content is extracted into a temporary folder
+        # and renamed, so a folder with the hash is always complete.
+
+        name    = os.path.basename(filepath)
+        folder  = f"{STAGING_FOLDER}/{digest}"
+        partial = f"{folder}.{os.getpid()}.partial"
+
+        if target.local:
+            home = os.path.expanduser('~')
+            tmp  = os.path.join(home, partial)
+
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+
+            if os.path.isdir(filepath):
+                shutil.copytree(filepath, os.path.join(tmp, name), symlinks=True)
+            else:
+                shutil.copy2(filepath, os.path.join(tmp, name))
+
+            try:
+                os.rename(tmp, os.path.join(home, folder))
+            except OSError:
+                shutil.rmtree(tmp, ignore_errors=True)
+
+            return True
+
+        receive = f"rm -rf {partial} && mkdir -p {partial} && tar -C {partial} -xf - && mv -T {partial} {folder} || test -d {folder}"
+        receive = shlex.join(target.ssh(receive))
+
+        if source is None:
+            cmd = f"tar -C {shlex.quote(os.path.dirname(filepath))} -cf - {shlex.quote(name)} | {receive}"
+        else:
+            cmd = f"tar -C {folder} -cf - {shlex.quote(name)} | {receive}"
+            cmd = shlex.join(source.ssh(cmd))
+
+        return subprocess.run(cmd, shell=True, stdin=subprocess.DEVNULL).returncode == 0
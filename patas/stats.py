@@ -0,0 +1,49 @@
+from statistics import NormalDist, stdev
+
+import math
+
+
+def t_critical(confidence, dof):
+
+    # Two-sided critical value of the Student's t distribution, approximated
+    # with the Cornish-Fisher expansion around the normal quantile. The error
+    # is below 1% for dof >= 3 (3% for dof = 2), which is enough to decide
+    # when to stop repeating a combination, and avoids depending on scipy.
+
+    z = NormalDist().inv_cdf(0.5 + confidence / 2.0)
+
+    if dof is None or dof <= 0 or math.isinf(dof):
+        return z
+
+    g1 = (z**3 + z) / 4.0
+    g2 = (5 * z**5 + 16 * z**3 + 3 * z) / 96.0
+    g3 = (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / 384.0
+
+    return z + g1 / dof + g2 / dof**2 + g3 / dof**3
+
+
+def ci_width(values, confidence=0.95):
+
+    # Width of the confidence interval for the mean of values
+
+    if len(values) < 2:
+        return float('inf')
+
+    return 2.0 * t_critical(confidence, len(values) - 1) * stdev(values) / math.sqrt(len(values))
+
+
+def required_samples(values, width, confidence=0.95):
+
+    # Estimates how many samples are needed to shrink the confidence interval
+    # below width, assuming the current standard deviation holds
+
+    if len(values) < 2:
+        return len(values) + 1
+
+    s = stdev(values)
+
+    if s == 0:
+        return len(values)
+
+    return math.ceil((2.0 * t_critical(confidence, len(values) - 1) * s / width) ** 2)
+
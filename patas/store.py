@@ -0,0 +1,233 @@
+from glob import glob
+
+import struct
+import time
+import yaml
+import zlib
+import os
+
+
+STORE_FOLDER   = "packed"
+INDEX_FILENAME = "index.tsv"
+RECORD_MAGIC   = b"PTR1"
+RECORD_HEADER  = struct.Struct("<4sIQ")
+
+
+def encode_record(info, outputs):
+
+    # A record is a header, the info of the task as yaml and the outputs of
+    # its attempts compressed together, each one prefixed by its length
+
+    meta = yaml.dump(info, default_flow_style=False).encode()
+    body = zlib.compress(b"".join(struct.pack("<Q", len(x)) + x for x in outputs))
+
+    return RECORD_HEADER.pack(RECORD_MAGIC, len(meta), len(body)) + meta + body
+
+
+def decode_record(data):
+
+    magic, meta_size, body_size = RECORD_HEADER.unpack_from(data)
+
+    if magic != RECORD_MAGIC:
+        raise ValueError("invalid record")
+
+    meta    = data[RECORD_HEADER.size:RECORD_HEADER.size + meta_size]
+    body    = zlib.decompress(data[RECORD_HEADER.size + meta_size:RECORD_HEADER.size + meta_size + body_size])
+    outputs = []
+    offset  = 0
+
+    while offset < len(body):
+        size, = struct.unpack_from("<Q", body, offset)
+        outputs.append(body[offset + 8:offset + 8 + size])
+        offset += 8 + size
+
+    return yaml.load(meta, Loader=yaml.FullLoader), outputs
+
+
+class PackedStore:
+
+    # Results of an experiment packed in a few files instead of one folder
+    # per task. Records are appended to segment files and located through
+    # an append-only index, where the last line of a task wins, so retries
+    # and executions that redo a task simply append again. Records are
+    # buffered and written in batches: the segment is written and synced
+    # before the index lines that point to it, so a crash loses at most the
+    # last batch and never leaves the index pointing to incomplete data.
+
+    def __init__(self, folder, batch=256, interval=5.0, max_segment=1 << 30):
+
+        self.folder      = folder
+        self.batch       = batch
+        self.interval    = interval
+        self.max_segment = max_segment
+        self.index       = None
+        self.pending     = {}
+        self.segment     = None
+        self.flushed_at  = time.time()
+
+    def _load(self):
+
+        if self.index is not None:
+            return
+
+        self.index = {}
+        filepath   = os.path.join(self.folder, INDEX_FILENAME)
+
+        if not os.path.exists(filepath):
+            return
+
+        with open(filepath, "r") as fin:
+            for line in fin:
+                cells = line.rstrip("\n").split("\t")
+
+                # Lines cut by a crash are ignored
+
+                if not line.endswith("\n") or len(cells) != 5:
+                    continue
+
+                if cells[4] == "-":
+                    self.index.pop(cells[0], None)
+                else:
+                    self.index[cells[0]] = (cells[1], int(cells[2]), int(cells[3]), cells[4])
+
+    def ids(self):
+
+        self._load()
+        return list(self.index.keys() | self.pending.keys())
+
+    def state(self, task_idd):
+
+        # success, failure, pruned or exceeded, None if the task is not in the store
+
+        self._load()
+        task_idd = str(task_idd)
+
+        if task_idd in self.pending:
+            return self.pending[task_idd][1]
+
+        entry = self.index.get(task_idd)
+        return entry[3] if entry else None
+
+    def get(self, task_idd):
+
+        # Returns the info of a task and the outputs of its attempts
+
+        self._load()
+        task_idd = str(task_idd)
+
+        if task_idd in self.pending:
+            return decode_record(self.pending[task_idd][0])
+
+        segment, offset, length, _ = self.index[task_idd]
+
+        with open(os.path.join(self.folder, segment), "rb") as fin:
+            fin.seek(offset)
+            return decode_record(fin.read(length))
+
+    def put(self, task_idd, info, outputs, state):
+
+        self._load()
+        self.pending[str(task_idd)] = (encode_record(info, outputs), state)
+
+        if len(self.pending) >= self.batch or time.time() - self.flushed_at >= self.interval:
+            self.flush()
+
+    def forget(self, task_idds):
+
+        # Removes tasks from the index, their records stay in the segments
+
+        self.flush()
+
+        lines = [f"{x}\t-\t0\t0\t-\n" for x in task_idds if str(x) in self.index]
+
+        for task_idd in task_idds:
+            self.index.pop(str(task_idd), None)
+
+        self._append_index(lines)
+
+    def flush(self):
+
+        self._load()
+        self.flushed_at = time.time()
+
+        if not self.pending:
+            return
+
+        os.makedirs(self.folder, exist_ok=True)
+
+        segment  = self._segment()
+        filepath = os.path.join(self.folder, segment)
+        lines    = []
+        entries  = {}
+
+        with open(filepath, "ab") as fout:
+            offset = fout.tell()
+
+            for task_idd, (record, state) in self.pending.items():
+                fout.write(record)
+                entries[task_idd] = (segment, offset, len(record), state)
+                lines.append(f"{task_idd}\t{segment}\t{offset}\t{len(record)}\t{state}\n")
+                offset += len(record)
+
+            fout.flush()
+            os.fsync(fout.fileno())
+
+        self._append_index(lines)
+        self.index.update(entries)
+        self.pending = {}
+
+    def _append_index(self, lines):
+
+        if not lines:
+            return
+
+        with open(os.path.join(self.folder, INDEX_FILENAME), "a") as fout:
+            fout.writelines(lines)
+            fout.flush()
+            os.fsync(fout.fileno())
+
+    def _segment(self):
+
+        # Each execution appends to a new segment, so the data written by an
+        # interrupted execution is never followed by new records
+
+        if self.segment is None or os.path.getsize(os.path.join(self.folder, self.segment)) >= self.max_segment:
+            numbers      = [int(os.path.basename(x)[8:14]) for x in glob(os.path.join(self.folder, "segment-*.pack"))]
+            self.segment = f"segment-{max(numbers, default=0) + 1:06d}.pack"
+
+        return self.segment
+
+    def export(self, task_idd, folder):
+
+        # Writes a task in the layout of an experiment without a packed store
+
+        info, outputs = self.get(task_idd)
+        state         = self.state(task_idd)
+
+        os.makedirs(folder, exist_ok=True)
+
+        with open(os.path.join(folder, "info.yml"), "w") as fout:
+            yaml.dump(info, fout, default_flow_style=False)
+
+        for i, (attempt, output) in enumerate(zip(info["results"], outputs)):
+            filename = "success.stdout" if str(attempt["status"]) == "0" else f"fail{i}.stdout"
+
+            with open(os.path.join(folder, filename), "wb") as fout:
+                fout.write(output)
+
+        marker = {"success": ".success", "pruned": ".pruned", "exceeded": ".exceeded"}.get(state, ".failure")
+
+        with open(os.path.join(folder, marker), "a"):
+            pass
+
+
+def open_store(experiment_folder):
+
+    # The packed store of an experiment folder, or None if it uses one folder per task
+
+    folder = os.path.join(experiment_folder, STORE_FOLDER)
+
+    if not os.path.exists(os.path.join(folder, INDEX_FILENAME)):
+        return None
+
+    return PackedStore(folder)
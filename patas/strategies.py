@@ -0,0 +1,486 @@
+from .utils import error
+from .index import combination_key
+from functools import reduce
+
+import importlib
+import itertools
+import bisect
+import sys
+import os
+
+
+ENTRY_POINT_GROUP = 'patas.strategies'
+
+
+class Strategy:
+
+    # Base class for ask/tell search strategies.
+    #
+    # The scheduler calls ask(n) whenever n workers are free and no task is
+    # waiting, and tell(combination, result) as soon as each task completes.
+    # Both run inside the dispatch loop, so they must return quickly: ask
+    # returns only the candidates that are ready, possibly fewer than n or
+    # none at all, and is called again when the next worker becomes free.
+    #
+    # Combinations are dicts mapping each variable name to a value. Results
+    # are dicts with the keys:
+    #
+    #     score    - value captured by score_pattern, or None
+    #     scores   - dict with the values captured by each named pattern
+    #     duration - seconds spent executing the task
+    #     success  - False if the task gave up after max_tries
+    #
+    # Scores are reported as captured, check self.goal to know whether they
+    # must be maximized or minimized.
+
+    def __init__(self, variables, params=None, seed=None, goal='max'):
+
+        self.variables = variables
+        self.params    = params or {}
+        self.seed      = seed
+        self.goal      = goal
+
+    def ask(self, n):
+        raise NotImplementedError()
+
+    def tell(self, combination, result):
+        pass
+
+    def is_finished(self):
+
+        # Strategies may stop the experiment before it reaches its number of evaluations
+
+        return False
+
+    def decode(self, position):
+
+        # Converts a point in the unit hypercube into a combination
+
+        return {v.name: v.decode(u) for v, u in zip(self.variables, position)}
+
+
+class SamplingStrategy(Strategy):
+
+    # Evaluates the points of a sequence in order. Points are generated lazily
+    # and depend only on the seed and on their index, so a run may be extended
+    # with more samples without changing the ones evaluated before.
+
+    def __init__(self, variables, params=None, seed=None, goal='max'):
+
+        super().__init__(variables, params, seed or 0, goal)
+        self.sequence = self.create_sequence(len(variables))
+        self.next     = 0
+
+    def create_sequence(self, dims):
+        raise NotImplementedError()
+
+    def ask(self, n):
+
+        candidates = []
+
+        for index in range(self.next, self.next + n):
+            position = self.sequence[index]
+            candidates.append({v.name: v.sample(u) for v, u in zip(self.variables, position)})
+
+        self.next += n
+        return candidates
+
+
+class RandomStrategy(SamplingStrategy):
+
+    def create_sequence(self, dims):
+
+        from .sampling import RandomSequence
+        return RandomSequence(dims, self.seed)
+
+
+class LatinHypercubeStrategy(SamplingStrategy):
+
+    def create_sequence(self, dims):
+
+        from .sampling import LatinHypercubeSequence
+        return LatinHypercubeSequence(dims, self.seed, self.params.get('batch', 100))
+
+
+class SobolStrategy(SamplingStrategy):
+
+    def create_sequence(self, dims):
+
+        from .sampling import SobolSequence
+        return SobolSequence(dims, self.seed)
+
+
+class BayesianStrategy(Strategy):
+
+    # Bayesian optimization with a Gaussian process surrogate and expected
+    # improvement. The first points come from a Sobol sequence, then each call
+    # to ask scores a fresh set of candidates once and fills the batch
+    # greedily with local penalization: the acquisition is damped around
+    # every pending point, so a batch spreads over distinct promising regions
+    # and new proposals can be made while other tasks are still running.
+    #
+    # Params:
+    #
+    #     initial     - number of Sobol points before the surrogate is used
+    #     candidates  - number of random candidates scored per call to ask
+    #     max_history - observations kept in the surrogate, the best half
+    #                   and the most recent ones survive when it is trimmed
+    #     xi          - exploration margin of the expected improvement
+
+    def __init__(self, variables, params=None, seed=None, goal='max'):
+
+        import numpy as np
+        from .bayes import GaussianProcess
+        from .sampling import SobolSequence
+
+        super().__init__(variables, params, seed or 0, goal)
+
+        dims = len(variables)
+
+        self.initial     = self.params.get('initial', max(2 * dims, 8))
+        self.candidates  = self.params.get('candidates', 1000)
+        self.max_history = self.params.get('max_history', 500)
+        self.xi          = self.params.get('xi', 0.01)
+        self.rng         = np.random.default_rng(self.seed)
+        self.sequence    = SobolSequence(dims, self.seed)
+        self.gp          = GaussianProcess(dims, seed=self.seed)
+        self.next        = 0
+        self.pending     = {}     # combination key -> position
+        self.seen        = set()  # keys of combinations observed or pending
+        self.best        = None   # (score, combination), score as captured
+
+    def _snap(self, position):
+
+        # Combination of a point, and the point where the combination is actually evaluated
+
+        combination = {v.name: v.sample(u) for v, u in zip(self.variables, position)}
+        position    = [v.encode(combination[v.name]) for v in self.variables]
+
+        return combination, position
+
+    def ask(self, n):
+
+        proposals = []
+        attempts  = 0
+
+        # Space filling design until the surrogate has something to learn from.
+        # Small discrete domains may repeat combinations, so attempts are capped.
+
+        while len(proposals) < n and (self.next < self.initial or len(self.gp) < 2) and attempts < 10 * n + 100:
+            combination, position = self._snap(self.sequence[self.next])
+            self.next += 1
+            attempts  += 1
+
+            if combination_key(combination) not in self.seen:
+                proposals.append(self._propose(combination, position))
+
+        if len(proposals) < n and len(self.gp) >= 2:
+            proposals += self._ask_surrogate(n - len(proposals))
+
+        return proposals
+
+    def _propose(self, combination, position):
+
+        key = combination_key(combination)
+
+        self.pending[key] = position
+        self.seen.add(key)
+
+        return combination
+
+    def _ask_surrogate(self, n):
+
+        import numpy as np
+        from .bayes import expected_improvement
+
+        # Candidates: uniform points plus perturbations of the best observations
+
+        gp     = self.gp
+        points = list(self.rng.random((self.candidates, gp.dims)))
+        best   = gp.x[np.argsort(-gp.y)[:10]]
+        points += list(np.clip(best[self.rng.integers(len(best), size=self.candidates // 4)]
+                               + self.rng.normal(0.0, gp.lengthscale / 2, (self.candidates // 4, gp.dims)), 0.0, 1.0))
+
+        combinations = []
+        positions    = []
+        keys         = set()
+
+        for point in points:
+            combination, position = self._snap(point)
+            key                   = combination_key(combination)
+
+            if key not in self.seen and key not in keys:
+                keys.add(key)
+                combinations.append(combination)
+                positions.append(position)
+
+        if not positions:
+            return []
+
+        positions = np.array(positions, dtype=float)
+        mu, sigma = gp.predict(positions)
+        score     = expected_improvement(mu, sigma, gp.y.max(), self.xi * (gp.y.std() or 1.0))
+
+        for position in self.pending.values():
+            score *= self._penalty(positions, position)
+
+        proposals = []
+
+        while len(proposals) < n and len(proposals) < len(combinations):
+            idx = int(np.argmax(score))
+
+            proposals.append(self._propose(combinations[idx], list(positions[idx])))
+
+            score      *= self._penalty(positions, positions[idx])
+            score[idx]  = -1.0
+
+        return proposals
+
+    def _penalty(self, positions, position):
+
+        import numpy as np
+
+        d2 = ((positions - np.array(position, dtype=float)) ** 2).sum(axis=1)
+        return 1.0 - np.exp(-d2 / (2.0 * self.gp.lengthscale ** 2))
+
+    def tell(self, combination, result):
+
+        import numpy as np
+
+        key = combination_key(combination)
+
+        self.pending.pop(key, None)
+        self.seen.add(key)
+
+        if result['score'] is None:
+            return
+
+        position = [v.encode(combination[v.name]) for v in self.variables]
+
+        if any(u is None for u in position):
+            return
+
+        score = result['score'] if self.goal == 'max' else -result['score']
+
+        if self.best is None or score > (self.best[0] if self.goal == 'max' else -self.best[0]):
+            self.best = (result['score'], combination)
+
+        self.gp.add(position, score)
+
+        # Trim the history, keeping the best observations and the most recent ones
+
+        if len(self.gp) > self.max_history:
+            keep = self.max_history * 3 // 4
+            idx  = set(np.argsort(-self.gp.y)[:keep // 2].tolist())
+
+            for i in range(len(self.gp) - 1, -1, -1):
+                if len(idx) >= keep:
+                    break
+                idx.add(i)
+
+            idx = sorted(idx)
+            self.gp.fit(self.gp.x[idx], self.gp.y[idx])
+
+
+class RefineStrategy(Strategy):
+
+    # Coarse-to-fine grid search. Level 0 is the full grid of the variables,
+    # each following level is a finer grid around the best combinations found
+    # so far: every arithmetic or geometric variable is resampled with points
+    # values between the neighbours of the best values, and other variables
+    # keep only the values present in the best combinations. Combinations
+    # evaluated before are never asked again. A level is created once overlap
+    # of the previous level has reported, so its stragglers still running do
+    # not leave workers idle.
+    #
+    # Params:
+    #
+    #     levels  - number of refinement levels after the coarse grid
+    #     top     - number of best combinations that define the next region
+    #     points  - values of each numeric variable in every refined level
+    #     overlap - fraction of a level that must report before the next starts
+
+    def __init__(self, variables, params=None, seed=None, goal='max'):
+
+        super().__init__(variables, params, seed, goal)
+
+        self.levels  = self.params.get('levels', 3)
+        self.top     = self.params.get('top', 1)
+        self.points  = self.params.get('points', 5)
+        self.overlap = self.params.get('overlap', 0.9)
+        self.level   = -1
+        self.scores  = {}     # combination key -> (score, combination), score as captured
+        self.seen    = set()  # keys of combinations observed or pending
+        self.used    = {v.name: set() for v in variables}
+        self.best    = None
+        self._grid   = iter(())
+        self._size   = 0
+        self._done   = 0
+        self._wait   = set()
+        self._stop   = False
+
+    def is_finished(self):
+
+        return self._stop
+
+    def ask(self, n):
+
+        proposals = []
+
+        while len(proposals) < n and not self._stop:
+            combination = next(self._grid, None)
+
+            if combination is None:
+                if not self._next_level():
+                    break
+                continue
+
+            key = combination_key(combination)
+
+            if key in self.seen:
+                self._done += 1
+                continue
+
+            self.seen.add(key)
+            self._wait.add(key)
+            proposals.append(combination)
+
+        return proposals
+
+    def tell(self, combination, result):
+
+        key = combination_key(combination)
+
+        self.seen.add(key)
+
+        if key in self._wait:
+            self._wait.discard(key)
+            self._done += 1
+
+        if result['score'] is None:
+            return
+
+        self.scores[key] = (result['score'], combination)
+
+        if self.best is None or self._better(result['score'], self.best[0]):
+            self.best = (result['score'], combination)
+
+    def _better(self, a, b):
+
+        return a > b if self.goal == 'max' else a < b
+
+    def _next_level(self):
+
+        # Creates the next grid when enough of the current one has reported
+
+        if self._done < self.overlap * self._size:
+            return False
+
+        if self.level == self.levels:
+            self._stop = True
+            return False
+
+        if self.level == -1:
+            domains = [list(v.values) for v in self.variables]
+        else:
+            domains = self._refine()
+
+            if domains is None:
+                self._stop = True
+                return False
+
+        for v, values in zip(self.variables, domains):
+            self.used[v.name].update(values)
+
+        self.level += 1
+        self._grid  = (dict(zip([v.name for v in self.variables], c)) for c in itertools.product(*domains))
+        self._size  = reduce(lambda a, b: a * len(b), domains, 1)
+        self._done  = 0
+        self._wait  = set()
+
+        return True
+
+    def _refine(self):
+
+        if not self.scores:
+            return None
+
+        best    = sorted(self.scores.values(), key=lambda x: x[0], reverse=self.goal == 'max')[:self.top]
+        domains = []
+
+        for v in self.variables:
+            values = [c[v.name] for _, c in best]
+
+            if v.type in ['arithmetic', 'geometric']:
+                domains.append(self._resample(v, values))
+            else:
+                domains.append([x for x in v.values if x in values])
+
+        return domains
+
+    def _resample(self, var, values):
+
+        # Values between the closest neighbours of the best values among those evaluated so far
+
+        used = sorted(self.used[var.name])
+        lo   = min(used[max(0, bisect.bisect_left(used, x) - 1)] for x in values)
+        hi   = max(used[min(len(used) - 1, bisect.bisect_right(used, x))] for x in values)
+
+        if var.type == 'geometric' and lo > 0:
+            values = [lo * (hi / lo) ** (i / (self.points - 1)) for i in range(self.points)] if self.points > 1 else [lo]
+        else:
+            values = [lo + (hi - lo) * i / (self.points - 1) for i in range(self.points)] if self.points > 1 else [lo]
+
+        # Integer variables take every value of small regions, so rounding never hides one
+
+        if all(isinstance(x, int) for x in [var.min, var.max, getattr(var, 'step', 1)]):
+            values = range(lo, hi + 1) if hi - lo < self.points else [int(round(x)) for x in values]
+
+        return sorted(set(values))
+
+
+BUILTIN_STRATEGIES = {
+    'random': RandomStrategy,
+    'lhs'   : LatinHypercubeStrategy,
+    'sobol' : SobolStrategy,
+    'bayes' : BayesianStrategy,
+    'refine': RefineStrategy,
+}
+
+
+def load_strategy(name):
+
+    # Strategies are referenced by a builtin name, an entry point in the group
+    # 'patas.strategies' or a module path in the form 'package.module:ClassName'
+
+    if name in BUILTIN_STRATEGIES:
+        return BUILTIN_STRATEGIES[name]
+
+    if ':' in name:
+        module_name, class_name = name.split(':', 1)
+
+        # Strategies in the current folder are importable too
+
+        if os.getcwd() not in sys.path:
+            sys.path.append(os.getcwd())
+
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError as e:
+            error(f"Could not import strategy module {module_name}: {e}")
+
+        try:
+            return getattr(module, class_name)
+        except AttributeError:
+            error(f"Strategy {class_name} not found in module {module_name}")
+
+    from importlib.metadata import entry_points
+
+    eps = entry_points()
+    eps = eps.select(group=ENTRY_POINT_GROUP) if hasattr(eps, 'select') else eps.get(ENTRY_POINT_GROUP, [])
+
+    for entry_point in eps:
+        if entry_point.name == name:
+            return entry_point.load()
+
+    error(f"Unknown strategy: {name}")
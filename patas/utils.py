@@ -1,6 +1,7 @@
 from subprocess import Popen, PIPE
 
 import pathlib
+import socket
 import shutil
 import shlex
 import sys
@@ -362,9 +363,19 @@ def estimate(tasks, workers, seconds):
     return human_time(tasks / workers * seconds)
 
 
+LOCAL_HOSTNAMES = ['localhost', '127.0.0.1', '::1']
+
+
+def is_local(hostname):
+
+    # Hostnames that refer to this machine, including its own name
+
+    return hostname in LOCAL_HOSTNAMES or hostname in [socket.gethostname(), socket.getfqdn()]
+
+
 def node_cpu_count(user, hostname, port, default):
 
-    if hostname in ['localhost', '127.0.0.1']:
+    if is_local(hostname):
         status, output = run('nproc', read=True)
 
     else:
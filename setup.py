@@ -33,7 +33,7 @@ setuptools.setup(
         'csvkit', 'seaborn'
     ],
     extras_require={
-        "full": []
+        "full": ["zstandard"]
     }
 )
 
@@ -0,0 +1,131 @@
+from patas.schemas import GridExperimentSchema, ListVariableSchema, AdaptiveRepeatSchema
+
+from patas.utils import PatasError
+
+from datetime import datetime
+import pytest
+
+
+class FakeScheduler:
+
+    def __init__(self):
+        self.todo, self.done, self.given_up, self.filtered = [], [], [], []
+
+    def push_todo(self, task):
+        self.todo.append(task)
+
+    def push_done(self, task):
+        self.done.append(task)
+
+    def push_given_up(self, task):
+        self.given_up.append(task)
+
+    def push_filtered(self, task):
+        self.filtered.append(task)
+
+
+def create_experiment(tmp_path, min_repeat=3, max_repeat=8):
+    experiment = GridExperimentSchema()
+    experiment.name = 'adaptive'
+    experiment.cmd = ['bench {mode}']
+    experiment.output_folder = str(tmp_path)
+    experiment.experiment_idd = 0
+    experiment.score_pattern = 'Score: (@float@)'
+    experiment.adaptive_repeat = AdaptiveRepeatSchema({'min_repeat': min_repeat, 'max_repeat': max_repeat, 'ci_width': 1.0})
+    experiment.vars = [ListVariableSchema({'name': 'mode', 'values': ['stable', 'noisy']})]
+    return experiment
+
+def complete(experiment, scheduler, task, score):
+    now = datetime.now()
+    task.success = True
+    task.attempts.append({'env_variables': {}, 'started_at': now, 'ended_at': now, 'duration': 0.0,
+                          'stdout': score if isinstance(score, bytes) else b'Score: %f\n' % score, 'status': 0})
+    experiment.on_task_completed(scheduler, task)
+
+def noisy_scores(mode, count):
+    return 10.0 if mode == 'stable' else 100.0 * (count % 2)
+
+def run(experiment, scheduler, scores=noisy_scores, limit=None):
+    executed = {}
+    while scheduler.todo and (limit is None or sum(executed.values()) < limit):
+        task = scheduler.todo.pop(0)
+        mode = task.combination['mode']
+        executed[mode] = executed.get(mode, 0) + 1
+        complete(experiment, scheduler, task, scores(mode, executed[mode]))
+    return executed
+
+def test_repeats_stop_when_narrow_and_never_exceed_max(tmp_path):
+    experiment = create_experiment(tmp_path)
+    scheduler  = FakeScheduler()
+    experiment.on_start(scheduler)
+
+    assert len(scheduler.todo) == 2 * 3
+
+    executed = run(experiment, scheduler)
+    assert executed == {'stable': 3, 'noisy': 8}
+    assert experiment._repeats[1]['next'] == 8
+
+def test_resumed_run_reuses_previous_repeats(tmp_path):
+    first      = FakeScheduler()
+    experiment = create_experiment(tmp_path)
+    experiment.on_start(first)
+    run(experiment, first)
+
+    second = FakeScheduler()
+    experiment = create_experiment(tmp_path)
+    experiment.on_start(second)
+    assert second.todo == []
+    assert len(second.done) == 3 + 8
+
+def test_repeats_respect_the_min_and_max_bounds(tmp_path):
+    experiment = create_experiment(tmp_path, min_repeat=4, max_repeat=5)
+    scheduler  = FakeScheduler()
+    experiment.on_start(scheduler)
+
+    assert len(scheduler.todo) == 2 * 4
+    assert run(experiment, scheduler) == {'stable': 4, 'noisy': 5}
+
+    with pytest.raises(PatasError):
+        AdaptiveRepeatSchema({'min_repeat': 1, 'ci_width': 1.0})
+
+    with pytest.raises(PatasError):
+        AdaptiveRepeatSchema({'min_repeat': 5, 'max_repeat': 4, 'ci_width': 1.0})
+
+def test_missing_or_invalid_scores_stop_at_max(tmp_path):
+    experiment = create_experiment(tmp_path)
+    scheduler  = FakeScheduler()
+    experiment.on_start(scheduler)
+
+    # Stable repeats print no score at all, noisy ones print something that is not a number
+
+    executed = run(experiment, scheduler, lambda mode, count: b'no score\n' if mode == 'stable' else b'Score: -\n')
+
+    assert executed == {'stable': 8, 'noisy': 8}
+    assert experiment._repeats[0]['scores'] == [] and experiment._repeats[1]['scores'] == []
+    assert len(scheduler.given_up) == 0
+
+def test_resume_with_partially_completed_repeats(tmp_path):
+    first      = FakeScheduler()
+    experiment = create_experiment(tmp_path)
+    experiment.on_start(first)
+
+    # Only the stable repeats and the first noisy one finish before the execution stops
+
+    order      = sorted(first.todo, key=lambda t: t.combination['mode'] != 'stable')
+    first.todo = order
+    assert run(experiment, first, limit=4) == {'stable': 3, 'noisy': 1}
+
+    second     = FakeScheduler()
+    experiment = create_experiment(tmp_path)
+    experiment.on_start(second)
+
+    assert len(second.done) == 4
+    assert sorted(t.repeat_idd for t in second.todo) == [1, 2]
+    assert all(t.combination['mode'] == 'noisy' for t in second.todo)
+
+    # The repeats that finished count, noisy ones go on until max_repeat
+
+    executed = run(experiment, second, lambda mode, count: 100.0 * (count % 2))
+    assert executed == {'noisy': 7}
+    assert experiment._repeats[0]['scores'] == [10.0] * 3
+    assert len(experiment._repeats[1]['scores']) == 8 and experiment._repeats[1]['next'] == 8
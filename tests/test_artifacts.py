@@ -0,0 +1,27 @@
+from patas.scheduler import WorkerProcess, LocalExecutor
+from patas.schemas import Task, artifacts_dir
+
+import os
+
+
+def test_artifacts_are_collected_up_to_the_limit(tmp_path):
+    workdir = tmp_path / 'work'
+    workdir.mkdir()
+
+    task = Task('e', str(tmp_path / 'out' / '0'), str(workdir), 0, 0, 0, 0, {}, [], 3)
+    task.artifacts = ['logs', 'model.bin', 'missing*']
+
+    (workdir / 'logs').mkdir()
+    (workdir / 'logs' / 'train.log').write_text('loss 0.1\n')
+    (workdir / 'model.bin').write_bytes(b'0' * 100)
+
+    worker   = WorkerProcess(0, 0, 0, None, {})
+    executor = LocalExecutor(None)
+    _, _, initrc = worker._initrc(task)
+
+    usage = worker._collect(task, executor, initrc, '50')
+    executor.stop()
+
+    assert usage['artifacts'] == ['logs/train.log']
+    assert usage['artifacts_skipped'] == ['model.bin']
+    assert open(os.path.join(artifacts_dir(task), 'logs', 'train.log')).read() == 'loss 0.1\n'
@@ -0,0 +1,24 @@
+from patas.bayes import GaussianProcess
+
+import numpy as np
+
+
+def test_incremental_updates_match_full_fit():
+    rng = np.random.default_rng(0)
+    x, y = rng.random((20, 2)), rng.random(20)
+    incremental = GaussianProcess(2, refit_every=100)
+    incremental.fit(x[:10], y[:10])
+    for i in range(10, 20):
+        incremental.add(x[i], y[i])
+    full = GaussianProcess(2)
+    full.x, full.y = x, y
+    full.lengthscale, full.noise = incremental.lengthscale, incremental.noise
+    full._rebuild()
+    assert np.allclose(incremental.predict(x)[0], full.predict(x)[0])
+
+def test_prediction_interpolates_observations():
+    x = np.array([[0.1], [0.5], [0.9]])
+    gp = GaussianProcess(1)
+    gp.fit(x, [1.0, 3.0, 2.0])
+    mu, sigma = gp.predict(x)
+    assert np.allclose(mu, [1.0, 3.0, 2.0], atol=0.3)
@@ -0,0 +1,24 @@
+from patas.cache import ResultCache, parse_size
+from patas.schemas import Task
+
+import os
+
+
+def test_parse_size():
+    assert parse_size('10G') == 10 * 1024**3
+    assert parse_size('500M') == 500 * 1024**2
+    assert parse_size('1.5K') == 1536
+    assert parse_size(100) == 100
+
+def test_cache_store_and_evict(tmp_path):
+    cache = ResultCache(str(tmp_path), 250)
+    keys = []
+    for i in range(3):
+        task = Task('e', None, '/tmp', 0, i, 0, i, {'x': i}, [f'echo {i}'], 1)
+        keys.append(cache.key(task))
+        cache.put(keys[-1], {'status': '0', 'duration': 1.0, 'stdout': b'x' * 100})
+        os.utime(cache._entry(keys[-1]), (i, i))
+    assert len(set(keys)) == 3
+    assert cache.get(keys[0]) is None
+    entry, result = cache.get(keys[2])
+    assert result['stdout'] == b'x' * 100 and result['duration'] == 1.0
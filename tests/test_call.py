@@ -0,0 +1,49 @@
+from patas.call import CallExecutor, call_command
+from patas.capture import OutputCapture
+
+
+def test_call_executor(tmp_path):
+    (tmp_path / 'tasks_module.py').write_text(
+        'import os\n'
+        'def run(x):\n'
+        '    print("pid", os.getpid(), os.environ["PATAS_VAR_x"])\n'
+        '    return x * 2\n'
+        'def fail():\n'
+        '    raise ValueError("bad")\n')
+
+    executor = CallExecutor(max_calls=2)
+    pids     = []
+
+    for x in range(3):
+        success, stdout, status = executor.execute('tasks_module:run', {'x': x}, {'PATAS_VAR_x': str(x)}, str(tmp_path))
+        lines = stdout.decode().split('\n')
+        assert success and status == 0
+        assert lines[0].endswith(f' {x}') and lines[1] == str(x * 2)
+        pids.append(lines[0].split()[1])
+
+    success, stdout, status = executor.execute('tasks_module:fail', {}, {}, str(tmp_path))
+    executor.stop()
+
+    assert pids[0] == pids[1] != pids[2]
+    assert not success and status == 1 and b'ValueError: bad' in stdout
+
+def test_function_output_is_bounded_while_it_runs(tmp_path):
+    (tmp_path / 'flood_module.py').write_text(
+        'def flood():\n'
+        '    try:\n'
+        '        while True:\n'
+        '            print("x" * 99)\n'
+        '    finally:\n'
+        '        print("cleanup")\n')
+
+    executor = CallExecutor()
+    capture  = OutputCapture.from_limits(('100', '100', '1M'))
+    success, stdout, status = executor.execute('flood_module:flood', {}, {}, str(tmp_path), capture.watch(), capture)
+    executor.stop()
+
+    assert not success and status == -9
+    assert capture.exceeded and capture.report()['stdout_exceeded']
+    assert len(stdout) < 300 and b'bytes dropped' in stdout and stdout.startswith(b'x' * 99)
+
+def test_call_command():
+    assert call_command('m:f', ['a', 'b']) == 'python3 -m patas.call m:f a="{a!r}" b="{b!r}"'
@@ -0,0 +1,86 @@
+from patas.capture import OutputCapture, split_lines, MAX_LINE
+from patas.scheduler import WorkerProcess, BashExecutor, Scheduler, SSHExecutor
+from patas.schemas import Task
+
+
+def test_whole_output_is_kept_without_limits():
+    capture = OutputCapture()
+    capture.write(b'a\n')
+    capture.write(b'b\n')
+    assert capture.getvalue() == b'a\nb\n'
+    assert capture.report() == {}
+
+def test_head_and_tail_are_kept_in_constant_memory():
+    capture = OutputCapture.from_limits(('4', '6', None))
+
+    for i in range(10000):
+        capture.write(b'%04d\n' % i)
+
+    assert len(capture.last) <= 2 * 6 + 5
+    assert capture.total == 50000
+    assert capture.dropped == 50000 - 10
+    assert capture.getvalue() == b'0000' + b'\n[patas: 49990 bytes dropped from the output]\n' + b'\n9999\n'
+    assert capture.report() == {'stdout_size': 50000, 'stdout_dropped': 49990}
+
+def test_short_outputs_are_not_cut():
+    capture = OutputCapture.from_limits(('1K', None, None))
+    capture.write(b'short\n')
+    assert capture.getvalue() == b'short\n'
+    assert capture.dropped == 0
+
+def test_limit_stops_the_task():
+    capture = OutputCapture.from_limits((None, None, '10'))
+    watcher = capture.watch()
+    capture.write(b'0123456789')
+    assert not watcher([])
+    capture.write(b'!')
+    assert watcher([])
+    assert capture.report()['stdout_exceeded']
+
+def test_exceeded_tasks_are_not_retried(tmp_path):
+    task   = Task('e', str(tmp_path), str(tmp_path), 0, 0, 0, 0, {}, ['yes'], 3)
+    worker = WorkerProcess(0, 0, 0, None, {})
+    worker.kill = type('Value', (), {'value': -1})()
+    worker.execute(type('Msg', (), {'task': task, 'setup': [], 'teardown': [], 'function': None, 'output_limits': (None, '1K', '64K')})(), BashExecutor(None), None)
+
+    assert task.exceeded and not task.success and not task.pruned
+    assert task.attempts[-1]['stdout_exceeded']
+
+    completed  = []
+    experiment = type('Experiment', (), {'output_limit': '64K', 'on_task_completed': lambda self, s, t: completed.append(t)})()
+    scheduler  = Scheduler.__new__(Scheduler)
+    scheduler.experiments, scheduler.doing, scheduler.todo, scheduler.idle = [experiment], [task], [], [0]
+    scheduler.exceeded, scheduler.given_up, scheduler.pruned, scheduler.done = [], [], [], []
+    scheduler._dispatch = lambda: None
+    scheduler._on_task_result(None, task)
+
+    assert scheduler.exceeded == [task] and completed == [task]
+    assert scheduler.todo == [] and scheduler.idle == [0] and task.tries == 1
+
+def test_long_lines_are_cut():
+    lines, partial = split_lines(b'', b'x' * (MAX_LINE + 1))
+    assert len(lines) == 1 and partial == b''
+    assert split_lines(b'a', b'b\nc') == ([b'ab'], b'c')
+
+def test_ssh_partial_lines_are_bounded(monkeypatch):
+    import patas.scheduler
+    import pty
+    monkeypatch.setattr(patas.scheduler, 'MAX_LINE', 1000, raising=False)
+
+    # A local bash behind a terminal, as the remote shell of an SSH node
+
+    executor = SSHExecutor.__new__(SSHExecutor)
+    executor.master, executor.slave = pty.openpty()
+    executor._start_bash()
+
+    capture = OutputCapture()
+    chunks  = []
+    write   = capture.write
+    monkeypatch.setattr(capture, 'write', lambda data: chunks.append(len(data)) or write(data))
+
+    success, stdout, _ = executor.execute([b'true'], b"head -c 100000 /dev/zero | tr '\\0' x ; echo ; echo end", capture=capture)
+    executor.popen.kill()
+
+    assert success and stdout.startswith(b'x' * 100000 + b'\r\n')
+    assert b'end' in stdout and len(chunks) > 2
+    assert max(chunks) <= 1000 + 10240
@@ -0,0 +1,53 @@
+from patas.cdeepso import Swarm
+
+
+def test_swarm_steady_state():
+    swarm = Swarm(2, seed=7, memory=10)
+    particles = [swarm.spawn() for _ in range(10)]
+
+    for _ in range(30):
+        for particle in particles:
+            x, y = particle.position
+            swarm.report(particle, -((x - 0.3) ** 2 + (y - 0.7) ** 2))
+            swarm.move(particle)
+
+    assert swarm.best_fitness > -0.01
+    assert all(0.0 <= u <= 1.0 for p in particles for u in p.position)
+
+def test_experiment_improves_and_stays_in_bounds(tmp_path):
+    from patas.schemas import CDEEPSOExperimentSchema, ArithmeticVariableSchema, GeometricVariableSchema
+    from datetime import datetime
+
+    class FakeScheduler:
+        def __init__(self):
+            self.todo, self.done, self.workers = [], [], [0] * 4
+        def push_todo(self, task):
+            self.todo.append(task)
+        def push_done(self, task):
+            self.done.append(task)
+
+    experiment = CDEEPSOExperimentSchema()
+    experiment.name, experiment.cmd, experiment.output_folder, experiment.experiment_idd = 'pso', ['f {x} {y} {lr}'], str(tmp_path), 0
+    experiment.score_pattern, experiment.goal, experiment.seed, experiment.evaluations = 'Score: (@float@)', 'min', 3, 300
+    experiment.vars = [ArithmeticVariableSchema({'name': 'x', 'min': -5.0, 'max': 5.0}),
+                       ArithmeticVariableSchema({'name': 'y', 'min': -5.0, 'max': 5.0}),
+                       GeometricVariableSchema({'name': 'lr', 'min': 0.001, 'max': 1.0, 'factor': 10, 'continuous': True})]
+
+    scheduler = FakeScheduler()
+    experiment.on_start(scheduler)
+    scores    = []
+
+    while scheduler.todo:
+        task = scheduler.todo.pop(0)
+        c    = task.combination
+        assert -5.0 <= c['x'] <= 5.0 and -5.0 <= c['y'] <= 5.0 and 0.001 <= c['lr'] <= 1.0
+
+        scores.append((c['x'] - 1) ** 2 + (c['y'] + 2) ** 2)
+        now = datetime.now()
+        task.success = True
+        task.attempts.append({'env_variables': {}, 'started_at': now, 'ended_at': now, 'duration': 0.0, 'stdout': b'Score: %f\n' % scores[-1], 'status': 0})
+        experiment.on_task_completed(scheduler, task)
+
+    assert len(scores) == 300
+    assert min(scores) < 0.01 < min(scores[:10])
+    assert min(scores[-50:]) < min(scores[:50])
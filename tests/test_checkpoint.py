@@ -0,0 +1,38 @@
+from patas.scheduler import WorkerProcess, BashExecutor
+from patas.schemas import Task
+
+
+def run(task, tmp_path):
+    worker = WorkerProcess(0, 0, 0, None, {})
+    worker.kill = type('Value', (), {'value': -1})()
+    task.env = {"PATAS_CHECKPOINT_DIR": str(tmp_path / "ckpt"), "PATAS_RESUME": "1" if task.tries else "0"}
+    worker.execute(type('Msg', (), {'task': task, 'setup': [], 'teardown': [], 'function': None, 'output_limits': None})(), BashExecutor(None), None)
+    task.tries += 1
+    return task.attempts[-1]
+
+def test_retries_resume_from_checkpoint(tmp_path):
+    cmd  = 'if [ "$PATAS_RESUME" = 1 ]; then cat "$PATAS_CHECKPOINT_DIR/state"; else echo 42 > "$PATAS_CHECKPOINT_DIR/state"; exit 1; fi'
+    task = Task('e', str(tmp_path), str(tmp_path), 0, 0, 0, 0, {}, [cmd], 3)
+
+    first = run(task, tmp_path)
+    assert first['status'] != 0 and not first['resumed']
+    assert first['checkpoint_size'] == 3
+
+    second = run(task, tmp_path)
+    assert second['status'] == 0 and second['resumed']
+    assert second['stdout'].strip() == b'42'
+    assert not (tmp_path / "ckpt").exists()
+
+def test_interrupted_first_attempts_keep_their_checkpoints(tmp_path):
+    cmd  = 'echo resume=$PATAS_RESUME ; cat "$PATAS_CHECKPOINT_DIR/state" 2> /dev/null || true'
+    (tmp_path / "ckpt").mkdir()
+    (tmp_path / "ckpt" / "state").write_text('42\n')
+
+    task   = Task('e', str(tmp_path), str(tmp_path), 0, 0, 0, 0, {}, [cmd, 'exit 1'], 3)
+    result = run(task, tmp_path)
+    assert result['resumed'] and result['stdout'] == b'resume=1\n42\n'
+
+    task       = Task('e', str(tmp_path), str(tmp_path), 0, 0, 0, 0, {}, [cmd, 'exit 1'], 3)
+    task.fresh = True
+    result     = run(task, tmp_path)
+    assert not result['resumed'] and result['stdout'] == b'resume=0\n'
@@ -0,0 +1,34 @@
+from patas.scheduler import Coalescing, WorkerProcess, BashExecutor, Scheduler
+from patas.schemas import Task
+
+
+def test_batch_keeps_outputs_and_status_apart(tmp_path):
+    worker = WorkerProcess(0, 0, 0, None, {})
+    tasks  = [Task('e', str(tmp_path), str(tmp_path), 0, i, 0, i, {'x': i}, [f'echo out $PATAS_VAR_x', f'exit {i}'], 1) for i in range(3)]
+    msg    = type('Msg', (), {'tasks': tasks, 'setup': [], 'teardown': []})()
+
+    tasks, duration = worker.execute_batch(msg, BashExecutor(None))
+
+    assert [t.success for t in tasks] == [True, False, False]
+    assert [t.attempts[-1]['status'] for t in tasks] == [0, 1, 2]
+    assert [t.attempts[-1]['stdout'] for t in tasks] == [b'out 0\n', b'out 1\n', b'out 2\n']
+    assert sum(t.attempts[-1]['duration'] for t in tasks) <= duration
+
+def test_auto_coalescing_grows_with_overhead():
+    coalescing = Coalescing('auto')
+    coalescing.observe(1.0, [0.01, 0.01])
+    assert coalescing.size(1000, 4) == 64
+    assert coalescing.size(10, 4) == 3
+    coalescing = Coalescing('auto')
+    coalescing.observe(10.0, [5.0, 4.95])
+    assert coalescing.size(1000, 4) == 1
+    assert Coalescing(8).size(1000, 4) == 8
+
+def test_tasks_with_checkpoints_are_not_coalesced(tmp_path):
+    experiment = type('Experiment', (), {'coalesce': 8, 'function': None, 'watch': lambda self, t: None, 'output_limits': lambda self: None, 'checkpoint_dir': lambda self, t: str(tmp_path / str(t.task_idd))})()
+    tasks      = [Task('e', str(tmp_path), str(tmp_path), 0, i, 0, i, {'x': i}, ['true'], 1) for i in range(4)]
+    scheduler  = Scheduler.__new__(Scheduler)
+    scheduler.experiments, scheduler.todo, scheduler.workers, scheduler.coalescing = [experiment], tasks[1:], [0], {}
+
+    assert scheduler._coalesce(tasks[0]) == [tasks[0]]
+    assert scheduler.todo == tasks[1:]
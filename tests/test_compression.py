@@ -0,0 +1,48 @@
+from patas.compression import OutputCompressor, find_output, open_output, read_output, resolve, zstandard
+
+import pytest
+import os
+
+
+def test_gzip_outputs_are_read_transparently(tmp_path):
+    compressor = OutputCompressor('gzip', str(tmp_path))
+    data       = b'Time: 1.5\nScore: 42\n'
+
+    with open(tmp_path / ('success.stdout' + compressor.extension), 'wb') as fout:
+        fout.write(compressor.compress(data))
+
+    filepath = find_output(str(tmp_path), 'success.stdout')
+    assert filepath.endswith('.gz')
+    assert read_output(filepath) == data
+
+    with open_output(filepath) as fin:
+        assert [x for x in fin] == ['Time: 1.5\n', 'Score: 42\n']
+
+def test_plain_outputs_and_missing_outputs(tmp_path):
+    with open(tmp_path / 'success.stdout', 'wb') as fout:
+        fout.write(OutputCompressor(None, str(tmp_path)).compress(b'plain\n'))
+
+    assert read_output(find_output(str(tmp_path), 'success.stdout')) == b'plain\n'
+    assert find_output(str(tmp_path), 'fail0.stdout') is None
+
+def test_auto_falls_back_to_gzip():
+    assert resolve('auto') == ('zstd' if zstandard() else 'gzip')
+    assert resolve(None) is None
+
+def test_zstd_dictionary_is_trained_once(tmp_path):
+    pytest.importorskip('zstandard')
+
+    folder = tmp_path / 'task'
+    os.makedirs(folder)
+
+    compressor = OutputCompressor('zstd', str(tmp_path), dictionary=True, samples=20, dictionary_size=4096)
+    outputs    = [f'Epoch {i}: loss {i / 7:.5f} accuracy {i / 11:.5f}\n'.encode() * 8 for i in range(40)]
+
+    for i, data in enumerate(outputs):
+        with open(folder / f'{i}.stdout.zst', 'wb') as fout:
+            fout.write(compressor.compress(data))
+
+    assert os.path.exists(tmp_path / '.stdout.dict')
+
+    for i, data in enumerate(outputs):
+        assert read_output(str(folder / f'{i}.stdout.zst')) == data
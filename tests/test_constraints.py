@@ -0,0 +1,25 @@
+from patas.schemas import GridExperimentSchema, ArithmeticVariableSchema, ListVariableSchema
+from patas.constraints import compile_constraints
+
+
+def create_experiment(constraints):
+    experiment = GridExperimentSchema()
+    experiment.vars = [
+        ArithmeticVariableSchema({'name': 'a', 'min': 0, 'max': 100, 'step': 1}),
+        ArithmeticVariableSchema({'name': 'b', 'min': 0, 'max': 100, 'step': 1}),
+        ListVariableSchema({'name': 'c', 'values': ['x', 'y']}),
+    ]
+    experiment.constraints = constraints
+    return experiment
+
+def test_constraints_depth():
+    experiment = create_experiment([])
+    by_depth = compile_constraints(['a < 10', 'b <= a', "c == 'x'"], experiment.vars)
+    assert [len(x) for x in by_depth] == [1, 1, 1]
+
+def test_constraints_prune_combinations():
+    experiment = create_experiment(['a < 10', 'b <= a', "c == 'x' or a > 5"])
+    combinations = list(experiment._combinations(experiment.vars))
+    expected = [(a, b, c) for a in range(10) for b in range(a + 1) for c in 'xy' if c == 'x' or a > 5]
+    assert [(x['a'], x['b'], x['c']) for x in combinations] == expected
+    assert experiment.number_of_tasks() == len(expected)
@@ -0,0 +1,76 @@
+from patas.domains import ArithmeticDomain, GeometricDomain, GlobDomain, LinesDomain, ShardDomain
+from patas.schemas import GeometricVariableSchema, ShardVariableSchema, LinesVariableSchema
+from patas.utils import PatasError
+
+import numpy as np
+import pytest
+
+
+def test_arithmetic_domain_matches_arange():
+    for first, last, step in [(0, 10, 1), (1, 10, 3), (0.0, 1.0, 0.1), (5, 0, -1), (0, 0, 1)]:
+        domain = ArithmeticDomain(first, last, step)
+        assert list(domain) == np.arange(first, last, step).tolist()
+        assert len(domain) == len(np.arange(first, last, step))
+
+def test_geometric_domain():
+    assert list(GeometricDomain(1, 17, 2)) == [1, 2, 4, 8, 16]
+    assert list(GeometricDomain(1, 16, 2)) == [1, 2, 4, 8]
+    assert list(GeometricDomain(0.001, 1.0, 10)) == [0.001, 0.01, 0.1]
+    assert GeometricDomain(1, 2**60, 2)[-1] == 2**59
+
+def test_large_domains_are_lazy():
+    domain = ArithmeticDomain(0, 10**12, 1)
+    assert len(domain) == 10**12
+    assert domain[123456789] == 123456789
+    assert domain[-1] == 10**12 - 1
+
+def test_geometric_variable_values():
+    var = GeometricVariableSchema({'name': 'v', 'min': 1, 'max': 17, 'factor': 2})
+    assert var.values == [1, 2, 4, 8, 16]
+    assert var.sample(0.99) == 16
+
+def test_glob_domain(tmp_path):
+    for name in ['b.txt', 'a.txt', 'sub/c.txt']:
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).write_text(name)
+    domain = GlobDomain(str(tmp_path / '**' / '*.txt'))
+    assert [x[len(str(tmp_path)) + 1:] for x in domain] == ['a.txt', 'b.txt', 'sub/c.txt']
+
+def test_lines_domain(tmp_path):
+    (tmp_path / 'input').write_text('first\n\nsecond\nthird')
+    domain = LinesDomain(str(tmp_path / 'input'))
+    assert len(domain) == 3
+    assert domain[1] == 'second'
+    assert list(domain) == ['first', 'second', 'third']
+    assert domain.index('third') == 2
+
+def test_shard_variable(tmp_path):
+    (tmp_path / 'data').write_bytes(b'x' * 2500)
+    var    = ShardVariableSchema({'name': 's', 'file': str(tmp_path / 'data'), 'size': '1K'})
+    shards = list(var.values)
+    assert shards == ['0:1024', '1024:1024', '2048:452']
+    assert '{s.offset} {s.length}'.format(s=shards[-1]) == '2048 452'
+    assert var.decode(var.encode(shards[1])) == shards[1]
+
+def test_relative_files_are_found_in_the_workdir(tmp_path):
+    (tmp_path / 'inputs').mkdir()
+    (tmp_path / 'inputs' / 'a.txt').write_text('one\ntwo\n')
+    assert list(GlobDomain('inputs/*.txt', str(tmp_path))) == ['inputs/a.txt']
+    assert list(LinesDomain('inputs/a.txt', str(tmp_path))) == ['one', 'two']
+    assert len(ShardDomain('inputs/a.txt', 4, str(tmp_path))) == 2
+
+def test_rewritten_files_change_the_signature(tmp_path):
+    import os
+    (tmp_path / 'input').write_text('first\nsecond\n')
+    before = LinesDomain(str(tmp_path / 'input')).signature()
+    (tmp_path / 'input').write_text('other\nlines\n')
+    os.utime(tmp_path / 'input', ns=(0, 0))
+    assert LinesDomain(str(tmp_path / 'input')).signature() != before
+    assert ShardDomain(str(tmp_path / 'input'), 4).signature()['mtime'] == 0
+
+def test_missing_files_are_reported(tmp_path):
+    for var in [LinesVariableSchema({'name': 'l', 'file': 'missing.txt'}), ShardVariableSchema({'name': 's', 'file': 'missing.bin', 'size': '1K'})]:
+        var.bind(str(tmp_path))
+
+        with pytest.raises(PatasError, match=f"Invalid {var.type} variable {var.name}: .*missing"):
+            var.values
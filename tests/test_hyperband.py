@@ -0,0 +1,127 @@
+from patas.schemas import HyperbandExperimentSchema, ArithmeticVariableSchema, BudgetSchema
+
+from datetime import datetime
+
+
+class FakeScheduler:
+
+    def __init__(self):
+        self.todo, self.done, self.given_up, self.filtered = [], [], [], []
+
+    def push_todo(self, task):
+        self.todo.append(task)
+
+    def push_done(self, task):
+        self.done.append(task)
+
+    def push_given_up(self, task):
+        self.given_up.append(task)
+
+    def push_filtered(self, task):
+        self.filtered.append(task)
+
+
+def create_experiment(tmp_path, brackets=1, budget=None, combinations=9):
+    experiment = HyperbandExperimentSchema()
+    experiment.name = 'hyperband'
+    experiment.cmd = ['train {x} {epochs}']
+    experiment.output_folder = str(tmp_path)
+    experiment.experiment_idd = 0
+    experiment.score_pattern = 'Score: (@float@)'
+    experiment.brackets = brackets
+    experiment.budget = BudgetSchema(budget or {'name': 'epochs', 'min': 1, 'max': 9, 'eta': 3})
+    experiment.vars = [ArithmeticVariableSchema({'name': 'x', 'min': 0, 'max': combinations, 'step': 1})]
+    return experiment
+
+def run(experiment, scheduler, limit=None):
+
+    # Executes the pending tasks in order, the score of a task is its x
+
+    executed = []
+
+    while scheduler.todo and len(executed) != limit:
+        task = scheduler.todo.pop(0)
+        now  = datetime.now()
+        task.success = True
+        task.attempts.append({'env_variables': {}, 'started_at': now, 'ended_at': now, 'duration': 0.0,
+                              'stdout': b'Score: %d\n' % task.combination['x'], 'status': 0})
+        executed.append(task)
+        experiment.on_task_completed(scheduler, task)
+
+    return executed
+
+def reached(tasks, epochs):
+    return {t.combination['x'] for t in tasks if t.combination['epochs'] == epochs}
+
+def test_rungs_promote_the_best_combinations(tmp_path):
+    experiment = create_experiment(tmp_path)
+    scheduler  = FakeScheduler()
+    experiment.on_start(scheduler)
+
+    assert sorted(t.combination['epochs'] for t in scheduler.todo) == [1] * 9
+
+    executed = run(experiment, scheduler)
+    assert reached(executed, 1) == set(range(9))
+
+    # Promotion is asynchronous: results arrive from worst to best, so a few
+    # combinations are promoted before the best ones are known, but the top
+    # 1/eta of every rung always reaches the next one
+
+    assert {6, 7, 8} <= reached(executed, 3) and len(reached(executed, 3)) < 9
+    assert 8 in reached(executed, 9) and reached(executed, 9) <= reached(executed, 3)
+
+def test_larger_eta_reaches_the_final_budget(tmp_path):
+    experiment = create_experiment(tmp_path, budget={'name': 'epochs', 'min': 1, 'max': 64, 'eta': 4}, combinations=64)
+    scheduler  = FakeScheduler()
+    experiment.on_start(scheduler)
+
+    # Results arriving from best to worst are promoted as a synchronous
+    # Hyperband would, each rung keeps exactly its top quarter
+
+    scheduler.todo.sort(key=lambda t: -t.combination['x'])
+    executed = run(experiment, scheduler)
+
+    assert reached(executed, 1) == set(range(64))
+    assert reached(executed, 4) == set(range(48, 64))
+    assert reached(executed, 16) == set(range(60, 64))
+    assert reached(executed, 64) == {63}
+    assert len(executed) == experiment.number_of_tasks() == 64 + 16 + 4 + 1
+    assert scheduler.todo == []
+
+def test_brackets_start_in_different_rungs(tmp_path):
+    experiment = create_experiment(tmp_path, brackets=2)
+    scheduler  = FakeScheduler()
+    experiment.on_start(scheduler)
+
+    budgets = {t.combination['x']: t.combination['epochs'] for t in scheduler.todo}
+    assert budgets == {x: 1 if x % 2 == 0 else 3 for x in range(9)}
+
+def test_resumed_run_promotes_the_same_combinations(tmp_path):
+    experiment = create_experiment(tmp_path)
+    scheduler  = FakeScheduler()
+    experiment.on_start(scheduler)
+    executed   = run(experiment, scheduler)
+
+    experiment = create_experiment(tmp_path)
+    scheduler  = FakeScheduler()
+    experiment.on_start(scheduler)
+
+    assert scheduler.todo == []
+    assert sorted(t.task_idd for t in scheduler.done) == sorted(t.task_idd for t in executed)
+
+def test_interrupted_run_promotes_from_all_previous_results(tmp_path):
+    experiment = create_experiment(tmp_path)
+    scheduler  = FakeScheduler()
+    experiment.on_start(scheduler)
+    run(experiment, scheduler, limit=9)
+
+    # The restart sees the nine results of the first rung at once, so it
+    # promotes exactly their top third, whatever was promoted before
+
+    experiment = create_experiment(tmp_path)
+    scheduler  = FakeScheduler()
+    experiment.on_start(scheduler)
+
+    assert reached(scheduler.done, 1) == set(range(9))
+    assert reached(scheduler.todo, 3) == {6, 7, 8}
+    assert len(scheduler.todo) == 3
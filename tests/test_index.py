@@ -0,0 +1,20 @@
+from patas.index import TaskIndex, task_key
+
+
+def test_task_ids_survive_reloads(tmp_path):
+    index = TaskIndex(str(tmp_path)).load(['echo {x}'], None)
+    a = task_key({'x': 1}, 0, ['echo {x}'], None)
+    b = task_key({'x': 2}, 0, ['echo {x}'], None)
+    assert index.get(a, 0) == 0
+    assert index.get(b, 0) == 1
+    index.flush()
+    index = TaskIndex(str(tmp_path)).load(['echo {x}'], None)
+    assert index.get(b, 0) == 1
+    index.remove([a])
+    index = TaskIndex(str(tmp_path)).load(['echo {x}'], None)
+    assert list(index.ids.values()) == [1]
+
+def test_task_key_depends_on_content():
+    assert task_key({'x': 1, 'y': 2}, 0, ['c'], None) == task_key({'y': 2, 'x': 1}, 0, ['c'], None)
+    assert task_key({'x': 1}, 0, ['c'], None) != task_key({'x': 1}, 1, ['c'], None)
+    assert task_key({'x': 1}, 0, ['c'], None) != task_key({'x': 1}, 0, ['d'], None)
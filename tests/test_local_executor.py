@@ -0,0 +1,31 @@
+from patas.scheduler import LocalExecutor, split_simple_command, expand_variables
+
+
+def test_simple_commands_are_split():
+    assert split_simple_command('python3 train.py --lr 0.1 "a b"') == ['python3', 'train.py', '--lr', '0.1', 'a b']
+    assert split_simple_command('echo $HOME') is None
+    assert split_simple_command('ls | wc -l') is None
+    assert split_simple_command('cd /tmp') is None
+    assert split_simple_command('A=1 env') is None
+
+def test_variables_are_expanded():
+    assert expand_variables('$BASE/x/${NAME}', {'BASE': '/tmp', 'NAME': 'y'}) == '/tmp/x/y'
+
+def test_spawned_and_shell_commands():
+    executor = LocalExecutor(None)
+    success, _, _ = executor.setup([], [b'export PREP=ready'])
+    assert success
+
+    success, stdout, status = executor.run([b'set -e'], {'A': '1', 'B': '$A-2'}, '/', ['printenv PREP A B', 'pwd'])
+    assert success and status == 0 and stdout == b'ready\n1\n1-2\n/\n'
+
+    success, stdout, status = executor.run([b'set -e', b'export A="3"'], {'A': '3'}, None, ['echo $A $PREP | tr a-z A-Z'])
+    assert success and stdout == b'3 READY\n'
+
+    success, _, status = executor.run([b'set -e'], {}, None, ['false', 'echo never'])
+    assert not success and status == 1
+
+    success, _, status = executor.execute([b'set -e'], b'exit 3')
+    assert not success and status == 3 and executor.is_alive
+
+    executor.stop()
@@ -0,0 +1,28 @@
+from patas.pinning import parse_topology, assign_cpus, format_cpus
+
+
+# Two sockets with 4 cores each and two threads per core, as printed by lscpu -p
+
+LSCPU = b"# CPU,Core,Node\n" + b"".join(b"%d,%d,%d\n" % (cpu, cpu % 8, (cpu % 8) // 4) for cpu in range(16))
+
+
+def test_topology_is_parsed():
+    topology = parse_topology(LSCPU)
+    assert len(topology) == 16
+    assert topology[9] == (9, '1', 0)
+    assert parse_topology(b"0,0,\n1,1,\n") == [(0, '0', 0), (1, '1', 0)]
+
+def test_workers_get_cores_of_a_single_node():
+    topology = parse_topology(LSCPU)
+    assert assign_cpus(topology, 0, 8) == ([0, 8], [0])
+    assert assign_cpus(topology, 5, 8) == ([5, 13], [1])
+    assert assign_cpus(topology, 1, 2) == ([4, 5, 6, 7, 12, 13, 14, 15], [1])
+    assert assign_cpus(topology, 1, 4, cores=2) == ([2, 3, 10, 11], [0])
+
+def test_oversubscribed_workers_get_threads():
+    topology = parse_topology(LSCPU)
+    assert assign_cpus(topology, 1, 16) == ([8], [0])
+    assert assign_cpus(topology, 17, 32) == ([8], [0])
+
+def test_cpus_are_formatted_as_ranges():
+    assert format_cpus([0, 1, 2, 3, 8, 10, 11]) == "0-3,8,10-11"
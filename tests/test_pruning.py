@@ -0,0 +1,25 @@
+from patas.parse import WatchPattern
+from patas.pruning import PruningRule
+
+
+def test_watch_pattern_steps():
+    pattern = WatchPattern('epoch (@int@) acc (@float@)')
+    assert pattern.match(b'epoch 3 acc 0.5') == (3.0, 0.5)
+    assert pattern.match('nothing here') is None
+    pattern = WatchPattern('loss: (@float@)')
+    assert [pattern.match(f'loss: {x}')[0] for x in [0.3, 0.2]] == [1, 2]
+
+def test_median_rule_compares_other_combinations_at_same_step():
+    rule = PruningRule('median', goal='max', min_peers=2)
+    assert not rule.report({'x': 1}, 1, 0.1)
+    assert not rule.report({'x': 1}, 1, 0.1)
+    assert not rule.report({'x': 2}, 1, 0.5)
+    assert rule.report({'x': 3}, 1, 0.2)
+    assert not rule.report({'x': 4}, 1, 0.9)
+    assert not rule.report({'x': 5}, 2, 0.0)
+
+def test_threshold_rule_with_warmup():
+    rule = PruningRule('threshold', goal='min', threshold=1.0, warmup=5)
+    assert not rule.report({'x': 1}, 4, 2.0)
+    assert rule.report({'x': 1}, 5, 2.0)
+    assert not rule.report({'x': 2}, 5, 0.5)
@@ -0,0 +1,69 @@
+from patas.schemas import ArithmeticVariableSchema, ListVariableSchema
+from patas.strategies import RefineStrategy
+
+
+def run(strategy, score, n=4):
+    evaluated = []
+    while True:
+        batch = strategy.ask(n)
+        if not batch:
+            return evaluated
+        for combination in batch:
+            evaluated.append(combination)
+            strategy.tell(combination, {'score': score(combination), 'scores': {}, 'duration': 0.0, 'success': True})
+
+def test_refine_converges_to_best_integer():
+    x        = ArithmeticVariableSchema({'name': 'x', 'min': 0, 'max': 101, 'step': 10})
+    strategy = RefineStrategy([x], {'levels': 4, 'points': 5})
+    run(strategy, lambda c: -(c['x'] - 37) ** 2)
+    assert strategy.best[1]['x'] == 37
+
+def test_refine_never_repeats_combinations():
+    x        = ArithmeticVariableSchema({'name': 'x', 'min': 0, 'max': 11, 'step': 2})
+    mode     = ListVariableSchema({'name': 'mode', 'values': ['a', 'b']})
+    strategy = RefineStrategy([x, mode], {'levels': 2, 'points': 5}, goal='min')
+    evaluated = run(strategy, lambda c: abs(c['x'] - 5) + (c['mode'] == 'b'))
+    keys      = [tuple(sorted(c.items())) for c in evaluated]
+    assert len(keys) == len(set(keys))
+    assert strategy.best[1] == {'x': 5, 'mode': 'a'}
+
+def test_refine_experiment_runs_large_coarse_grids_whole(tmp_path):
+    from patas.schemas import RefineExperimentSchema
+    from datetime import datetime
+
+    class FakeScheduler:
+        def __init__(self):
+            self.workers, self.todo, self.done = [None] * 8, [], []
+        def push_todo(self, task):
+            self.todo.append(task)
+        def push_done(self, task):
+            self.done.append(task)
+
+    experiment = RefineExperimentSchema()
+    experiment.name, experiment.cmd, experiment.store = 'refine', ['run {x} {y}'], 'packed'
+    experiment.output_folder, experiment.experiment_idd = str(tmp_path), 0
+    experiment.score_pattern, experiment.levels, experiment.points = 'Score: (@float@)', 1, 5
+    experiment.vars = [ArithmeticVariableSchema({'name': 'x', 'min': 0, 'max': 100, 'step': 2}),
+                       ArithmeticVariableSchema({'name': 'y', 'min': 0, 'max': 100, 'step': 2})]
+
+    assert experiment.number_of_tasks() == 2500 + 25
+
+    experiment.evaluations = 2000
+    assert experiment.number_of_tasks() == 2500
+    experiment.evaluations = None
+
+    scheduler = FakeScheduler()
+    experiment.on_start(scheduler)
+    executed  = []
+
+    while scheduler.todo:
+        task = scheduler.todo.pop(0)
+        score = -abs(task.combination['x'] - 41) - abs(task.combination['y'] - 61)
+        task.success = True
+        task.attempts.append({'env_variables': {}, 'started_at': datetime.now(), 'ended_at': datetime.now(), 'duration': 0.0, 'stdout': b'Score: %f\n' % score, 'status': 0})
+        experiment.on_task_completed(scheduler, task)
+        experiment.on_workers_idle(scheduler, 1)
+        executed.append(task.combination)
+
+    assert len(executed) > 2500
+    assert experiment._strategy.best[1] == {'x': 41, 'y': 61}
@@ -0,0 +1,53 @@
+from patas.sampling import SobolSequence, LatinHypercubeSequence, RandomSequence
+
+
+def test_sobol_sequence():
+    sequence = SobolSequence(2, scramble=False)
+    points = [list(sequence[i]) for i in range(4)]
+    assert points == [[0.0, 0.0], [0.5, 0.5], [0.75, 0.25], [0.25, 0.75]]
+
+def test_latin_hypercube_batches():
+    sequence = LatinHypercubeSequence(3, seed=1, batch=10)
+    for dim in range(3):
+        strata = sorted(int(sequence[i][dim] * 10) for i in range(10))
+        assert strata == list(range(10))
+
+def test_sequences_are_reproducible():
+    assert list(RandomSequence(4, seed=3)[17]) == list(RandomSequence(4, seed=3)[17])
+    assert list(SobolSequence(4, seed=3)[17]) == list(SobolSequence(4, seed=3)[17])
+
+def test_discrete_run_is_extended_by_index(tmp_path):
+    from patas.schemas import SamplingExperimentSchema, ListVariableSchema
+    from datetime import datetime
+
+    class FakeScheduler:
+        def __init__(self):
+            self.workers, self.todo, self.done = [None] * 4, [], []
+        def push_todo(self, task):
+            self.todo.append(task)
+        def push_done(self, task):
+            self.done.append(task)
+
+    def run(samples, folder):
+        experiment = SamplingExperimentSchema('random')
+        experiment.name, experiment.cmd, experiment.samples = 'random', ['echo {x}'], samples
+        experiment.output_folder, experiment.experiment_idd = str(folder), 0
+        experiment.vars = [ListVariableSchema({'name': 'x', 'values': ['a', 'b', 'c']})]
+        scheduler = FakeScheduler()
+        experiment.on_start(scheduler)
+        executed = []
+        while scheduler.todo:
+            task = scheduler.todo.pop(0)
+            task.success = True
+            task.attempts.append({'env_variables': {}, 'started_at': datetime.now(), 'ended_at': datetime.now(), 'duration': 0.0, 'stdout': b'', 'status': 0})
+            experiment.on_task_completed(scheduler, task)
+            experiment.on_workers_idle(scheduler, 1)
+            executed.append((task.task_idd, task.combination['x']))
+        return executed
+
+    fresh = run(15, tmp_path / 'fresh')
+    assert sorted(x for x, _ in fresh) == list(range(15))
+
+    first    = run(10, tmp_path / 'extended')
+    extended = run(15, tmp_path / 'extended')
+    assert sorted(first + extended) == sorted(fresh)
@@ -17,8 +17,8 @@ def test_experiment_schema():
     assert experiment.name == 'trackerx'
     assert experiment.workdir == '$HOME/Sources/patas/test'
     assert experiment.repeat == 3
-    assert experiment.max_tries == 2
-    assert experiment.redo == True
+    assert experiment.max_tries == 4
+    assert experiment.redo_tasks == False
     assert len(experiment.cmd) == 1
     assert len(experiment.vars) == 3
 
@@ -26,24 +26,26 @@ def test_format_as_yaml():
     expected_output = unindent(8, """
         cmd:
         - ls -la {v1}
-        max_tries: 2
+        max_tries: 4
         name: trackerx
-        redo: true
         repeat: 3
+        type: grid
         vars:
-        - type: list
+        - name: v1
+          type: list
           values:
           - a
           - b
           - c
           - d
-        - factor: 1
-          max: 10
+        - max: 10
           min: 1
+          name: v2
           type: arithmetic
         - factor: 2
           max: 17
           min: 1
+          name: v3
           type: geometric
         workdir: $HOME/Sources/patas/test
         """)
@@ -51,3 +53,14 @@ def test_format_as_yaml():
     experiment = load_experiment('./tests/data/experiment.yaml')
     assert format_as_yaml(experiment) == expected_output
 
+
+def test_saved_experiments_load_back(tmp_path):
+    from patas.schemas import save_experiment
+    experiment           = load_experiment('./tests/data/experiment.yaml')
+    experiment.max_tries = 7
+    experiment.setup     = ['true']
+    save_experiment(str(tmp_path / 'saved.yaml'), experiment)
+    saved = (tmp_path / 'saved.yaml').read_text()
+
+    assert 'setup:' in saved and 'artifacts' not in saved and 'checkpoint' not in saved
+    assert format_as_yaml(load_experiment(str(tmp_path / 'saved.yaml'))) == format_as_yaml(experiment)
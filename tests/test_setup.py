@@ -0,0 +1,30 @@
+from patas.scheduler import BashExecutor
+
+
+def test_bash_tasks_inherit_setup_environment():
+    executor = BashExecutor(None)
+    success, _, _ = executor.setup([b'export BASE=1'], [b'export PREP=ready', b'cd /'])
+    assert success
+    success, stdout, _ = executor.execute([b'set -e'], b'echo $BASE $PREP')
+    assert success and stdout.strip() == b'1 ready'
+
+def test_failed_setup_keeps_previous_environment():
+    executor = BashExecutor(None)
+    success, _, status = executor.setup([], [b'export PREP=ready', b'false'])
+    assert not success and status != 0
+    assert executor.env is None
+
+def test_setup_runs_once_per_worker_and_teardown_at_shutdown(tmp_path):
+    from patas.main import do_explore
+
+    log = tmp_path / 'log'
+
+    do_explore(['--cmd', f'echo task {{x}} $PREP >> {log}', '--va', 'x', '0', '2', '1',
+                '--node', 'localhost', '1', '--executor', 'bash', '--workdir', str(tmp_path),
+                '--setup', f'echo setup >> {log}', '--setup', 'export PREP=ready',
+                '--teardown', f'echo teardown >> {log}',
+                '-o', str(tmp_path / 'out'), '-y', '-q'])
+
+    lines = log.read_text().splitlines()
+    assert lines[0] == 'setup' and lines[-1] == 'teardown'
+    assert sorted(lines[1:-1]) == ['task 0 ready', 'task 1 ready']
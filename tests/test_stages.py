@@ -0,0 +1,50 @@
+from patas.schemas import GridExperimentSchema, ListVariableSchema, StageSchema
+
+
+class FakeScheduler:
+
+    def __init__(self):
+        self.todo, self.done, self.given_up, self.filtered = [], [], [], []
+
+    def push_todo(self, task):
+        self.todo.append(task)
+
+    def push_done(self, task):
+        self.done.append(task)
+
+    def push_given_up(self, task):
+        self.given_up.append(task)
+
+    def push_filtered(self, task):
+        self.filtered.append(task)
+
+
+def create_experiment(tmp_path):
+    experiment = GridExperimentSchema()
+    experiment.name = 'stages'
+    experiment.cmd = ['train {a} {b}']
+    experiment.output_folder = str(tmp_path)
+    experiment.experiment_idd = 0
+    experiment.vars = [
+        ListVariableSchema({'name': 'a', 'values': ['x', 'y']}),
+        ListVariableSchema({'name': 'b', 'values': ['1', '2', '3']}),
+    ]
+    experiment.stages = [StageSchema({'name': 'prep', 'cmd': 'prep {a}', 'vars': ['a']})]
+    return experiment
+
+def test_stage_instances_are_shared(tmp_path):
+    experiment = create_experiment(tmp_path)
+    scheduler = FakeScheduler()
+    experiment.on_start(scheduler)
+
+    # Only the two distinct stage instances can start
+    assert sorted(t.commands[-1] for t in scheduler.todo) == ['prep x', 'prep y']
+
+    stage = scheduler.todo.pop(0)
+    stage.success = True
+    experiment.on_task_completed(scheduler, stage)
+
+    released = [t for t in scheduler.todo if t.stage is None]
+    assert len(released) == 3
+    assert all(t.combination['a'] == stage.combination['a'] for t in released)
+    assert all('PATAS_STAGE_PREP' in t.env for t in released)
@@ -0,0 +1,44 @@
+from patas.staging import Staging, hash_path, input_variable
+from patas.schemas import NodeSchema
+
+import os
+
+
+def create_node(name, hostname):
+    node = NodeSchema()
+    node.name = name
+    node.hostname = hostname
+    return node
+
+def test_hash_depends_on_names_and_contents(tmp_path):
+    (tmp_path / 'data').mkdir()
+    (tmp_path / 'data' / 'a.txt').write_text('1')
+    first = hash_path(str(tmp_path / 'data'))
+    assert first == hash_path(str(tmp_path / 'data'))
+    (tmp_path / 'data' / 'a.txt').write_text('2')
+    assert first != hash_path(str(tmp_path / 'data'))
+    assert input_variable('inputs/dataset.csv') == 'PATAS_INPUT_DATASET_CSV'
+
+def test_local_inputs_are_copied_once(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path / 'home'))
+    (tmp_path / 'dataset.csv').write_text('a,b\n')
+    staging = Staging([create_node('node0', 'localhost'), create_node('node1', '127.0.0.1')])
+    assert len(staging.hosts) == 1
+    env = staging.stage(['dataset.csv'], str(tmp_path))
+    filepath = env['PATAS_INPUT_DATASET_CSV'].replace('$HOME', str(tmp_path / 'home'))
+    assert open(filepath).read() == 'a,b\n'
+    staging._transfer = None
+    assert staging.stage(['dataset.csv'], str(tmp_path)) == env
+
+def test_transfers_fan_out():
+    rounds = []
+
+    class FakeStaging(Staging):
+        def _transfer(self, source, target, digest, filepath):
+            rounds.append(source.name if source else 'master')
+            return True
+
+    staging = FakeStaging([create_node(f'node{i}', f'host{i}') for i in range(7)])
+    staging._spread('0' * 32, '/data', list(staging.hosts))
+    assert rounds.count('master') == 3
+    assert len(rounds) == 7
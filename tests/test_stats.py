@@ -0,0 +1,11 @@
+from patas.stats import t_critical, ci_width, required_samples
+
+
+def test_t_critical():
+    assert abs(t_critical(0.95, 10) - 2.228) < 0.01
+    assert abs(t_critical(0.95, 30) - 2.042) < 0.01
+
+def test_ci_width():
+    assert ci_width([1.0]) == float('inf')
+    assert ci_width([1.0, 1.0, 1.0]) == 0.0
+    assert required_samples([1.0, 2.0, 3.0], 0.1) > 3
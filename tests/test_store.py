@@ -0,0 +1,56 @@
+from patas.store import PackedStore, open_store
+
+import os
+
+
+def record(task_idd, status):
+    return {'task_id': task_idd, 'results': [{'status': status}]}
+
+def test_records_are_read_before_and_after_flush(tmp_path):
+    store = PackedStore(str(tmp_path / 'packed'), batch=2)
+    store.put(0, record(0, 0), [b'first\n'], 'success')
+    assert store.get(0) == (record(0, 0), [b'first\n'])
+    assert not (tmp_path / 'packed').exists()
+
+    store.put(1, record(1, 1), [b'second\n'], 'failure')
+    store.put(1, record(1, 0), [b'second\n', b'third\n'], 'success')
+    store.flush()
+
+    reopened = open_store(str(tmp_path))
+    assert sorted(reopened.ids()) == ['0', '1']
+    assert reopened.state(1) == 'success'
+    assert reopened.get(1)[1] == [b'second\n', b'third\n']
+
+def test_incomplete_index_lines_are_ignored(tmp_path):
+    store = PackedStore(str(tmp_path / 'packed'))
+    store.put(0, record(0, 0), [b'out\n'], 'success')
+    store.flush()
+
+    with open(tmp_path / 'packed' / 'index.tsv', 'a') as fout:
+        fout.write('1\tsegment-000001.pack\t999')
+
+    assert open_store(str(tmp_path)).ids() == ['0']
+
+def test_forgotten_tasks_and_export(tmp_path):
+    store = PackedStore(str(tmp_path / 'packed'))
+    store.put(0, record(0, 0), [b'out\n'], 'success')
+    store.put(1, record(1, 0), [b'out\n'], 'success')
+    store.forget([1])
+    assert open_store(str(tmp_path)).ids() == ['0']
+
+    store.export(0, str(tmp_path / '0'))
+    assert sorted(os.listdir(tmp_path / '0')) == ['.success', 'info.yml', 'success.stdout']
+
+def test_parse_tolerates_invalid_utf8(tmp_path):
+    from patas.parse import ExperimentParser, Pattern
+    import yaml
+
+    with open(tmp_path / 'info.yml', 'w') as fout:
+        yaml.dump({'variables': {'x': [1]}}, fout)
+
+    store = PackedStore(str(tmp_path / 'packed'))
+    store.put(0, dict(record(0, 0), combination={'x': 1}), [b'\xff\xfe noise\nscore 0.5\n'], 'success')
+    store.flush()
+
+    ExperimentParser([Pattern('score', 'score (@float@)')], []).start(str(tmp_path), str(tmp_path / 'out.csv'))
+    assert (tmp_path / 'out.csv').read_text().splitlines() == ['in_x,out_score', '1,0.5']
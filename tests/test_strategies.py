@@ -0,0 +1,38 @@
+from patas.strategies import Strategy, load_strategy
+from patas.schemas import ListVariableSchema, ArithmeticVariableSchema
+
+
+def test_load_strategy_from_module_path():
+    assert load_strategy('patas.strategies:Strategy') is Strategy
+
+def test_strategy_decode():
+    v1 = ListVariableSchema({'name': 'v1', 'values': ['a', 'b']})
+    v2 = ArithmeticVariableSchema({'name': 'v2', 'min': 0, 'max': 10, 'step': 1})
+    strategy = Strategy([v1, v2])
+    assert strategy.decode([0.9, 0.5]) == {'v1': 'b', 'v2': 5}
+
+def test_strategies_improve_and_stay_in_bounds():
+    from patas.strategies import BayesianStrategy, RandomStrategy, LatinHypercubeStrategy, SobolStrategy
+    from patas.schemas import GeometricVariableSchema
+
+    variables = [ArithmeticVariableSchema({'name': 'x', 'min': -5.0, 'max': 5.0, 'continuous': True}),
+                 ArithmeticVariableSchema({'name': 'y', 'min': -5.0, 'max': 5.0, 'continuous': True}),
+                 GeometricVariableSchema({'name': 'n', 'min': 1, 'max': 65, 'factor': 2}),
+                 ListVariableSchema({'name': 'mode', 'values': ['a', 'b']})]
+
+    def in_bounds(c):
+        return -5.0 <= c['x'] <= 5.0 and -5.0 <= c['y'] <= 5.0 and c['n'] in [1, 2, 4, 8, 16, 32, 64] and c['mode'] in ['a', 'b']
+
+    for cls in [RandomStrategy, LatinHypercubeStrategy, SobolStrategy]:
+        assert all(in_bounds(c) for c in cls(variables, seed=1).ask(200))
+
+    strategy = BayesianStrategy(variables, seed=1, goal='min')
+    scores   = []
+
+    while len(scores) < 40:
+        for c in strategy.ask(4):
+            assert in_bounds(c)
+            scores.append((c['x'] - 1) ** 2 + (c['y'] + 2) ** 2 + (c['mode'] == 'b'))
+            strategy.tell(c, {'score': scores[-1], 'scores': {}, 'duration': 0.0, 'success': True})
+
+    assert min(scores[strategy.initial:]) < min(scores[:strategy.initial]) / 10